@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# Shared log/event analysis used by the result/* scripts.
+#
+# The logparse names are re-exported lazily (PEP 562), so running a submodule
+# as a script (python -m analysis.logparse) does not import it twice.
+
+__all__ = ["STATES", "OUTCOMES", "ParsedLog", "Table", "iter_events", "iter_lines", "parse_log", "wall_clock_ns"]
+
+def __getattr__(name):
+    if name in __all__:
+        from . import logparse
+        return getattr(logparse, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Columnar, memory-mappable store for per-request events.
+#
+# A store is a directory of NumPy .npy columns plus meta.json:
+#   ts.npy (int64 wall-clock ns, sorted)  outcome.npy (int8)  state.npy (int8)
+#   latency_ms.npy (float32)  attempts.npy (int8)  weight.npy (float32)
+#   transitions_ts.npy / transitions_from.npy / transitions_to.npy
+# Columns are opened with mmap_mode="r", so loading is O(1) and a time range
+# is two binary searches on ts plus zero-copy slices.
+#
+#   python -m analysis.eventstore convert result/c/chaos_client.log /tmp/chaos.events
+#   python -m analysis.eventstore convert /tmp/events.bin /tmp/run.events
+#   python -m analysis.eventstore info /tmp/chaos.events
+#
+# Sources: a client log (via logparse) or the binary file the client writes
+# when EVENTS_PATH is set (client_service/events.py).
+
+import os
+import sys
+import json
+import numpy as np
+
+from .logparse import OUTCOMES, STATES, parse_log, wall_clock_ns
+
+# Layout of client_service/events.py records (struct "<qfbbbx")
+RECORD_DTYPE = np.dtype([
+    ("ts", "<i8"), ("latency_ms", "<f4"), ("outcome", "i1"), ("state", "i1"), ("attempts", "i1"), ("_pad", "i1"),
+])
+COLUMNS = {
+    "ts": np.int64,
+    "outcome": np.int8,
+    "state": np.int8,
+    "latency_ms": np.float32,
+    "attempts": np.int8,
+    "weight": np.float32,
+}
+TRANSITION_COLUMNS = {"transitions_ts": np.int64, "transitions_from": np.int8, "transitions_to": np.int8}
+
+class EventStore:
+    """Per-request columns (and breaker transitions) backed by memory-mapped arrays"""
+
+    def __init__(self, columns: dict, transitions: dict = None, meta: dict = None):
+        self.columns = columns
+        self.transitions = transitions or {name: np.empty(0, dtype) for name, dtype in TRANSITION_COLUMNS.items()}
+        self.meta = meta or {}
+
+    def __len__(self):
+        return len(self.columns["ts"])
+
+    def __getitem__(self, name) -> np.ndarray:
+        return self.columns[name]
+
+    @classmethod
+    def open(cls, path: str) -> "EventStore":
+        """Open a store directory (mmap) or a raw EVENTS_PATH binary file"""
+        if os.path.isdir(path):
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+            transitions = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                for name in TRANSITION_COLUMNS if os.path.exists(os.path.join(path, f"{name}.npy"))
+            }
+            return cls(columns, transitions, meta)
+        return cls.from_binary(path)
+
+    @classmethod
+    def from_binary(cls, path: str) -> "EventStore":
+        """Columns of an EVENTS_PATH file; mapped as is when already in time order"""
+        size = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        raw = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(size,)) if size else np.empty(0, RECORD_DTYPE)
+        ts = raw["ts"]
+        if size > 1 and np.any(ts[1:] < ts[:-1]):
+            # Concurrent calls finish out of order: sort once, in memory
+            raw = raw[np.argsort(ts, kind="stable")]
+        columns = {name: raw[name] for name in ("ts", "outcome", "state", "latency_ms", "attempts")}
+        columns["weight"] = np.ones(size, dtype=np.float32)
+        return cls(columns, meta={"source": path, "events": int(size)})
+
+    @classmethod
+    def from_log(cls, path: str, use_mmap: bool = False) -> "EventStore":
+        """Build the columns from a client log in one streaming pass"""
+        log = parse_log(path, kinds=("results", "retries", "transitions"), use_mmap=use_mmap)
+        res = log.results
+        ts = np.frombuffer(res["ts"], dtype=np.int64)
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        outcome = np.frombuffer(res["outcome"], dtype=np.int8)[order]
+        # Logs do not tie a retry to its request; with one in-flight call
+        # (CLIENT_CONCURRENCY=1) the retries between two results belong to the second
+        retry_ts = np.sort(np.frombuffer(log.retries["ts"], dtype=np.int64))
+        upto = np.searchsorted(retry_ts, ts, side="right")
+        retries = np.diff(upto, prepend=0)
+        attempts = np.where(outcome == OUTCOMES.index("fast_fail"), 0, 1 + retries)
+        columns = {
+            "ts": ts,
+            "outcome": outcome,
+            "state": np.frombuffer(res["state"], dtype=np.int8)[order],
+            "latency_ms": np.frombuffer(res["latency_ms"], dtype=np.float64)[order].astype(np.float32),
+            "attempts": np.minimum(attempts, 127).astype(np.int8),
+            "weight": np.frombuffer(res["weight"], dtype=np.float64)[order].astype(np.float32),
+        }
+        tr = log.transitions
+        t_order = np.argsort(np.frombuffer(tr["ts"], dtype=np.int64), kind="stable")
+        transitions = {
+            "transitions_ts": np.frombuffer(tr["ts"], dtype=np.int64)[t_order],
+            "transitions_from": np.frombuffer(tr["from"], dtype=np.int8)[t_order],
+            "transitions_to": np.frombuffer(tr["to"], dtype=np.int8)[t_order],
+        }
+        return cls(columns, transitions, meta={"source": path, "events": int(len(ts))})
+
+    def save(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(self.columns[name], dtype=dtype))
+        for name, dtype in TRANSITION_COLUMNS.items():
+            np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(self.transitions[name], dtype=dtype))
+        meta = {**self.meta, "events": len(self), "outcomes": list(OUTCOMES), "states": list(STATES)}
+        if len(self):
+            meta["start_ns"] = int(self.columns["ts"][0])
+            meta["end_ns"] = int(self.columns["ts"][-1])
+        with open(os.path.join(out_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    # === Queries ===
+    def _bounds(self, ts: np.ndarray, start, end):
+        lo = 0 if start is None else int(np.searchsorted(ts, _as_ns(start), side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _as_ns(end), side="right"))
+        return lo, hi
+
+    def between(self, start=None, end=None) -> "EventStore":
+        """Events with start <= ts <= end (ns ints or "YYYY-MM-DD HH:MM:SS" strings), as views"""
+        lo, hi = self._bounds(self.columns["ts"], start, end)
+        tlo, thi = self._bounds(self.transitions["transitions_ts"], start, end)
+        return EventStore(
+            {name: col[lo:hi] for name, col in self.columns.items()},
+            {name: col[tlo:thi] for name, col in self.transitions.items()},
+            self.meta,
+        )
+
+    def outcome_counts(self) -> dict:
+        counts = np.bincount(self.columns["outcome"].astype(np.int64), minlength=len(OUTCOMES))
+        return {name: int(n) for name, n in zip(OUTCOMES, counts)}
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "time": pd.to_datetime(np.asarray(self.columns["ts"]), unit="ns"),
+            "outcome": pd.Categorical.from_codes(self.columns["outcome"], categories=OUTCOMES),
+            "state": pd.Categorical.from_codes(self.columns["state"], categories=STATES),
+            "latency_ms": self.columns["latency_ms"],
+            "attempts": self.columns["attempts"],
+            "weight": self.columns["weight"],
+        })
+
+    def transitions_frame(self):
+        import pandas as pd
+        t = self.transitions
+        return pd.DataFrame({
+            "time": pd.to_datetime(np.asarray(t["transitions_ts"]), unit="ns"),
+            "from": pd.Categorical.from_codes(t["transitions_from"], categories=STATES),
+            "to": pd.Categorical.from_codes(t["transitions_to"], categories=STATES),
+        })
+
+def _as_ns(value) -> int:
+    if isinstance(value, str):
+        return wall_clock_ns(value)
+    if hasattr(value, "value"):  # pandas.Timestamp
+        return int(value.value)
+    return int(value)
+
+def load(path: str) -> EventStore:
+    """Open a store directory or EVENTS_PATH file; a log file is converted in memory"""
+    if os.path.isdir(path) or path.endswith(".bin"):
+        return EventStore.open(path)
+    return EventStore.from_log(path)
+
+def main(argv):
+    if len(argv) == 3 and argv[0] == "convert":
+        store = load(argv[1])
+        store.save(argv[2])
+        print(json.dumps({"events": len(store), "transitions": len(store.transitions["transitions_ts"]),
+                          "outcomes": store.outcome_counts()}))
+    elif len(argv) == 2 and argv[0] == "info":
+        store = load(argv[1])
+        print(json.dumps({**store.meta, "outcomes": store.outcome_counts()}, indent=2))
+    else:
+        print("usage: python -m analysis.eventstore convert <log|events.bin> <out_dir> | info <store>")
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# The result/* figures as functions of parsed logs (logparse Tables).
+#
+# Each function builds and returns one matplotlib Figure without showing it:
+# the result/* scripts call plt.show() on it, analysis/render.py saves it
+# headless. Pick the backend (e.g. matplotlib.use("Agg")) before importing
+# this module.
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from .logparse import OUTCOMES, STATES
+from .rolling import (bucketed_success_rate, cumulative_success_rate, plot_state_spans, state_intervals,
+                      to_datetime64)
+
+OK = OUTCOMES.index("ok")
+
+# Breaker state -> (color, alpha) of its background span
+B1_STATE_COLORS = {
+    "OPEN": ("#FF4C4C", 0.35),       # Bright red
+    "HALF-OPEN": ("#FFD700", 0.45),  # Gold
+    "CLOSED": ("#32CD32", 0.25),     # Lime green
+}
+B2_STATE_COLORS = {
+    "OPEN": ("#FF4C4C", 0.25),
+    "HALF-OPEN": ("#FFD700", 0.35),
+    "CLOSED": ("#32CD32", 0.2),
+}
+# Step height of each state code in the chaos figure
+STATE_VALUE = np.array([{"CLOSED": 0.0, "HALF-OPEN": 0.5, "OPEN": 1.0}[name] for name in STATES])
+
+# === result/b1 ===
+def b1_timeline(results, transitions, title="Circuit Breaker State Timeline vs Success Rate (FAILURE_RATE=0.7)"):
+    """Success rate per second with the breaker state spans behind it (None without results)"""
+    if len(results) == 0:
+        return None
+    rate = bucketed_success_rate(results.array("ts"), results.array("outcome"), bucket_s=1.0,
+                                 weight=results.array("weight"))
+    seen = rate["total"] > 0
+    ts = transitions.array("ts")
+    intervals = state_intervals(ts, transitions.array("from"), transitions.array("to"),
+                                end_ns=int(rate["bucket_ns"][-1]))
+
+    fig, ax1 = plt.subplots(figsize=(14, 6))
+    ax1.plot(to_datetime64(rate["bucket_ns"][seen]), rate["success_rate"][seen], color="blue", linewidth=1.8,
+             label="Success Rate")
+    ax1.set_xlabel("Time")
+    ax1.set_ylabel("Success Rate", color="blue")
+    ax1.tick_params(axis="y", labelcolor="blue")
+    ax1.grid(True, linestyle="--", alpha=0.4)
+
+    # States shorter than 1s are widened to 1s for display
+    plot_state_spans(ax1, intervals, B1_STATE_COLORS, min_width_s=1.0)
+
+    ax1.vlines(to_datetime64(ts), 1.0, 1.02, color="green", linewidth=0.6)
+    if len(ts) <= 200:
+        # Text labels only while they are still readable
+        for t, f, to in zip(to_datetime64(ts), transitions.array("from"), transitions.array("to")):
+            ax1.text(t, 1.02, f"{STATES[f]}→{STATES[to]}",
+                     rotation=90, fontsize=6, color="green", ha="center", va="bottom")
+
+    handles, labels = ax1.get_legend_handles_labels()
+    unique = dict(zip(labels, handles))
+    ax1.legend(unique.values(), unique.keys(), loc="upper left")
+    ax1.set_title(title, fontsize=13)
+    fig.tight_layout()
+    return fig
+
+# === result/b2 ===
+def b2_retry_delay(retries):
+    """Figure A: delay before each retry (exponential backoff + jitter)"""
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(to_datetime64(retries.array("ts")), retries.array("delay"), marker="o", color="orange")
+    ax.set_title("Figure A: Retry Delay Timeline (Exponential Backoff + Jitter)")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Delay before next retry (s)")
+    ax.grid(True, alpha=0.4)
+    fig.tight_layout()
+    return fig
+
+def b2_success_by_group(results, bins: int = 6):
+    """Figure B: success rate of the requests split into `bins` equal runs (None without results)"""
+    n = len(results)
+    if n == 0:
+        return None
+    # pd.cut(index, bins) without pandas: equal-width, right-closed bins over the row index
+    edges = np.linspace(0, n - 1, bins + 1)
+    group = np.clip(np.searchsorted(edges, np.arange(n), side="left"), 1, bins)
+    ok = results.array("outcome") == OK
+    groups = np.unique(group)
+    success = np.array([ok[group == g].mean() for g in groups])
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.plot(groups, success, marker="o", color="blue", linewidth=1.6)
+    avg_success = success.mean()
+    ax.axhline(y=avg_success, color="gray", linestyle="--", alpha=0.6, label=f"Average = {avg_success:.2f}")
+    ax.set_title("Figure B: Success Rate vs Retry Count (Observed)")
+    ax.set_xlabel("Retry Attempt Group")
+    ax.set_ylabel("Success Rate (0–1)")
+    ax.set_ylim(0, 1)
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.4)
+    fig.tight_layout()
+    return fig
+
+def b2_combined(results, retries, transitions):
+    """Figure C: running success rate, breaker state spans and retry events (None without results)"""
+    if len(results) == 0:
+        return None
+    res_ts = results.array("ts")
+    intervals = state_intervals(transitions.array("ts"), transitions.array("from"), transitions.array("to"),
+                                end_ns=int(res_ts[-1]))
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(to_datetime64(res_ts), cumulative_success_rate(results.array("outcome"), results.array("weight")),
+            color="blue", linewidth=1.5, label="Success Rate")
+    plot_state_spans(ax, intervals, B2_STATE_COLORS)
+    ax.scatter(to_datetime64(retries.array("ts")), [1.05] * len(retries), color="orange", s=30,
+               label="Retry Events", zorder=5)
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Success Rate")
+    ax.set_title("Figure C: Combined View (Circuit Breaker States + Retry Events)")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.4)
+    fig.tight_layout()
+    return fig
+
+# === result/c ===
+def c_chaos_phases(transitions, start: datetime, end: datetime, pre: int = 60, post: int = 60):
+    """Breaker state before, during and after the chaos window [start, end] (None when no transition falls near it)"""
+    ts = transitions.array("ts")
+    if len(ts) == 0:
+        return None
+    # Step points: the state before the first transition, then each new state
+    step_ns = np.concatenate(([ts[0] - 1_000_000], ts))
+    step_state = np.concatenate((transitions.array("from")[:1], transitions.array("to")))
+    step_time = to_datetime64(step_ns)
+    focus = (step_time >= np.datetime64(start - timedelta(seconds=pre))) & \
+            (step_time <= np.datetime64(end + timedelta(seconds=post)))
+    if not focus.any():
+        return None
+    t, state = step_time[focus], step_state[focus]
+    value = STATE_VALUE[state]
+
+    fig, ax = plt.subplots(figsize=(14, 6))
+    ax.step(t, value, where="post", color="red", linewidth=2.2, label="Breaker State")
+    ax.scatter(t, value, color="black", s=35, zorder=5)
+    if len(t) <= 200:
+        # Labels only while they are still readable
+        for x, v, code in zip(t, value, state):
+            ax.text(x, v + 0.06, STATES[code], ha="center", fontsize=8, rotation=35)
+    ax.axvspan(start, end, color="gray", alpha=0.25, label="Chaos Injection")
+
+    # Phase labels anchored to the axes, not to data positions
+    ax.text(0.1, 1.02, "Before Chaos", transform=ax.transAxes, color="green", fontsize=11, ha="center")
+    ax.text(0.5, 0.92, "During Chaos", transform=ax.transAxes, color="orange", fontsize=11, ha="center")
+    ax.text(0.9, 1.02, "After Recovery", transform=ax.transAxes, color="blue", fontsize=11, ha="center")
+
+    ax.set_title("Figure : Circuit Breaker State Before, During, and After Chaos Experiment")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Breaker State")
+    ax.set_yticks([0, 0.5, 1], ["CLOSED", "HALF-OPEN", "OPEN"])
+    ax.set_ylim(-0.1, 1.1)
+    ax.grid(True, linestyle="--", alpha=0.45)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+# === client_service/observation.py ===
+def transitions_over_time(transitions):
+    """State entered at each breaker transition (None without transitions)"""
+    if len(transitions) == 0:
+        return None
+    fig, ax = plt.subplots(figsize=(10, 3))
+    ax.plot(to_datetime64(transitions.array("ts")), [STATES[code] for code in transitions.array("to")],
+            marker="o", linestyle="-")
+    ax.set_title("Circuit Breaker State Transitions Over Time")
+    ax.set_xlabel("Time")
+    ax.set_ylabel("State")
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+# Single-pass streaming parser for client logs (text and LOG_FORMAT=json).
+#
+# The file is read once in binary mode, line by line (or through mmap for
+# very large files). A line is only decoded when a cheap substring check
+# says it is one of the events we keep:
+#   transitions - "[CB Transition] OPEN -> HALF-OPEN"
+#   results     - "Breaker=CLOSED result={...} [latency_ms=..]"
+#   retries     - "Retrying main.fetch_with_retry in 1.08 seconds ..."
+#   requests    - httpx "HTTP Request: GET ... "HTTP/1.1 500 ...""
+# and lands in typed array columns (int64 ns timestamps, int8 codes,
+# float64 values), so memory grows by a few bytes per event and never with
+# the size of the log itself.
+#
+# Timestamps are the log's wall-clock time ("2025-11-07 12:07:27,020")
+# encoded as ns since the epoch without a timezone shift, so converting
+# back (pandas unit="ns") gives the same naive wall-clock time.
+
+import os
+import sys
+import json
+import mmap
+import time
+import calendar
+from array import array
+
+STATES = ("CLOSED", "OPEN", "HALF-OPEN")
+OUTCOMES = ("ok", "5xx", "timeout", "fast_fail", "rejected", "error", "stale")
+STATE_CODE = {name: i for i, name in enumerate(STATES)}
+OUTCOME_CODE = {name: i for i, name in enumerate(OUTCOMES)}
+KINDS = ("transitions", "results", "retries", "requests")
+
+NAN = float("nan")
+
+_TRANSITION = b"[CB Transition] "
+_RESULT = b"Breaker="
+_RETRY = b"Retrying "
+_REQUEST = b"HTTP Request: "
+
+# === Columns ===
+class Table:
+    """Named typed columns of equal length; to_frame() needs pandas"""
+
+    def __init__(self, kind: str, **columns):
+        self.kind = kind
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["ts"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def array(self, name):
+        """Zero-copy NumPy view of one column"""
+        import numpy as np
+        col = self.columns[name]
+        return np.frombuffer(col, dtype=col.typecode) if len(col) else np.empty(0, dtype=col.typecode)
+
+    def to_frame(self):
+        import pandas as pd
+        data = {}
+        for name, col in self.columns.items():
+            if name == "ts":
+                data["time"] = pd.to_datetime(pd.Series(col, dtype="int64"), unit="ns")
+            elif name in ("from", "to", "state"):
+                data[name] = pd.Categorical.from_codes(list(col), categories=STATES)
+            elif name == "outcome":
+                data[name] = pd.Categorical.from_codes(list(col), categories=OUTCOMES)
+            else:
+                data[name] = list(col)
+        return pd.DataFrame(data)
+
+def _tables():
+    return {
+        "transitions": Table("transitions", ts=array("q"), **{"from": array("b"), "to": array("b")}),
+        "results": Table("results", ts=array("q"), outcome=array("b"), state=array("b"),
+                         latency_ms=array("d"), weight=array("d")),
+        "retries": Table("retries", ts=array("q"), delay=array("d"), attempt=array("h")),
+        "requests": Table("requests", ts=array("q"), status=array("h")),
+    }
+
+class ParsedLog:
+    """The four event tables of one log plus parse statistics"""
+
+    def __init__(self, path: str, tables: dict, nbytes: int, seconds: float):
+        self.path = path
+        self.tables = tables
+        self.bytes = nbytes
+        self.seconds = seconds
+
+    @property
+    def transitions(self) -> Table:
+        return self.tables["transitions"]
+
+    @property
+    def results(self) -> Table:
+        return self.tables["results"]
+
+    @property
+    def retries(self) -> Table:
+        return self.tables["retries"]
+
+    @property
+    def requests(self) -> Table:
+        return self.tables["requests"]
+
+    def summary(self) -> dict:
+        return {
+            "path": self.path,
+            "mb": round(self.bytes / 1e6, 3),
+            "seconds": round(self.seconds, 3),
+            "mb_per_s": round(self.bytes / 1e6 / self.seconds, 1) if self.seconds else None,
+            **{kind: len(t) for kind, t in self.tables.items()},
+        }
+
+# === Field parsers ===
+# Logs have many lines per second, so whole-second prefixes are cached and a
+# timestamp costs one dict lookup plus the millisecond digits
+_second_cache = {}
+_STATE_BYTES = {name.encode(): code for name, code in STATE_CODE.items()}
+
+def _second_ns(prefix: bytes) -> int:
+    try:
+        day = calendar.timegm((int(prefix[:4]), int(prefix[5:7]), int(prefix[8:10]), 0, 0, 0))
+        secs = int(prefix[11:13]) * 3600 + int(prefix[14:16]) * 60 + int(prefix[17:19])
+    except ValueError:
+        return -1
+    if len(_second_cache) > 65536:
+        _second_cache.clear()
+    ns = _second_cache[prefix] = (day + secs) * 1_000_000_000
+    return ns
+
+def parse_ts(line: bytes) -> int:
+    """ns for a line starting "YYYY-MM-DD HH:MM:SS,mmm", or -1 if it does not"""
+    prefix = line[:19]
+    base = _second_cache.get(prefix)
+    if base is None:
+        if len(line) < 23 or line[4] != 45 or line[10] != 32 or line[19] not in (44, 46):  # '-' ' ' ',' '.'
+            return -1
+        base = _second_ns(prefix)
+        if base < 0:
+            return -1
+    try:
+        return base + int(line[20:23]) * 1_000_000
+    except ValueError:
+        return -1
+
+def norm_state(raw) -> int:
+    code = _STATE_BYTES.get(raw) if isinstance(raw, bytes) else None
+    if code is not None:
+        return code
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "replace")
+    s = raw.strip().replace("–", "-").replace("—", "-").replace("_", "-").upper()
+    return STATE_CODE.get(s, -1)
+
+def classify_error(error: str) -> int:
+    """Same mapping as client_service main.classify_result()"""
+    if error == "circuit breaker open":
+        return OUTCOME_CODE["fast_fail"]
+    if error == "concurrency limit exceeded" or error.startswith("bulkhead "):
+        return OUTCOME_CODE["rejected"]
+    if error.startswith("server error"):
+        return OUTCOME_CODE["5xx"]
+    low = error.lower()
+    if "timeout" in low or "timed out" in low:
+        return OUTCOME_CODE["timeout"]
+    return OUTCOME_CODE["error"]
+
+def _text_outcome(rest: bytes) -> int:
+    # rest starts right after "result="
+    if not rest.startswith(b"{'error': "):
+        if not rest.startswith(b"{"):
+            return OUTCOME_CODE["error"]
+        # Cache fallback (client_service/cache.py): last good result, flagged stale
+        return OUTCOME_CODE["stale"] if b"'stale': True" in rest else OUTCOME_CODE["ok"]
+    body = rest[10:]
+    quote = body[:1]
+    end = body.find(quote, 1)
+    return classify_error(body[1:end].decode("utf-8", "replace") if end > 0 else "")
+
+def _tail_float(line: bytes, key: bytes, default: float) -> float:
+    i = line.rfind(key)
+    if i < 0:
+        return default
+    j = i + len(key)
+    k = j
+    while k < len(line) and line[k] not in (32, 10, 13):
+        k += 1
+    try:
+        return float(line[j:k])
+    except ValueError:
+        return default
+
+# === Line readers ===
+def iter_lines(path: str, use_mmap: bool = False, chunk_size: int = 1 << 20):
+    """Yield raw lines (bytes, newline kept) from a log read once"""
+    with open(path, "rb") as f:
+        if not use_mmap:
+            yield from f
+            return
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # empty file
+        with mm:
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                # Slice chunk by chunk so pages are touched sequentially
+                end = min(size, pos + chunk_size)
+                nl = mm.rfind(b"\n", pos, end) if end < size else size - 1
+                if nl < pos:
+                    nl = mm.find(b"\n", end)
+                    nl = size - 1 if nl < 0 else nl
+                yield from mm[pos:nl + 1].splitlines(keepends=True)
+                pos = nl + 1
+
+def iter_events(lines, kinds=KINDS):
+    """Yield (kind, values) for every event line; everything else is skipped unread"""
+    want_t = "transitions" in kinds
+    want_res = "results" in kinds
+    want_r = "retries" in kinds
+    want_q = "requests" in kinds
+    for line in lines:
+        if line[:1] == b"{":
+            event = _json_event(line, kinds)
+            if event is not None:
+                yield event
+            continue
+        if want_res and _RESULT in line:
+            i = line.find(_RESULT)
+            j = line.find(b" result=", i)
+            ts = parse_ts(line)
+            if j < 0 or ts < 0:
+                continue
+            state = norm_state(line[i + 8:j])
+            outcome = _text_outcome(line[j + 8:])
+            latency = _tail_float(line, b" latency_ms=", NAN)
+            rate = _tail_float(line, b" sample_rate=", 1.0)
+            yield "results", (ts, outcome, state, latency, 1.0 / rate if rate > 0 else 1.0)
+        elif want_t and _TRANSITION in line:
+            i = line.find(_TRANSITION) + len(_TRANSITION)
+            parts = line[i:].split()
+            ts = parse_ts(line)
+            if len(parts) < 3 or parts[1] != b"->" or ts < 0:
+                continue
+            yield "transitions", (ts, norm_state(parts[0]), norm_state(parts[2]))
+        elif want_r and _RETRY in line:
+            i = line.find(b" in ", line.find(_RETRY))
+            ts = parse_ts(line)
+            if i < 0 or ts < 0:
+                continue
+            j = line.find(b" ", i + 4)
+            try:
+                delay = float(line[i + 4:j])
+            except ValueError:
+                continue
+            yield "retries", (ts, delay, 0)
+        elif want_q and _REQUEST in line:
+            i = line.rfind(b'"HTTP/')
+            ts = parse_ts(line)
+            if i < 0 or ts < 0:
+                continue
+            j = line.find(b" ", i)
+            try:
+                status = int(line[j + 1:j + 4])
+            except ValueError:
+                continue
+            yield "requests", (ts, status)
+
+def _json_event(line: bytes, kinds):
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+    ts = parse_ts(rec.get("time", "").encode())
+    if ts < 0:
+        ts = int(rec.get("ts", 0) * 1e9)
+    event = rec.get("event")
+    if event == "result" and "results" in kinds:
+        outcome = OUTCOME_CODE.get(rec.get("outcome"), OUTCOME_CODE["error"])
+        rate = rec.get("sample_rate", 1.0) or 1.0
+        latency = rec.get("latency_ms")
+        return "results", (ts, outcome, norm_state(rec.get("breaker", "")),
+                           NAN if latency is None else float(latency), 1.0 / rate)
+    if event == "transition" and "transitions" in kinds:
+        return "transitions", (ts, norm_state(rec.get("from", "")), norm_state(rec.get("to", "")))
+    if event == "retry" and "retries" in kinds:
+        return "retries", (ts, float(rec.get("delay_s", 0.0)), int(rec.get("attempt", 0)))
+    if event is None and "requests" in kinds:
+        msg = rec.get("msg", "")
+        if msg.startswith("HTTP Request: "):
+            i = msg.rfind('"HTTP/')
+            j = msg.find(" ", i)
+            if i >= 0 and j >= 0 and msg[j + 1:j + 4].isdigit():
+                return "requests", (ts, int(msg[j + 1:j + 4]))
+    return None
+
+# === Entry point ===
+def parse_log(path: str, kinds=KINDS, use_mmap: bool = False, start_ns: int = None, end_ns: int = None) -> ParsedLog:
+    """Read `path` once and return its events as typed columns, optionally limited to [start_ns, end_ns]"""
+    tables = _tables()
+    cols = {kind: list(t.columns.values()) for kind, t in tables.items()}
+    lo = start_ns if start_ns is not None else -1
+    hi = end_ns if end_ns is not None else 1 << 62
+    started = time.perf_counter()
+    for kind, values in iter_events(iter_lines(path, use_mmap=use_mmap), kinds):
+        if not lo <= values[0] <= hi:
+            continue
+        for col, value in zip(cols[kind], values):
+            col.append(value)
+    return ParsedLog(path, tables, os.path.getsize(path), time.perf_counter() - started)
+
+def wall_clock_ns(text: str) -> int:
+    """ns for "YYYY-MM-DD HH:MM:SS[,mmm]" / ISO text, in the same encoding as parse_ts()"""
+    text = text.replace("T", " ")
+    if len(text) == 19:
+        text += ",000"
+    ts = parse_ts(text.encode())
+    if ts < 0:
+        raise ValueError(f"not a log timestamp: {text!r}")
+    return ts
+
+if __name__ == "__main__":
+    for p in sys.argv[1:]:
+        print(json.dumps(parse_log(p).summary()))
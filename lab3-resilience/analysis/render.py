@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# Render every result figure for many run directories in one headless process.
+#
+#   python -m analysis.render result client_service      # result/b1, b2, c + client_service/transitions.log
+#   python -m analysis.render runs/ --out figures --workers 8
+#   python -m analysis.render result/c --chaos-start "2025-11-07 13:30:00" --chaos-end "2025-11-07 13:31:00"
+#   python -m analysis.render result --only b1 c
+#
+# A run directory is any directory holding client.log, cb_states.log,
+# chaos_client.log or transitions.log (directories given are searched
+# recursively). Figures are drawn from whatever a run has:
+#   b1          - client.log results (+ cb_states.log transitions when present)
+#   b2-delay    - client.log retries
+#   b2-success  - client.log results
+#   b2-combined - client.log results, retries and transitions
+#   c           - chaos_client.log transitions around the chaos window
+#   transitions - transitions.log transitions (client_service/observation.py)
+# and written as <out>/<run path>/<figure>.png. The chaos window comes from
+# --chaos-start/--chaos-end or the run's chaostoolkit journal.json (first
+# action start to last activity end). The journal is in UTC and the logs in
+# whatever clock the client ran with, so --journal-offset hours are added to
+# it (0 by default); c is skipped, with the window and the log's span
+# printed, when no transition falls near it. The journal.json kept in
+# result/c is from a later chaos run than its chaos_client.log (15:05 UTC
+# against a log ending 14:54), so that figure needs an explicit
+# --chaos-start/--chaos-end like result/c/c_observation.py does.
+#
+# Every log is parsed once, in a process pool (largest first), before
+# NumPy and matplotlib are even imported; figures are then drawn on the
+# Agg backend and closed as soon as they are saved.
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+from .logparse import parse_log
+
+FIGURES = ("b1", "b2-delay", "b2-success", "b2-combined", "c", "transitions")
+# log file -> event kinds parsed from it
+LOGS = {
+    "client.log": ("results", "retries", "transitions"),
+    "cb_states.log": ("transitions",),
+    "chaos_client.log": ("transitions",),
+    "transitions.log": ("transitions",),
+}
+
+def find_runs(paths: list) -> list:
+    """Directories under `paths` that hold at least one known log, sorted"""
+    runs = set()
+    for path in paths:
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if any(name in files for name in LOGS):
+                runs.add(root)
+    return sorted(runs)
+
+def _parse(job):
+    path, kinds = job
+    return path, parse_log(path, kinds=kinds)
+
+def parse_all(runs: list, workers: int) -> dict:
+    """{log path: ParsedLog} for every known log of every run, parsed in parallel"""
+    jobs = [(os.path.join(run, name), kinds) for run in runs for name, kinds in LOGS.items()
+            if os.path.exists(os.path.join(run, name))]
+    jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+    if workers <= 1 or len(jobs) <= 1:
+        return dict(map(_parse, jobs))
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return dict(pool.map(_parse, jobs))
+
+def chaos_window(run: str, args):
+    """(start, end, source) with naive datetimes in the log's clock, or None"""
+    if args.chaos_start and args.chaos_end:
+        return datetime.fromisoformat(args.chaos_start), datetime.fromisoformat(args.chaos_end), "--chaos-start/--chaos-end"
+    journal = os.path.join(run, "journal.json")
+    if not os.path.exists(journal):
+        return None
+    with open(journal) as f:
+        activities = json.load(f).get("run") or []
+    actions = [a for a in activities if a["activity"].get("type") == "action"]
+    if not actions:
+        return None
+    shift = timedelta(hours=args.journal_offset)
+
+    def to_log_clock(text):
+        return datetime.fromisoformat(text).astimezone(timezone.utc).replace(tzinfo=None) + shift
+    return (to_log_clock(actions[0]["start"]), to_log_clock(activities[-1]["end"]),
+            f"journal.json{args.journal_offset:+g}h")
+
+def plan(run: str, logs: dict, args) -> list:
+    """(figure name, builder) for each figure this run has the data for"""
+    from . import figures
+
+    client = logs.get(os.path.join(run, "client.log"))
+    states = logs.get(os.path.join(run, "cb_states.log"))
+    chaos = logs.get(os.path.join(run, "chaos_client.log"))
+    observed = logs.get(os.path.join(run, "transitions.log"))
+    out = []
+    if client is not None and len(client.results):
+        transitions = states.transitions if states is not None else client.transitions
+        out.append(("b1", lambda: figures.b1_timeline(client.results, transitions)))
+        out.append(("b2-success", lambda: figures.b2_success_by_group(client.results)))
+    if client is not None and len(client.retries):
+        out.append(("b2-delay", lambda: figures.b2_retry_delay(client.retries)))
+        if len(client.results):
+            out.append(("b2-combined", lambda: figures.b2_combined(client.results, client.retries,
+                                                                   client.transitions)))
+    if chaos is not None and len(chaos.transitions):
+        window = chaos_window(run, args)
+        if window is None:
+            print(f"{run}: c skipped, no chaos window (--chaos-start/--chaos-end or journal.json)")
+        else:
+            start, end, source = window
+            out.append(("c", lambda: figures.c_chaos_phases(chaos.transitions, start, end, args.pre, args.post)
+                        or skip_chaos(run, chaos.transitions, window)))
+    if observed is not None and len(observed.transitions):
+        out.append(("transitions", lambda: figures.transitions_over_time(observed.transitions)))
+    return [(name, build) for name, build in out if not args.only or name in args.only]
+
+def skip_chaos(run: str, transitions, window):
+    """Say why c has nothing to draw: the window against the log's own span"""
+    ts = transitions.array("ts")
+    first, last = (datetime.fromtimestamp(t / 1e9, timezone.utc).replace(tzinfo=None) for t in (ts[0], ts[-1]))
+    start, end, source = window
+    print(f"{run}: chaos window {start:%Y-%m-%d %H:%M:%S}..{end:%H:%M:%S} ({source}) is outside "
+          f"{first:%Y-%m-%d %H:%M:%S}..{last:%H:%M:%S} of chaos_client.log; "
+          f"pass --chaos-start/--chaos-end or --journal-offset")
+    return None
+
+def render(runs: list, logs: dict, args) -> int:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    written = 0
+    for run in runs:
+        target = os.path.join(args.out, os.path.relpath(run, args.base) if args.base else run.strip(os.sep))
+        for name, build in plan(run, logs, args):
+            fig = build()
+            if fig is None:
+                print(f"{run}: {name} skipped, no data in range")
+                continue
+            os.makedirs(target, exist_ok=True)
+            path = os.path.join(target, f"{name}.png")
+            fig.savefig(path, dpi=args.dpi)
+            plt.close(fig)
+            written += 1
+            print(f"{run}: {path}")
+    return written
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Render the result figures for many run directories (headless)")
+    p.add_argument("paths", nargs="+", help="run directories, or directories to search for them")
+    p.add_argument("--out", default="figures", help="output directory (one subdirectory per run)")
+    p.add_argument("--base", default=None, help="strip this prefix from run paths under --out")
+    p.add_argument("--only", nargs="*", choices=FIGURES, default=None, help="figures to render (default: all)")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parsing processes")
+    p.add_argument("--dpi", type=int, default=100)
+    p.add_argument("--chaos-start", default=None, help="chaos window start in the log's clock (ISO)")
+    p.add_argument("--chaos-end", default=None, help="chaos window end in the log's clock (ISO)")
+    p.add_argument("--journal-offset", type=float, default=0.0,
+                   help="hours added to journal.json (UTC) times to match the log's clock")
+    p.add_argument("--pre", type=int, default=60, help="seconds shown before the chaos window")
+    p.add_argument("--post", type=int, default=60, help="seconds shown after the chaos window")
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    runs = find_runs(args.paths)
+    if not runs:
+        print(f"no run directories ({', '.join(LOGS)}) under {' '.join(args.paths)}")
+        return 1
+    started = time.perf_counter()
+    logs = parse_all(runs, args.workers)
+    parsed = time.perf_counter()
+    written = render(runs, logs, args)
+    done = time.perf_counter()
+    mb = sum(log.bytes for log in logs.values()) / 1e6
+    print(f"{len(runs)} runs, {len(logs)} logs ({mb:.1f} MB) parsed in {parsed - started:.2f}s, "
+          f"{written} figures in {done - parsed:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
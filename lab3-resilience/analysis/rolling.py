@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Vectorized success-rate and breaker-state analytics.
+#
+# Everything works on int64 ns columns from logparse/eventstore (success
+# rates sort them first if a merged log arrived out of order):
+# bucketing is an integer division plus bincount, rolling windows are two
+# searchsorted calls on cumulative sums, and state intervals/outages are
+# shifts and masks over the transition arrays, so cost grows with NumPy
+# speed rather than with Python loops over rows.
+#
+#   python -m analysis.rolling result/c/chaos_client.log   # dwell times + MTTR
+
+import numpy as np
+
+from .logparse import OUTCOMES, STATES, parse_log
+
+NS = 1_000_000_000
+OK = OUTCOMES.index("ok")
+CLOSED = STATES.index("CLOSED")
+
+def _ns(seconds: float) -> int:
+    return int(round(seconds * NS))
+
+def _ok_and_weight(outcome, weight):
+    ok = np.asarray(outcome) == OK
+    w = np.ones(len(ok)) if weight is None else np.asarray(weight, dtype=np.float64)
+    return ok, w
+
+def _by_time(ts, outcome, weight):
+    """ts, ok, weight ordered by ts; a stable sort only when ts is not already sorted"""
+    ts = np.asarray(ts, dtype=np.int64)
+    ok, w = _ok_and_weight(outcome, weight)
+    if len(ts) > 1 and (ts[1:] < ts[:-1]).any():
+        order = np.argsort(ts, kind="stable")
+        ts, ok, w = ts[order], ok[order], w[order]
+    return ts, ok, w
+
+# === Success rate ===
+def bucketed_success_rate(ts, outcome, bucket_s: float = 1.0, weight=None, start_ns: int = None):
+    """
+    Per-bucket success/fail counts over [first event, last event]:
+    returns dict of arrays bucket_ns (start), success, fail, total, success_rate
+    (nan for empty buckets). `weight` re-inflates sampled ok lines.
+    """
+    ts, ok, w = _by_time(ts, outcome, weight)
+    width = _ns(bucket_s)
+    if len(ts) == 0:
+        empty = np.empty(0)
+        return {"bucket_ns": empty.astype(np.int64), "success": empty, "fail": empty, "total": empty,
+                "success_rate": empty}
+    t0 = (ts[0] if start_ns is None else start_ns) // width * width
+    idx = (ts - t0) // width
+    n = int(idx[-1]) + 1
+    success = np.bincount(idx, weights=w * ok, minlength=n)
+    total = np.bincount(idx, weights=w, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = success / total
+    return {
+        "bucket_ns": t0 + np.arange(n, dtype=np.int64) * width,
+        "success": success,
+        "fail": total - success,
+        "total": total,
+        "success_rate": rate,
+    }
+
+def rolling_success_rate(ts, outcome, window_s: float = 10.0, step_s: float = 1.0, weight=None):
+    """Success rate over the trailing `window_s` evaluated every `step_s`: (at_ns, rate, total)"""
+    ts, ok, w = _by_time(ts, outcome, weight)
+    if len(ts) == 0:
+        return np.empty(0, np.int64), np.empty(0), np.empty(0)
+    step = _ns(step_s)
+    at = np.arange(ts[0] // step * step + step, ts[-1] + step + 1, step, dtype=np.int64)
+    csum_ok = np.concatenate(([0.0], np.cumsum(w * ok)))
+    csum_all = np.concatenate(([0.0], np.cumsum(w)))
+    hi = np.searchsorted(ts, at, side="left")                   # events with ts < at
+    lo = np.searchsorted(ts, at - _ns(window_s), side="left")   # ... and ts >= at - window
+    total = csum_all[hi] - csum_all[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = (csum_ok[hi] - csum_ok[lo]) / total
+    return at, rate, total
+
+def cumulative_success_rate(outcome, weight=None):
+    """Running success ratio after each event (what result/b2/outcome_rate.csv holds)"""
+    ok, w = _ok_and_weight(outcome, weight)
+    return np.cumsum(w * ok) / np.cumsum(w)
+
+# === Breaker state intervals ===
+def state_intervals(trans_ts, trans_from, trans_to, end_ns: int = None, start_ns: int = None):
+    """
+    Half-open intervals [start, end) of each breaker state. The state before
+    the first transition is its `from` state when start_ns is given.
+    Returns dict of arrays start_ns, end_ns, state.
+    """
+    trans_ts = np.asarray(trans_ts, dtype=np.int64)
+    to = np.asarray(trans_to, dtype=np.int8)
+    if len(trans_ts) == 0:
+        return {"start_ns": np.empty(0, np.int64), "end_ns": np.empty(0, np.int64), "state": np.empty(0, np.int8)}
+    end = trans_ts[-1] if end_ns is None else max(int(end_ns), int(trans_ts[-1]))
+    starts, states = trans_ts, to
+    if start_ns is not None and start_ns < trans_ts[0]:
+        starts = np.concatenate(([start_ns], trans_ts))
+        states = np.concatenate(([np.asarray(trans_from, dtype=np.int8)[0]], to))
+    ends = np.concatenate((starts[1:], [end]))
+    return {"start_ns": starts, "end_ns": ends, "state": states}
+
+def dwell_times(intervals: dict) -> dict:
+    """Seconds and share of time spent in each state"""
+    durations = (intervals["end_ns"] - intervals["start_ns"]) / NS
+    states = intervals["state"].astype(np.int64)
+    valid = states >= 0
+    seconds = np.bincount(states[valid], weights=durations[valid], minlength=len(STATES))
+    total = seconds.sum()
+    return {
+        name: {"seconds": float(seconds[i]), "share": float(seconds[i] / total) if total else 0.0}
+        for i, name in enumerate(STATES)
+    }
+
+def outages(intervals: dict) -> dict:
+    """
+    Outages = maximal runs of non-CLOSED intervals. Returns start_ns, end_ns,
+    duration_s, recovered (False when the run reaches the end of the data),
+    and mttr_s = mean duration of the recovered outages.
+    """
+    state = intervals["state"]
+    down = state != CLOSED
+    if not down.any():
+        empty = np.empty(0)
+        return {"start_ns": empty.astype(np.int64), "end_ns": empty.astype(np.int64), "duration_s": empty,
+                "recovered": empty.astype(bool), "mttr_s": float("nan")}
+    prev_down = np.concatenate(([False], down[:-1]))
+    next_down = np.concatenate((down[1:], [False]))
+    first = down & ~prev_down
+    last = down & ~next_down
+    start = intervals["start_ns"][first]
+    end = intervals["end_ns"][last]
+    recovered = np.concatenate((~down[1:], [False]))[last]
+    duration = (end - start) / NS
+    return {
+        "start_ns": start,
+        "end_ns": end,
+        "duration_s": duration,
+        "recovered": recovered,
+        "mttr_s": float(duration[recovered].mean()) if recovered.any() else float("nan"),
+    }
+
+# === Plotting helpers (matplotlib imported by the caller) ===
+def to_datetime64(ns):
+    return np.asarray(ns, dtype=np.int64).astype("datetime64[ns]")
+
+def plot_state_spans(ax, intervals: dict, colors: dict, min_width_s: float = 0.0, **kwargs):
+    """Shade each state's intervals with one broken_barh call per state (full axis height)"""
+    import matplotlib.dates as mdates
+    start = mdates.date2num(to_datetime64(intervals["start_ns"]))
+    width_ns = np.maximum(intervals["end_ns"] - intervals["start_ns"], _ns(min_width_s))
+    width = width_ns / (86400 * NS)  # date2num units are days
+    for code, name in enumerate(STATES):
+        if name not in colors:
+            continue
+        mask = intervals["state"] == code
+        if not mask.any():
+            continue
+        color, alpha = colors[name]
+        ax.broken_barh(np.column_stack((start[mask], width[mask])), (0, 1), facecolors=color, alpha=alpha,
+                       transform=ax.get_xaxis_transform(), zorder=-1, label=name, **kwargs)
+
+def summarize(path: str) -> dict:
+    """Dwell times, outages/MTTR and overall success rate of one client log"""
+    log = parse_log(path, kinds=("results", "transitions"))
+    res, tr = log.results, log.transitions
+    end = int(res.array("ts")[-1]) if len(res) else None
+    intervals = state_intervals(tr.array("ts"), tr.array("from"), tr.array("to"), end_ns=end)
+    out = outages(intervals)
+    ok, w = _ok_and_weight(res.array("outcome"), res.array("weight"))
+    return {
+        "requests": int(len(res)),
+        "success_rate": float((w * ok).sum() / w.sum()) if len(res) else None,
+        "dwell": dwell_times(intervals),
+        "outages": int(len(out["duration_s"])),
+        "mttr_s": out["mttr_s"],
+        "max_outage_s": float(out["duration_s"].max()) if len(out["duration_s"]) else 0.0,
+    }
+
+if __name__ == "__main__":
+    import sys
+    import json
+    for p in sys.argv[1:]:
+        print(json.dumps({"path": p, **summarize(p)}, indent=2))
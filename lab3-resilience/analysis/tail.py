@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+# Live view of a growing client log.
+#
+#   kubectl logs -f deployment/client -n lab3 > chaos_client.log &
+#   python -m analysis.tail chaos_client.log --window 30
+#   python -m analysis.tail chaos_client.log --json live.json --interval 2
+#
+# Only bytes appended since the last refresh are read and fed through the
+# logparse event parser, so each refresh costs O(new lines). Rotation (new
+# inode) and truncation (file shrank) restart from the top of the new file.
+# Aggregates are per-second buckets over the last --window seconds of log
+# time: success rate, retries/s, fast-fails and a log-bucket latency
+# histogram for p50/p99 (needs latency_ms= on result lines).
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from collections import deque
+
+from .logparse import OUTCOMES, STATES, iter_events
+
+NS = 1_000_000_000
+OK = OUTCOMES.index("ok")
+# Latency histogram: 5% wide buckets from 0.1 ms to ~10 min
+LAT_MIN_MS = 0.1
+LAT_GROWTH = math.log(1.05)
+LAT_BUCKETS = 320
+
+def _lat_bucket(ms: float) -> int:
+    if ms <= LAT_MIN_MS:
+        return 0
+    return min(LAT_BUCKETS - 1, int(math.log(ms / LAT_MIN_MS) / LAT_GROWTH) + 1)
+
+def _lat_value(bucket: int) -> float:
+    return LAT_MIN_MS * math.exp(LAT_GROWTH * bucket)
+
+class Second:
+    __slots__ = ("second", "ok", "total", "retries", "fast_fail", "latency")
+
+    def __init__(self, second: int):
+        self.second = second
+        self.ok = 0.0
+        self.total = 0.0
+        self.retries = 0
+        self.fast_fail = 0.0
+        self.latency = None  # sparse {bucket: weight}, allocated on first sample
+
+class LiveStats:
+    """Incremental aggregates over the last `window` seconds of log time"""
+
+    def __init__(self, window: int = 30):
+        self.window = window
+        self.seconds = deque()
+        self.state = None
+        self.state_since_ns = None
+        self.last_ns = None
+        self.transitions = 0
+        self.totals = {name: 0.0 for name in OUTCOMES}
+        self.total_retries = 0
+
+    def _bucket(self, ts: int) -> Second:
+        second = ts // NS
+        if self.seconds and second <= self.seconds[-1].second:
+            # Out-of-order line: find its bucket (almost always the last one)
+            for b in reversed(self.seconds):
+                if b.second == second:
+                    return b
+                if b.second < second:
+                    break
+            return self.seconds[-1]
+        b = Second(second)
+        self.seconds.append(b)
+        while self.seconds and self.seconds[0].second <= second - self.window:
+            self.seconds.popleft()
+        return b
+
+    def add(self, kind: str, values: tuple):
+        ts = values[0]
+        self.last_ns = ts if self.last_ns is None else max(self.last_ns, ts)
+        if kind == "results":
+            _, outcome, state, latency, weight = values
+            b = self._bucket(ts)
+            b.total += weight
+            self.totals[OUTCOMES[outcome]] += weight
+            if outcome == OK:
+                b.ok += weight
+            elif outcome == OUTCOMES.index("fast_fail"):
+                b.fast_fail += weight
+            if latency == latency:  # not nan
+                if b.latency is None:
+                    b.latency = {}
+                k = _lat_bucket(latency)
+                b.latency[k] = b.latency.get(k, 0.0) + weight
+            if self.state is None and state >= 0:
+                self.state = STATES[state]
+                self.state_since_ns = ts
+        elif kind == "transitions":
+            _, _, to = values
+            self.transitions += 1
+            if to >= 0:
+                self.state = STATES[to]
+                self.state_since_ns = ts
+        elif kind == "retries":
+            self._bucket(ts).retries += 1
+            self.total_retries += 1
+
+    def _percentiles(self, hist: dict, qs) -> dict:
+        total = sum(hist.values())
+        out = {}
+        if not total:
+            return {f"p{q:g}": None for q in qs}
+        keys = sorted(hist)
+        for q in qs:
+            rank = total * q / 100.0
+            seen = 0.0
+            for k in keys:
+                seen += hist[k]
+                if seen >= rank:
+                    out[f"p{q:g}"] = round(_lat_value(k), 2)
+                    break
+        return out
+
+    def snapshot(self) -> dict:
+        ok = total = fast_fail = 0.0
+        retries = 0
+        hist = {}
+        for b in self.seconds:
+            ok += b.ok
+            total += b.total
+            fast_fail += b.fast_fail
+            retries += b.retries
+            if b.latency:
+                for k, v in b.latency.items():
+                    hist[k] = hist.get(k, 0.0) + v
+        span = max(1, len(self.seconds) and self.seconds[-1].second - self.seconds[0].second + 1)
+        return {
+            "log_time": _fmt(self.last_ns),
+            "state": self.state,
+            "state_for_s": round((self.last_ns - self.state_since_ns) / NS, 1) if self.state_since_ns else None,
+            "window_s": self.window,
+            "requests": round(total),
+            "success_rate": round(ok / total, 4) if total else None,
+            "fast_fail_rate": round(fast_fail / total, 4) if total else None,
+            "retries_per_s": round(retries / span, 2),
+            "latency_ms": self._percentiles(hist, (50, 99)),
+            "transitions": self.transitions,
+            "totals": {k: round(v) for k, v in self.totals.items()},
+            "total_retries": self.total_retries,
+        }
+
+def _fmt(ns):
+    if ns is None:
+        return None
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ns // NS))
+
+class Follower:
+    """Yields complete lines appended to `path`, surviving rotation and truncation"""
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = path
+        self.from_start = from_start
+        self._f = None
+        self._inode = None
+        self._partial = b""
+
+    def _open(self, at_end: bool):
+        if self._f:
+            self._f.close()
+        self._f = open(self.path, "rb")
+        self._inode = os.fstat(self._f.fileno()).st_ino
+        self._partial = b""
+        if at_end:
+            self._f.seek(0, os.SEEK_END)
+
+    def read_new(self) -> list:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._f is None:
+            self._open(at_end=not self.from_start)
+        elif st.st_ino != self._inode or st.st_size < self._f.tell():
+            # Rotated or truncated: the new content starts at offset 0
+            self._open(at_end=False)
+        data = self._f.read()
+        if not data:
+            return []
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()  # incomplete last line, finished on a later read
+        return lines
+
+    def close(self):
+        if self._f:
+            self._f.close()
+
+def render(snap: dict) -> str:
+    lat = snap["latency_ms"]
+    rate = "n/a" if snap["success_rate"] is None else f"{snap['success_rate'] * 100:5.1f}%"
+    ff = "n/a" if snap["fast_fail_rate"] is None else f"{snap['fast_fail_rate'] * 100:5.1f}%"
+    return "\n".join([
+        f"log time      {snap['log_time']}",
+        f"breaker       {snap['state']}  (for {snap['state_for_s']}s, {snap['transitions']} transitions)",
+        f"last {snap['window_s']}s       {snap['requests']} requests  success {rate}  fast-fail {ff}",
+        f"retries/s     {snap['retries_per_s']}",
+        f"latency ms    p50 {lat.get('p50')}  p99 {lat.get('p99')}",
+        f"totals        {snap['totals']}  retries={snap['total_retries']}",
+    ])
+
+def write_json(path: str, snap: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snap, f, indent=2)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Follow a client log and show live resilience stats")
+    p.add_argument("log")
+    p.add_argument("--window", type=int, default=30, help="seconds of log time aggregated")
+    p.add_argument("--interval", type=float, default=1.0, help="refresh period (seconds)")
+    p.add_argument("--from-start", action="store_true", help="read the existing content first")
+    p.add_argument("--json", default=None, help="also write each snapshot to this file")
+    p.add_argument("--once", action="store_true", help="read what is there, print one snapshot and exit")
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    follower = Follower(args.log, from_start=args.from_start or args.once)
+    stats = LiveStats(window=args.window)
+    try:
+        while True:
+            for kind, values in iter_events(follower.read_new()):
+                stats.add(kind, values)
+            snap = stats.snapshot()
+            if args.json:
+                write_json(args.json, snap)
+            if args.once:
+                print(json.dumps(snap, indent=2))
+                return 0
+            sys.stdout.write("\033[H\033[J" + render(snap) + "\n")
+            sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        follower.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
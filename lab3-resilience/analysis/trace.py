@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# Build backend replay traces (backend_service/faults.py) from recorded runs.
+#
+#   python -m analysis.trace result/c/chaos_client.log traces/chaos.csv
+#   python -m analysis.trace /tmp/events.bin traces/run.csv
+#   REPLAY_TRACE=traces/chaos.csv REPLAY_SPEED=4 uvicorn main:app --port 8000
+#
+# One trace entry per request the backend saw, at its offset from the first:
+#   client log  - every httpx "HTTP Request" line gives a 200/500 as answered;
+#                 "timed out" results become 504 entries that hold the
+#                 response past the client's read timeout (placed read_timeout
+#                 earlier, when the request was sent); connection errors
+#                 (pod down) become 503. Log lines carry no per-attempt
+#                 latency, so answered requests replay without delay.
+#   event file  - calls are expanded into their attempts: failed attempts
+#                 before the last are 500s; a single-attempt ok call keeps
+#                 its measured latency. Fast-fails never reached the backend
+#                 and are skipped.
+
+import os
+import sys
+import argparse
+import numpy as np
+
+from .logparse import OUTCOME_CODE, parse_log
+
+NS = 1_000_000_000
+STATUS = {"ok": 200, "5xx": 500, "timeout": 504, "error": 503}
+
+def _build(ts, status, delay_ms) -> dict:
+    ts = np.asarray(ts, dtype=np.int64)
+    order = np.argsort(ts, kind="stable")
+    ts = ts[order]
+    return {
+        "offset_s": (ts - ts[0]) / NS if len(ts) else np.empty(0),
+        "status": np.asarray(status, dtype=np.int16)[order],
+        "delay_ms": np.asarray(delay_ms, dtype=np.float64)[order],
+    }
+
+def from_log(path: str, read_timeout: float = 2.0, hold_ms: float = None) -> dict:
+    """Trace of a client log: answered requests, timeouts and connection errors"""
+    hold_ms = (read_timeout + 1.0) * 1000.0 if hold_ms is None else hold_ms
+    log = parse_log(path, kinds=("requests", "results"))
+    req, res = log.requests, log.results
+    outcome = res.array("outcome")
+    res_ts = res.array("ts")
+    timeouts = res_ts[outcome == OUTCOME_CODE["timeout"]] - int(read_timeout * NS)
+    errors = res_ts[outcome == OUTCOME_CODE["error"]]
+    ts = np.concatenate((req.array("ts"), timeouts, errors))
+    status = np.concatenate((req.array("status"), np.full(len(timeouts), 504), np.full(len(errors), 503)))
+    delay = np.concatenate((np.zeros(len(req)), np.full(len(timeouts), hold_ms), np.zeros(len(errors))))
+    return _build(ts, status, delay)
+
+def from_events(path: str, hold_ms: float = 3000.0) -> dict:
+    """Trace of an EVENTS_PATH file or event store: every attempt of every call"""
+    from .eventstore import load
+    store = load(path)
+    outcome = np.asarray(store["outcome"]).astype(np.int64)
+    attempts = np.maximum(np.asarray(store["attempts"]).astype(np.int64), 1)
+    sent = np.isin(outcome, [OUTCOME_CODE[name] for name in STATUS])
+    ts, outcome, attempts = np.asarray(store["ts"])[sent], outcome[sent], attempts[sent]
+    latency = np.asarray(store["latency_ms"], dtype=np.float64)[sent]
+    # One row per attempt; only the last attempt of a call has the call's outcome
+    call = np.repeat(np.arange(len(ts)), attempts)
+    last = np.concatenate((call[1:] != call[:-1], [True])) if len(call) else np.empty(0, bool)
+    code_to_status = np.zeros(len(OUTCOME_CODE), dtype=np.int16)
+    for name, code in STATUS.items():
+        code_to_status[OUTCOME_CODE[name]] = code
+    status = np.where(last, code_to_status[outcome[call]], 500)
+    # Attempts of one call share its timestamp; spread them 1 ms apart to keep their order
+    within = np.arange(len(call)) - np.repeat(np.cumsum(attempts) - attempts, attempts)
+    single_ok = last & (attempts[call] == 1) & (status == 200)
+    delay = np.where(single_ok, np.nan_to_num(latency[call]), 0.0)
+    delay = np.where(status == 504, hold_ms, delay)
+    return _build(ts[call] + within * 1_000_000, status, delay)
+
+def load(path: str, read_timeout: float = 2.0) -> dict:
+    """Trace of a client log, EVENTS_PATH .bin file or event store directory"""
+    if os.path.isdir(path) or path.endswith(".bin"):
+        return from_events(path, hold_ms=(read_timeout + 1.0) * 1000.0)
+    return from_log(path, read_timeout=read_timeout)
+
+def write_csv(trace: dict, out: str, source: str = ""):
+    with open(out, "w") as f:
+        if source:
+            f.write(f"# replay trace from {source}\n")
+        f.write("offset_s,status,delay_ms\n")
+        for offset, status, delay in zip(trace["offset_s"], trace["status"], trace["delay_ms"]):
+            f.write(f"{offset:.3f},{status},{delay:.0f}\n")
+
+def summary(trace: dict) -> dict:
+    statuses, counts = np.unique(trace["status"], return_counts=True)
+    return {
+        "entries": int(len(trace["status"])),
+        "seconds": round(float(trace["offset_s"][-1]), 3) if len(trace["offset_s"]) else 0.0,
+        "status": {int(s): int(c) for s, c in zip(statuses, counts)},
+    }
+
+def main(argv):
+    p = argparse.ArgumentParser(description="Convert a client log or event file into a backend replay trace")
+    p.add_argument("source", help="client log, EVENTS_PATH .bin file or event store directory")
+    p.add_argument("out", help="trace CSV to write (REPLAY_TRACE)")
+    p.add_argument("--read-timeout", type=float, default=2.0, help="client HTTP_READ_TIMEOUT of the run")
+    args = p.parse_args(argv)
+    trace = load(args.source, read_timeout=args.read_timeout)
+    write_csv(trace, args.out, source=args.source)
+    print(summary(trace))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
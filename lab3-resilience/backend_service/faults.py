@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+# Where /work gets its behavior from: independent random draws (the default),
+# a scripted fault profile (FAULT_PROFILE) or a recorded trace (REPLAY_TRACE).
+#
+# Fault profiles are JSON: a list of phases, each with a duration, a failure
+# rate (optionally ramped to failure_rate_end), the status failures return,
+# a latency distribution and Gilbert-Elliott error bursts:
+#   {"loop": true, "seed": 7, "phases": [
+#     {"name": "healthy", "duration_s": 60, "failure_rate": 0.01,
+#      "latency": {"dist": "lognormal", "median_ms": 20, "sigma": 0.5}},
+#     {"name": "brownout", "duration_s": 30, "failure_rate": 0.2,
+#      "latency": {"dist": "bimodal", "fast_ms": 20, "slow_ms": 1500, "slow_p": 0.3},
+#      "bursts": {"p_enter": 0.05, "p_exit": 0.3, "failure_rate": 0.95}},
+#     {"name": "down", "duration_s": 20, "failure_rate": 1.0, "status": 503},
+#     {"name": "recovery", "duration_s": 60, "failure_rate": 0.6, "failure_rate_end": 0.01}]}
+# Latency dists: none, fixed (ms), uniform (min_ms, max_ms), lognormal
+# (median_ms, sigma), exponential (mean_ms), bimodal (fast_ms, slow_ms,
+# slow_p, sigma); every dist takes "p" (share of requests delayed at all)
+# and "max_ms" (cap). Everything is compiled to closures at load time, so a
+# request costs a phase check, a few random() calls and no dict lookups.
+#
+# Trace files are CSV with a header, '#' lines are comments:
+#   offset_s,status,delay_ms
+#   0.000,200,0
+#   0.412,500,0
+#   3.105,504,3000
+# (analysis/trace.py builds them from client logs and event files.)
+#
+# REPLAY_MODE=time serves each request the entry recorded at the same
+# offset since the replay started (scaled by REPLAY_SPEED), so the failure
+# timeline is identical whatever the client sends. REPLAY_MODE=sequence
+# serves entries strictly in order, one per request. Delays are divided by
+# REPLAY_SPEED in both modes.
+
+import csv
+import math
+import time
+import random
+import bisect
+import threading
+
+class RandomFaults:
+    """Independent draws per request: FAILURE_RATE / SLOW_RATE / MAX_DELAY_MS"""
+
+    def __init__(self, failure_rate: float, slow_rate: float, max_delay_ms: int):
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.max_delay_ms = max_delay_ms
+
+    def draw(self):
+        """(delay_seconds, status)"""
+        delay = 0.0
+        # Maybe add latency: random delay up to MAX_DELAY_MS
+        if random.random() < self.slow_rate:
+            delay = random.randint(0, self.max_delay_ms) / 1000.0
+        # Maybe fail
+        fail = random.random() < self.failure_rate
+        return delay, 500 if fail else 200
+
+    def snapshot(self) -> dict:
+        return {
+            "source": "random",
+            "failure_rate": self.failure_rate,
+            "slow_rate": self.slow_rate,
+            "max_delay_ms": self.max_delay_ms,
+        }
+
+# === Fault profiles ===
+def latency_sampler(spec: dict, rng: random.Random):
+    """Compile a latency spec into a zero-argument function returning seconds"""
+    dist = spec.get("dist", "none")
+    if dist == "none":
+        return lambda: 0.0
+    if dist == "fixed":
+        ms = float(spec["ms"])
+        sample = lambda: ms
+    elif dist == "uniform":
+        lo, hi = float(spec.get("min_ms", 0)), float(spec["max_ms"])
+        sample = lambda: rng.uniform(lo, hi)
+    elif dist == "lognormal":
+        mu, sigma = math.log(float(spec["median_ms"])), float(spec.get("sigma", 0.5))
+        sample = lambda: rng.lognormvariate(mu, sigma)
+    elif dist == "exponential":
+        rate = 1.0 / float(spec["mean_ms"])
+        sample = lambda: rng.expovariate(rate)
+    elif dist == "bimodal":
+        sigma = float(spec.get("sigma", 0.25))
+        fast_mu, slow_mu = math.log(float(spec["fast_ms"])), math.log(float(spec["slow_ms"]))
+        slow_p = float(spec.get("slow_p", 0.1))
+        sample = lambda: rng.lognormvariate(slow_mu if rng.random() < slow_p else fast_mu, sigma)
+    else:
+        raise ValueError(f"Unknown latency dist {dist!r}, valid dists: none, fixed, uniform, "
+                         f"lognormal, exponential, bimodal")
+    p = float(spec.get("p", 1.0))
+    cap = float(spec.get("max_ms", math.inf))
+    if p >= 1.0:
+        return lambda: min(sample(), cap) / 1000.0
+    return lambda: min(sample(), cap) / 1000.0 if rng.random() < p else 0.0
+
+class Phase:
+    """One compiled profile phase covering [start, end) seconds of the profile"""
+    __slots__ = ("name", "start", "end", "failure_rate", "ramp", "status", "latency",
+                 "p_enter", "p_exit", "burst_failure_rate")
+
+    def __init__(self, spec: dict, start: float, rng: random.Random):
+        self.name = spec.get("name", f"phase@{start:g}s")
+        duration = float(spec["duration_s"])
+        if duration <= 0:
+            raise ValueError(f"phase {self.name}: duration_s must be > 0")
+        self.start = start
+        self.end = start + duration
+        self.failure_rate = float(spec.get("failure_rate", 0.0))
+        end_rate = float(spec.get("failure_rate_end", self.failure_rate))
+        # Failure rate rises/falls linearly over the phase when failure_rate_end is set
+        self.ramp = (end_rate - self.failure_rate) / duration
+        self.status = int(spec.get("status", 500))
+        if not 400 <= self.status <= 599:
+            raise ValueError(f"phase {self.name}: status must be 4xx/5xx")
+        self.latency = latency_sampler(spec.get("latency", {}), rng)
+        bursts = spec.get("bursts") or {}
+        self.p_enter = float(bursts.get("p_enter", 0.0))
+        self.p_exit = float(bursts.get("p_exit", 1.0))
+        self.burst_failure_rate = float(bursts.get("failure_rate", 1.0))
+
+class FaultProfile:
+    """Scripted, time-varying faults; the clock starts at the first request (or reset())"""
+
+    def __init__(self, profile: dict, name: str = "profile", clock=time.monotonic):
+        phases = profile.get("phases") or []
+        if not phases:
+            raise ValueError("fault profile needs at least one phase")
+        self.name = name
+        self.loop = bool(profile.get("loop", True))
+        self.clock = clock
+        self.rng = random.Random(profile.get("seed"))
+        self.phases = []
+        start = 0.0
+        for spec in phases:
+            phase = Phase(spec, start, self.rng)
+            self.phases.append(phase)
+            start = phase.end
+        self.total = start
+        self.ends = [phase.end for phase in self.phases]
+        self._lock = threading.Lock()  # draw() runs on threadpool workers with BACKEND_ASYNC=false
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path: str, clock=time.monotonic) -> "FaultProfile":
+        import json
+        with open(path) as f:
+            return cls(json.load(f), name=path, clock=clock)
+
+    def reset(self):
+        with self._lock:
+            self.started = None
+            self.phase = self.phases[0]
+            self.in_burst = False
+            self.served = 0
+            self.failed = 0
+
+    def _phase_at(self, t: float) -> Phase:
+        phase = self.phase
+        if phase.start <= t < phase.end:
+            return phase
+        # Phase changed: one binary search, then cached until the next boundary
+        phase = self.phase = self.phases[min(bisect.bisect_right(self.ends, t), len(self.phases) - 1)]
+        return phase
+
+    def elapsed(self) -> float:
+        """Seconds into the profile (wrapped when looping, held in the last phase otherwise)"""
+        if self.started is None:
+            return 0.0
+        t = self.clock() - self.started
+        if t >= self.total:
+            t = t % self.total if self.loop else self.total - 1e-9
+        return t
+
+    def draw(self):
+        """(delay_seconds, status)"""
+        with self._lock:
+            if self.started is None:
+                self.started = self.clock()
+            t = self.elapsed()
+            phase = self._phase_at(t)
+            rng = self.rng.random
+            # Gilbert-Elliott: a two-state chain per request makes failures come in runs
+            if self.in_burst:
+                self.in_burst = rng() >= phase.p_exit
+            elif phase.p_enter:
+                self.in_burst = rng() < phase.p_enter
+            if self.in_burst:
+                rate = phase.burst_failure_rate
+            else:
+                rate = phase.failure_rate + phase.ramp * (t - phase.start) if phase.ramp else phase.failure_rate
+            self.served += 1
+            delay = phase.latency()
+            if rng() < rate:
+                self.failed += 1
+                return delay, phase.status
+            return delay, 200
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            t = self.elapsed()
+            phase = self._phase_at(t)
+            return {
+                "source": "profile",
+                "name": self.name,
+                "loop": self.loop,
+                "phases": [p.name for p in self.phases],
+                "cycle_s": self.total,
+                "elapsed_s": round(t, 3) if self.started is not None else None,
+                "phase": phase.name,
+                "phase_left_s": round(phase.end - t, 3),
+                "in_burst": self.in_burst,
+                "served": self.served,
+                "failed": self.failed,
+            }
+
+# === Trace replay ===
+def load_trace(path: str):
+    """Read a trace CSV into sorted (offsets from 0, statuses, delays) lists"""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(line for line in f if line.strip() and not line.startswith("#")))
+    if not rows:
+        raise ValueError(f"trace {path} has no entries")
+    rows.sort(key=lambda row: float(row["offset_s"]))
+    first = float(rows[0]["offset_s"])
+    offsets = [float(row["offset_s"]) - first for row in rows]
+    statuses = [int(row["status"]) for row in rows]
+    delays = [float(row.get("delay_ms") or 0) / 1000.0 for row in rows]
+    for status in statuses:
+        if not 100 <= status <= 599:
+            raise ValueError(f"trace {path}: invalid status {status}")
+    return offsets, statuses, delays
+
+class TraceReplay:
+    """Plays a recorded trace back; the clock starts at the first request (or reset())"""
+
+    def __init__(self, path: str, mode: str = "time", speed: float = 1.0, loop: bool = True,
+                 clock=time.monotonic):
+        if mode not in ("time", "sequence"):
+            raise ValueError(f"Unknown replay mode {mode!r}, valid modes: time, sequence")
+        if speed <= 0:
+            raise ValueError("REPLAY_SPEED must be > 0")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock
+        self.offsets, self.statuses, self.delays = load_trace(path)
+        n = len(self.offsets)
+        # One mean gap after the last entry before a looped trace starts over
+        self.period = (self.offsets[-1] + self.offsets[-1] / max(1, n - 1)) or 1.0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = None
+            self.next_index = 0
+            self.served = 0
+            self.passes = 0
+
+    def _index(self) -> int:
+        """Trace entry for the current request, -1 once a non-looping trace is over"""
+        n = len(self.offsets)
+        now = self.clock()
+        if self.started is None:
+            self.started = now
+        if self.mode == "sequence":
+            i = self.next_index
+            self.next_index += 1
+            if i >= n and not self.loop:
+                return -1
+            self.passes = i // n
+            return i % n
+        t = (now - self.started) * self.speed
+        if t >= self.period:
+            if not self.loop:
+                return -1
+            self.passes = int(t // self.period)
+            t %= self.period
+        # Latest entry recorded at or before t
+        return max(0, bisect.bisect_right(self.offsets, t) - 1)
+
+    def draw(self):
+        """(delay_seconds, status); a finished non-looping trace answers 200 at once"""
+        with self._lock:
+            i = self._index()
+            self.served += 1
+        if i < 0:
+            return 0.0, 200
+        return self.delays[i] / self.speed, self.statuses[i]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = None if self.started is None else round(self.clock() - self.started, 3)
+            return {
+                "source": "trace",
+                "path": self.path,
+                "mode": self.mode,
+                "speed": self.speed,
+                "loop": self.loop,
+                "entries": len(self.offsets),
+                "trace_seconds": round(self.offsets[-1], 3),
+                "served": self.served,
+                "passes": self.passes,
+                "elapsed_s": elapsed,
+                "next_index": self.next_index if self.mode == "sequence" else None,
+            }
@@ -4,25 +4,174 @@
 #   FAILURE_RATE: float in [0,1], probability of HTTP 500
 #   MAX_DELAY_MS: int, max random latency in milliseconds
 #   SLOW_RATE: float in [0,1], probability to add latency
+#   BACKEND_ASYNC: "true" (default) serves /work from the event loop with
+#                  asyncio.sleep; "false" restores the threadpool handler
+#   FAULT_PROFILE: path of a JSON fault profile (phases, latency distributions,
+#                  error bursts; see faults.py) used instead of the random draws;
+#                  POST /admin/faults swaps it at runtime (files under profiles/ only)
+#   REPLAY_TRACE: path of a recorded trace (analysis/trace.py) to play back
+#                 instead of the random draws above
+#   REPLAY_MODE: "time" (entry at the same offset) or "sequence" (one per request)
+#   REPLAY_SPEED: float, >1 plays the trace (and its delays) faster
+#   REPLAY_LOOP: "true" (default) starts over at the end; "false" answers 200 after it
+#   BATCH_MAX_ITEMS: int, largest POST /work/batch accepted (default 1000)
+# A request carrying X-Request-Timeout-Ms (the caller's remaining deadline) is
+# answered 504 at once when its injected delay would outlast that budget.
 
 import os
-import random
 import time
-from fastapi import FastAPI, Response
+import asyncio
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Response
+from faults import RandomFaults, FaultProfile, TraceReplay
 
 app = FastAPI()
 
 FAILURE_RATE = float(os.getenv("FAILURE_RATE", "0.2"))
 SLOW_RATE = float(os.getenv("SLOW_RATE", "0.3"))
 MAX_DELAY_MS = int(os.getenv("MAX_DELAY_MS", "800"))
+BACKEND_ASYNC = os.getenv("BACKEND_ASYNC", "true").lower() == "true"
+FAULT_PROFILE = os.getenv("FAULT_PROFILE", "")
+REPLAY_TRACE = os.getenv("REPLAY_TRACE", "")
+REPLAY_MODE = os.getenv("REPLAY_MODE", "time").lower()
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1.0"))
+REPLAY_LOOP = os.getenv("REPLAY_LOOP", "true").lower() == "true"
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+PROFILES_DIR = Path(__file__).resolve().parent / "profiles"
 
-@app.get("/work")
-def work():
-    # Maybe add latency
-    if random.random() < SLOW_RATE:
-        # Add random delay up to MAX_DELAY_MS
-        time.sleep(random.randint(0, MAX_DELAY_MS) / 1000.0)
-    # Maybe fail
-    if random.random() < FAILURE_RATE:
-        return Response(content="backend error", status_code=500)
+if REPLAY_TRACE:
+    faults = TraceReplay(REPLAY_TRACE, mode=REPLAY_MODE, speed=REPLAY_SPEED, loop=REPLAY_LOOP)
+elif FAULT_PROFILE:
+    faults = FaultProfile.from_file(FAULT_PROFILE)
+else:
+    faults = RandomFaults(FAILURE_RATE, SLOW_RATE, MAX_DELAY_MS)
+
+def draw_fault():
+    """Draw (delay_seconds, status) with the same source for both modes"""
+    return faults.draw()
+
+def past_deadline(delay: float, timeout_ms: Optional[float]) -> bool:
+    """The caller gives up before the injected delay ends"""
+    return timeout_ms is not None and delay * 1000.0 >= timeout_ms
+
+def deadline_response():
+    return Response(content="deadline exceeded", status_code=504)
+
+def make_response(status: int):
+    if status >= 400:
+        return Response(content="backend error", status_code=status)
     return {"ok": True, "ts": time.time()}
+
+if BACKEND_ASYNC:
+    @app.get("/work")
+    async def work(x_request_timeout_ms: Optional[float] = Header(None)):
+        # Awaiting the delay keeps the event loop free, so thousands of
+        # slow requests can be in flight without exhausting the threadpool
+        delay, status = draw_fault()
+        if past_deadline(delay, x_request_timeout_ms):
+            return deadline_response()
+        if delay:
+            await asyncio.sleep(delay)
+        return make_response(status)
+else:
+    @app.get("/work")
+    def work(x_request_timeout_ms: Optional[float] = Header(None)):
+        # Sync handler: each slow request holds one threadpool worker
+        delay, status = draw_fault()
+        if past_deadline(delay, x_request_timeout_ms):
+            return deadline_response()
+        if delay:
+            time.sleep(delay)
+        return make_response(status)
+
+# === Batched work ===
+# POST /work/batch {"items": [{}, {"timeout_ms": 250}, ...]} draws a fault per
+# item and answers {"results": [{"status": 200, "ok": true, "ts": ...},
+# {"status": 500, "error": "backend error"}, ...]} in item order. Items are
+# worked on side by side, so the batch takes as long as its slowest kept item;
+# an item whose timeout_ms ends before that is answered 504.
+def plan_batch(body: dict):
+    """(delay_seconds, per-item results) for one batch"""
+    items = body.get("items")
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise HTTPException(status_code=400, detail='expected {"items": [{...}, ...]}')
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX_ITEMS} items per batch")
+    draws = [draw_fault() for _ in items]
+    kept = [delay for (delay, _), item in zip(draws, items) if not past_deadline(delay, item.get("timeout_ms"))]
+    delay = max(kept, default=0.0)
+    now = time.time()
+    results = []
+    for (_, status), item in zip(draws, items):
+        if past_deadline(delay, item.get("timeout_ms")):
+            results.append({"status": 504, "error": "deadline exceeded"})
+        elif status >= 400:
+            results.append({"status": status, "error": "backend error"})
+        else:
+            results.append({"status": 200, "ok": True, "ts": now + delay})
+    return delay, {"results": results}
+
+if BACKEND_ASYNC:
+    @app.post("/work/batch")
+    async def work_batch(body: dict):
+        delay, response = plan_batch(body)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+else:
+    @app.post("/work/batch")
+    def work_batch(body: dict):
+        delay, response = plan_batch(body)
+        if delay:
+            time.sleep(delay)
+        return response
+
+# === Fault source control ===
+@app.get("/admin/faults")
+def fault_source():
+    return faults.snapshot()
+
+def profile_path(path: str) -> str:
+    """`path` (relative to this service) resolved, if it names a file under profiles/"""
+    resolved = (PROFILES_DIR.parent / path).resolve()
+    if not resolved.is_relative_to(PROFILES_DIR):
+        raise ValueError(f"{path!r} is outside profiles/")
+    return str(resolved)
+
+@app.post("/admin/faults")
+def set_fault_source(body: dict):
+    """
+    Swap the fault source without a restart: a profile ({"phases": [...]}),
+    a file under profiles/ ({"path": "profiles/incident.json"}) or {"source": "random"}
+    """
+    global faults
+    try:
+        if "phases" in body:
+            new = FaultProfile(body, name=body.get("name", "posted"))
+        elif "path" in body:
+            new = FaultProfile.from_file(profile_path(body["path"]))
+        elif body.get("source") == "random":
+            new = RandomFaults(FAILURE_RATE, SLOW_RATE, MAX_DELAY_MS)
+        else:
+            raise ValueError('expected "phases", "path" or {"source": "random"}')
+    except (ValueError, KeyError, TypeError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"invalid fault source: {e}")
+    faults = new  # requests already past draw_fault() keep their draw
+    return faults.snapshot()
+
+@app.post("/admin/faults/reset")
+def reset_fault_source():
+    """Restart a profile or trace from its beginning"""
+    if not hasattr(faults, "reset"):
+        raise HTTPException(status_code=409, detail="the random fault source has no timeline")
+    faults.reset()
+    return faults.snapshot()
+
+@app.post("/admin/replay/reset")
+def reset_replay():
+    """Restart the trace from its first entry, so the next run sees the same sequence"""
+    if not isinstance(faults, TraceReplay):
+        raise HTTPException(status_code=409, detail="no trace loaded (REPLAY_TRACE is empty)")
+    faults.reset()
+    return faults.snapshot()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Fault profiles (faults.py) on a fake clock with fixed seeds.
+#
+#   cd backend_service && python -m pytest -q test_faults.py
+
+import pytest
+
+from faults import FaultProfile
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def profile(clock, loop=True, seed=7):
+    return FaultProfile({"loop": loop, "seed": seed, "phases": [
+        {"name": "healthy", "duration_s": 10, "failure_rate": 0.0},
+        {"name": "down", "duration_s": 5, "failure_rate": 1.0, "status": 503,
+         "latency": {"dist": "fixed", "ms": 250}},
+        {"name": "recovery", "duration_s": 10, "failure_rate": 1.0, "failure_rate_end": 0.0},
+    ]}, clock=clock)
+
+def test_phase_follows_the_clock_from_the_first_request():
+    clock = FakeClock()
+    faults = profile(clock)
+    clock.now += 100  # the profile starts at the first draw, not at load
+    assert faults.draw() == (0.0, 200)
+    clock.now += 10
+    assert faults.draw() == (0.25, 503)
+    assert faults.snapshot()["phase"] == "down"
+    clock.now += 4.9
+    assert faults.snapshot()["phase"] == "down"
+    clock.now += 0.1
+    assert faults.snapshot()["phase"] == "recovery"
+
+def test_profile_loops_or_holds_the_last_phase():
+    clock = FakeClock()
+    looping, held = profile(clock), profile(clock, loop=False)
+    looping.draw(), held.draw()
+    clock.now += 25 + 12
+    assert looping.snapshot()["phase"] == "down"
+    assert held.snapshot()["phase"] == "recovery"
+    looping.reset()
+    assert looping.snapshot()["elapsed_s"] is None
+    assert looping.snapshot()["served"] == 0
+
+def test_ramp_moves_the_failure_rate_across_the_phase():
+    clock = FakeClock()
+    faults = profile(clock, loop=False)
+    faults.draw()
+    clock.now += 15.5
+    early = sum(faults.draw()[1] != 200 for _ in range(2000)) / 2000
+    clock.now += 8.5
+    late = sum(faults.draw()[1] != 200 for _ in range(2000)) / 2000
+    assert early > 0.85
+    assert late < 0.15
+
+def bursty(seed):
+    return FaultProfile({"seed": seed, "phases": [
+        {"duration_s": 60, "failure_rate": 0.0, "bursts": {"p_enter": 0.1, "p_exit": 0.5, "failure_rate": 1.0}},
+    ]}, clock=FakeClock())
+
+def failure_runs(statuses):
+    runs, length = [], 0
+    for status in statuses:
+        if status != 200:
+            length += 1
+        elif length:
+            runs.append(length)
+            length = 0
+    return runs
+
+def test_gilbert_elliott_failures_come_in_bursts():
+    faults = bursty(seed=3)
+    statuses = [faults.draw()[1] for _ in range(20000)]
+    runs = failure_runs(statuses)
+    # Stationary share p_enter / (p_enter + p_exit) = 1/6, mean run 1 / p_exit = 2
+    assert sum(runs) / len(statuses) == pytest.approx(1 / 6, abs=0.02)
+    assert sum(runs) / len(runs) == pytest.approx(2.0, abs=0.2)
+    assert faults.snapshot()["failed"] == sum(status != 200 for status in statuses)
+
+def test_same_seed_same_sequence():
+    a, b, c = bursty(seed=11), bursty(seed=11), bursty(seed=12)
+    seq_a = [a.draw() for _ in range(500)]
+    assert seq_a == [b.draw() for _ in range(500)]
+    assert seq_a != [c.draw() for _ in range(500)]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# /work deadline handling (X-Request-Timeout-Ms) against a scripted fault profile.
+#
+#   cd backend_service && python -m pytest -q test_main.py
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from faults import FaultProfile
+
+@pytest.fixture
+def client(monkeypatch):
+    # Every request: 300 ms of latency, then 200
+    slow = FaultProfile({"phases": [{"duration_s": 60, "latency": {"dist": "fixed", "ms": 300}}]})
+    monkeypatch.setattr(main, "faults", slow)
+    return TestClient(main.app)
+
+def test_504_at_once_when_the_delay_outlasts_the_deadline(client):
+    start = time.monotonic()
+    r = client.get("/work", headers={"X-Request-Timeout-Ms": "100"})
+    assert r.status_code == 504
+    assert time.monotonic() - start < 0.2
+
+def test_served_when_the_deadline_leaves_room(client):
+    r = client.get("/work", headers={"X-Request-Timeout-Ms": "1000"})
+    assert r.status_code == 200
+    assert client.get("/work").status_code == 200
+
+def test_batch_items_past_their_deadline_get_504(client):
+    r = client.post("/work/batch", json={"items": [{}, {"timeout_ms": 100}, {"timeout_ms": 1000}]})
+    assert r.status_code == 200
+    assert [item["status"] for item in r.json()["results"]] == [200, 504, 200]
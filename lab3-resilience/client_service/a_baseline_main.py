@@ -6,19 +6,25 @@
 
 from fastapi import FastAPI
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
 app = FastAPI()
 
 BACKEND_URL = "http://backend:8000/process"
 
+# One session keeps TCP connections alive between calls instead of
+# opening a new connection for every request
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
 
 @app.get("/call-backend")
 def call_backend():
     """Call backend directly without retry or circuit breaker"""
     start = time.time()
     try:
-        response = requests.get(BACKEND_URL, timeout=2)  # direct call
+        response = session.get(BACKEND_URL, timeout=(2, 2))  # direct call (connect, read)
         latency = round(time.time() - start, 3)
         return {
             "state": "success",
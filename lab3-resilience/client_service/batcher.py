@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Client-side micro-batching: concurrent calls to one compartment are gathered
+# for up to `linger` seconds (or until `max_batch` items) and sent as a single
+# POST /work/batch; each caller gets its own item's result back.
+#
+# Callers still go through the breaker and tenacity one item at a time
+# (fetch_with_retry submits a single item), so a failed item is counted and
+# retried on its own and simply joins a later batch. A failed batch request
+# (5xx, timeout, connection error) fails every item in it.
+
+import asyncio
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into one send_batch(items) call"""
+
+    def __init__(self, send_batch, max_batch: int = 32, linger: float = 0.002):
+        self.send_batch = send_batch  # async (items) -> results, one per item, in order
+        self.max_batch = max(1, max_batch)
+        self.linger = linger
+        self._items = []
+        self._futures = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.full_batches = 0
+
+    async def submit(self, item: dict) -> dict:
+        """Queue `item` for the next batch and return its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.max_batch:
+            self.full_batches += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (cancelled, e.g. by their deadline) are not sent
+        pending = [(i, f) for i, f in zip(self._items, self._futures) if not f.done()]
+        self._items, self._futures = [], []
+        if not pending:
+            return
+        task = asyncio.ensure_future(self._send(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, pending: list):
+        items = [item for item, _ in pending]
+        self.batches += 1
+        self.items += len(items)
+        try:
+            results = await self.send_batch(items)
+            if len(results) != len(items):
+                raise ValueError(f"batch of {len(items)} items answered with {len(results)} results")
+        except Exception as e:
+            self.failed_batches += 1
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "linger_ms": self.linger * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "full_batches": self.full_batches,
+            "failed_batches": self.failed_batches,
+            "queued": len(self._items),
+            "in_flight": len(self._tasks),
+        }
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# Microbenchmarks for the client's per-call overhead, with the network taken out.
+#
+#   python bench.py                          # every case
+#   python bench.py -k open -k sliding       # cases whose name contains any filter
+#   python bench.py --out base.json          # keep the numbers
+#   python bench.py --compare base.json      # exit 1 if a case got slower than --tolerance
+#
+# Every request goes to an httpx.MockTransport answering from a fixed status
+# cycle, so the numbers are the resilience stack itself: breaker lock and
+# listener dispatch, tenacity's retry loop, LogTransitions / TransitionCounter
+# and the result logging.
+#
+# async/<stack>/<path>   - one task calling back to back, us per call
+#   raw       http.get only (httpx + mock transport floor)
+#   tenacity  retry decorator without a breaker
+#   pybreaker AsyncCircuitBreaker + tenacity (CB_TYPE=consecutive)
+#   sliding   SlidingWindowBreaker + tenacity (CB_TYPE=sliding)
+#   shm       AsyncCircuitBreaker on SharedMemoryStorage (CB_STATE_STORE=shm)
+#   main      main.logged_call(): the worker_loop body with main's compartment
+#             on the mock transport (cache, bulkhead, limiter as configured by
+#             the environment; retries forced to 1 attempt)
+# paths: ok (200), fail (500, breaker never opens), retry (500, 500, 200 with
+# 3 attempts and no backoff sleep), flap (500, 200 with fail_max 1 and
+# reset_timeout 0: a state change on every call), open (every call fast-fails)
+#
+# threads/<stack>/<path>/t<N> - N threads sharing one sync breaker
+# (CircuitBreaker.call / SlidingWindowBreaker.call), total us per call;
+# growth with N is lock contention under the GIL.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import itertools
+import statistics
+import threading
+
+os.environ["RETRY_MAX_ATTEMPTS"] = "1"   # main's retry decorator must never sleep here
+os.environ["CB_STATE_STORE"] = "memory"
+os.environ["EVENTS_PATH"] = ""
+
+import httpx
+import pybreaker
+import tenacity
+from pybreaker import CircuitBreaker, CircuitBreakerError
+from tenacity import retry, wait_none
+
+import main
+import metrics
+import logsetup
+from breakers import AsyncCircuitBreaker, SlidingWindowBreaker
+from breaker_store import SharedMemoryStorage
+from policy import TransientError, retry_kwargs
+
+URL = "http://bench.invalid/work"
+PATHS = {
+    "ok": (200,),
+    "fail": (500,),
+    "retry": (500, 500, 200),
+    "flap": (500, 200),
+    "open": (500,),
+}
+ASYNC_STACKS = ("raw", "tenacity", "pybreaker", "sliding", "shm", "main")
+THREAD_STACKS = ("pybreaker", "sliding")
+THREAD_PATHS = ("ok", "open")
+
+def silence_log_output():
+    """Keep log records flowing (their cost is measured) but write them to /dev/null"""
+    sink = open(os.devnull, "w")
+    handlers = logsetup._listener.handlers if logsetup._listener is not None else logging.getLogger().handlers
+    for handler in handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(sink)
+
+def mock_handler(path: str):
+    statuses = itertools.cycle(PATHS[path])
+    return lambda request: httpx.Response(next(statuses), json={"ok": True})
+
+# === Stacks ===
+def listeners():
+    return [main.LogTransitions(), metrics.TransitionCounter()]
+
+def breaker_params(path: str) -> dict:
+    """fail_max / thresholds so that `path` behaves as described above"""
+    if path == "flap":
+        return {"trip": True, "reset_timeout": 0}
+    if path == "open":
+        return {"trip": True, "reset_timeout": 10 ** 9}
+    return {"trip": False, "reset_timeout": 60}
+
+def make_breaker(stack: str, path: str, shm_path: str = None):
+    p = breaker_params(path)
+    if stack == "sliding":
+        return SlidingWindowBreaker(
+            failure_rate_threshold=0.5 if p["trip"] else 2.0,
+            slow_call_rate_threshold=2.0,
+            window_size=1 if p["trip"] else 100,
+            minimum_calls=1,
+            reset_timeout=p["reset_timeout"],
+            name="bench",
+            listeners=listeners(),
+        )
+    storage = SharedMemoryStorage("bench", shm_path, sync_interval=0.02) if stack == "shm" else None
+    cls = CircuitBreaker if stack == "sync" else AsyncCircuitBreaker
+    return cls(fail_max=1 if p["trip"] else 10 ** 9, reset_timeout=p["reset_timeout"], name="bench",
+               state_storage=storage, listeners=listeners())
+
+def with_retry(fn, path: str):
+    kwargs = retry_kwargs(3 if path == "retry" else 1, 0.2, 2.0)
+    kwargs["wait"] = wait_none()  # measure the retry loop, not the backoff sleep
+    return retry(**kwargs)(fn)
+
+def async_case(stack: str, path: str, tmp: str):
+    """(op, close): op() awaits one call through `stack`"""
+    http = httpx.AsyncClient(transport=httpx.MockTransport(mock_handler(path)))
+
+    if stack == "main":
+        comp = main.compartments["work"]
+        comp.http = http
+        main.CB_FAIL_MAX = 1 if breaker_params(path)["trip"] else 10 ** 9
+        main.CB_RESET_TIMEOUT = breaker_params(path)["reset_timeout"]
+        comp.breaker = main.breaker = main.make_breaker(f"bench-{path}")
+
+        async def op():
+            await main.logged_call(main.observe_state())
+        return op, http.aclose
+
+    async def fetch():
+        r = await http.get(URL)
+        if r.status_code >= 500:
+            raise TransientError(f"server error {r.status_code}")
+        return r.json()
+
+    if stack == "raw":
+        async def op():
+            await http.get(URL)
+        return op, http.aclose
+
+    fetch_with_retry = with_retry(fetch, path)
+    if stack == "tenacity":
+        call = fetch_with_retry
+    else:
+        breaker = make_breaker(stack, path, os.path.join(tmp, f"{path}.shm"))
+        call = lambda: breaker.call_async(fetch_with_retry)
+
+    async def op():
+        try:
+            await call()
+        except (CircuitBreakerError, TransientError):
+            pass
+    return op, http.aclose
+
+# === Runners ===
+def time_async(op, calls: int, repeat: int) -> list:
+    """us per call of each repeat (after one warm-up pass)"""
+    async def run():
+        for _ in range(min(calls, 200)):
+            await op()
+        out = []
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(calls):
+                await op()
+            out.append((time.perf_counter_ns() - start) / calls / 1000.0)
+        return out
+    return asyncio.run(run())
+
+def time_threads(stack: str, path: str, threads: int, calls: int, repeat: int) -> list:
+    """Total us per call when `threads` threads share one breaker, `calls` each"""
+    http = httpx.Client(transport=httpx.MockTransport(mock_handler(path)))
+
+    def fetch():
+        r = http.get(URL)
+        if r.status_code >= 500:
+            raise TransientError(f"server error {r.status_code}")
+        return r.json()
+
+    breaker = make_breaker("sliding" if stack == "sliding" else "sync", path)
+    fetch_with_retry = with_retry(fetch, path)
+
+    def worker(n, barrier):
+        barrier.wait()
+        for _ in range(n):
+            try:
+                breaker.call(fetch_with_retry)
+            except (CircuitBreakerError, TransientError):
+                pass
+
+    worker(min(calls, 200), threading.Barrier(1))
+    out = []
+    for _ in range(repeat):
+        barrier = threading.Barrier(threads + 1)
+        pool = [threading.Thread(target=worker, args=(calls, barrier)) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter_ns()
+        for t in pool:
+            t.join()
+        out.append((time.perf_counter_ns() - start) / (calls * threads) / 1000.0)
+    http.close()
+    return out
+
+def summarize(samples: list) -> dict:
+    med = statistics.median(samples)
+    return {
+        "us_per_call": round(med, 3),
+        "min_us": round(min(samples), 3),
+        "calls_per_s": round(1e6 / med) if med else None,
+        "samples": [round(s, 3) for s in samples],
+    }
+
+def selected(name: str, filters: list) -> bool:
+    return not filters or any(f in name for f in filters)
+
+def run(calls: int, repeat: int, threads: list, filters: list) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for stack, path in itertools.product(ASYNC_STACKS, PATHS):
+            name = f"async/{stack}/{path}"
+            if not selected(name, filters) or (stack == "main" and path == "retry"):
+                continue
+            op, close = async_case(stack, path, tmp)
+            results[name] = summarize(time_async(op, calls, repeat))
+            asyncio.run(close())
+            print_row(name, results[name])
+    for stack, path, n in itertools.product(THREAD_STACKS, THREAD_PATHS, threads):
+        name = f"threads/{stack}/{path}/t{n}"
+        if not selected(name, filters):
+            continue
+        results[name] = summarize(time_threads(stack, path, n, max(1, calls // n), repeat))
+        print_row(name, results[name])
+    return results
+
+# === Output ===
+def print_row(name: str, r: dict):
+    print(f"{name:<30}{r['us_per_call']:>10.2f}{r['min_us']:>10.2f}{r['calls_per_s']:>12}", flush=True)
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """Print the change against `baseline` per case; the number of regressions"""
+    regressions = 0
+    print(f"\n{'case':<30}{'base us':>10}{'now us':>10}{'change':>10}")
+    for name, r in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        change = r["us_per_call"] / base["us_per_call"] - 1.0
+        flag = ""
+        if change > tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<30}{base['us_per_call']:>10.2f}{r['us_per_call']:>10.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Per-call overhead of the client's breaker + retry stack")
+    p.add_argument("-n", "--calls", type=int, default=2000, help="calls per timed repeat")
+    p.add_argument("--repeat", type=int, default=5, help="timed repeats per case (median reported)")
+    p.add_argument("--threads", default="1,2,4,8", help="thread counts for the contention cases")
+    p.add_argument("-k", dest="filters", action="append", default=[], help="only cases containing this")
+    p.add_argument("--out", default=None, help="write JSON results here")
+    p.add_argument("--compare", default=None, metavar="BASELINE", help="JSON from an earlier --out")
+    p.add_argument("--tolerance", type=float, default=0.15, help="slowdown flagged as a regression")
+    return p.parse_args(argv)
+
+def run_main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    silence_log_output()
+    threads = [int(n) for n in args.threads.split(",") if n]
+    print(f"{'case':<30}{'us/call':>10}{'min':>10}{'calls/s':>12}")
+    results = run(args.calls, args.repeat, threads, args.filters)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pybreaker": pybreaker.__version__ if hasattr(pybreaker, "__version__") else None,
+            "tenacity": getattr(tenacity, "__version__", None),
+            "httpx": httpx.__version__,
+            "cpus": os.cpu_count(),
+            "calls": args.calls,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            return 1 if compare(results, json.load(f), args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run_main())
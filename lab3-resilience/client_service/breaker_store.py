@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+# Breaker state shared between processes (pybreaker CircuitBreakerStorage).
+#
+# CB_STATE_STORE picks where a breaker keeps its state:
+#   memory  - per process (pybreaker's CircuitMemoryStorage, the default)
+#   shm     - an mmap'ed file (CB_STATE_SHM_PATH, e.g. on /dev/shm) shared by
+#             every uvicorn worker on the node
+#   network - a small TCP store (CB_STATE_ADDR) shared by every replica:
+#               python breaker_store.py serve --port 7600
+#
+# Reads never block: shm reads the slot under a seqlock (retry while a
+# writer is mid-update), network reads a local copy the store pushes every
+# change into. State changes (OPEN, HALF-OPEN, CLOSED and opened_at) are
+# written at once, so an OPEN reaches the other workers within
+# milliseconds. The consecutive-failure counter is kept locally and merged
+# into the shared one at most every CB_STATE_SYNC_MS, so the per-call path
+# takes no lock and sends nothing. Merges are always deltas: failures add,
+# and a success subtracts only the shared failures it saw, so workers never
+# overwrite each other's counts.
+
+import os
+import sys
+import json
+import mmap
+import time
+import fcntl
+import socket
+import struct
+import asyncio
+import logging
+import calendar
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from pybreaker import CircuitBreakerStorage, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+STATES = (STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN)
+STATE_CODE = {name: i for i, name in enumerate(STATES)}
+
+log = logging.getLogger("breaker_store")
+
+def _to_ts(dt: datetime) -> float:
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+def _from_ts(ts: float):
+    return datetime.utcfromtimestamp(ts) if ts else None
+
+class BatchedStorage(CircuitBreakerStorage):
+    """
+    Local failure counter merged into the shared one every `sync_interval`
+    seconds; subclasses provide _read() -> (state, counter, opened_at ts)
+    and _write(**fields).
+    """
+
+    def __init__(self, name: str, sync_interval: float = 0.02):
+        super().__init__(name)
+        self.sync_interval = sync_interval
+        self._pending = 0         # failures not merged yet
+        self._reset = False       # a success reset the counter since the last merge
+        self._cleared = 0         # shared failures that success saw (and clears)
+        self._last_sync = time.monotonic()
+        self._local = threading.Lock()
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _write(self, state=None, opened_at=None, add=None):
+        """Update the shared fields; `add` is a delta, the counter never goes below 0"""
+        raise NotImplementedError
+
+    def _maybe_sync(self):
+        if self._pending == 0 and not self._reset:
+            return
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Merge the local counter changes into the shared counter"""
+        with self._local:
+            delta = self._pending - (self._cleared if self._reset else 0)
+            self._pending, self._reset, self._cleared = 0, False, 0
+            self._last_sync = time.monotonic()
+        if delta:
+            self._write(add=delta)
+
+    @property
+    def state(self) -> str:
+        self._maybe_sync()
+        return self._read()[0]
+
+    @state.setter
+    def state(self, state: str):
+        self.sync()
+        self._write(state=state)
+
+    def increment_counter(self):
+        with self._local:
+            self._pending += 1
+        self._maybe_sync()
+
+    def reset_counter(self):
+        # Failures other workers merge after this read survive the reset
+        shared = self._read()[1]
+        with self._local:
+            self._pending = 0
+            self._reset = True
+            self._cleared = shared
+        self._maybe_sync()
+
+    @property
+    def counter(self) -> int:
+        shared = self._read()[1]
+        with self._local:
+            return max(0, shared - self._cleared if self._reset else shared) + self._pending
+
+    @property
+    def opened_at(self):
+        return _from_ts(self._read()[2])
+
+    @opened_at.setter
+    def opened_at(self, dt: datetime):
+        self._write(opened_at=_to_ts(dt))
+
+# === Shared memory (one node) ===
+MAGIC = b"LAB3CB01"
+HEADER = struct.Struct("<8sI4x")        # magic, slot count
+SLOT_SIZE = 64                          # name[32] | seq u32 | state u8 | counter i64 | opened_at f64
+NAME = struct.Struct("<32s")
+SEQ = struct.Struct("<I")
+DATA = struct.Struct("<B3xqd")          # at slot + 36: state, counter, opened_at
+NAME_OFF, SEQ_OFF, DATA_OFF = 0, 32, 36
+READ_SPINS = 1000                       # lock-free read attempts before _read() takes the lock
+
+class SharedMemoryStorage(BatchedStorage):
+    """Breaker state in a slot of an mmap'ed file; writers serialize on a file lock"""
+
+    def __init__(self, name: str, path: str, slots: int = 64, sync_interval: float = 0.02):
+        super().__init__("shm", sync_interval)
+        self.breaker_name = name
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+        size = HEADER.size + slots * SLOT_SIZE
+        with self._locked():
+            if os.fstat(self._fd).st_size < HEADER.size:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, slots), 0)
+            magic, slots = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a breaker state file")
+            self._mm = mmap.mmap(self._fd, HEADER.size + slots * SLOT_SIZE)
+            self._base = self._claim(name.encode()[:32], slots)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _claim(self, key: bytes, slots: int) -> int:
+        """Offset of this breaker's slot, taking the first free one if it has none (lock held)"""
+        free = None
+        for i in range(slots):
+            base = HEADER.size + i * SLOT_SIZE
+            name = NAME.unpack_from(self._mm, base + NAME_OFF)[0].rstrip(b"\0")
+            if name == key:
+                return base
+            if not name and free is None:
+                free = base
+        if free is None:
+            raise ValueError(f"{self.path}: no free breaker slot for {key.decode()}")
+        NAME.pack_into(self._mm, free + NAME_OFF, key)
+        DATA.pack_into(self._mm, free + DATA_OFF, STATE_CODE[STATE_CLOSED], 0, 0.0)
+        return free
+
+    def _read(self):
+        mm, base = self._mm, self._base
+        for _ in range(READ_SPINS):
+            seq = SEQ.unpack_from(mm, base + SEQ_OFF)[0]
+            if seq & 1:
+                continue  # a writer is mid-update
+            code, counter, opened_at = DATA.unpack_from(mm, base + DATA_OFF)
+            if SEQ.unpack_from(mm, base + SEQ_OFF)[0] == seq:
+                return STATES[code], counter, opened_at
+        # A slow writer, or one that died mid-update (the OS freed its lock,
+        # the seq stayed odd): read under the lock instead of spinning forever
+        with self._locked():
+            self._repair_seq()
+            code, counter, opened_at = DATA.unpack_from(mm, base + DATA_OFF)
+        return STATES[code], counter, opened_at
+
+    def _repair_seq(self) -> int:
+        """Even out a seq left odd by a dead writer so lock-free reads work again (lock held)"""
+        seq = SEQ.unpack_from(self._mm, self._base + SEQ_OFF)[0]
+        if seq & 1:
+            seq = (seq + 1) & 0xFFFFFFFF
+            SEQ.pack_into(self._mm, self._base + SEQ_OFF, seq)
+        return seq
+
+    def _write(self, state=None, opened_at=None, add=None):
+        mm, base = self._mm, self._base
+        with self._locked():
+            seq = self._repair_seq()
+            code, counter, ts = DATA.unpack_from(mm, base + DATA_OFF)
+            if state is not None:
+                code = STATE_CODE[state]
+            if opened_at is not None:
+                ts = opened_at
+            if add is not None:
+                counter = max(0, counter + add)
+            SEQ.pack_into(mm, base + SEQ_OFF, (seq + 1) & 0xFFFFFFFF)
+            DATA.pack_into(mm, base + DATA_OFF, code, counter, ts)
+            SEQ.pack_into(mm, base + SEQ_OFF, (seq + 2) & 0xFFFFFFFF)
+
+# === Network store (many replicas) ===
+class StoreConnection:
+    """
+    One TCP connection per process to the store: a reader thread applies
+    every pushed update to `cache`; while disconnected, writes only update
+    the cache (breakers fall back to per-process behavior) and the thread
+    reconnects with backoff.
+    """
+
+    def __init__(self, address: str, timeout: float = 1.0):
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.timeout = timeout
+        self.cache = {}  # name -> [state, counter, opened_at]
+        self.connected = threading.Event()
+        self._sock = None
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._run, name="breaker-store", daemon=True).start()
+        # Give the first connection a moment so breakers start from the shared state
+        self.connected.wait(timeout)
+
+    def entry(self, name: str) -> list:
+        return self.cache.setdefault(name, [STATE_CLOSED, 0, 0.0])
+
+    def send(self, msg: dict):
+        sock = self._sock
+        if sock is None:
+            return
+        data = (json.dumps(msg) + "\n").encode()
+        try:
+            with self._send_lock:
+                sock.sendall(data)
+        except OSError:
+            self._drop(sock)
+
+    def _drop(self, sock):
+        if self._sock is sock:
+            self._sock = None
+            self.connected.clear()
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _run(self):
+        backoff = 0.1
+        while True:
+            try:
+                sock = socket.create_connection(self.address, timeout=self.timeout)
+            except OSError as e:
+                log.warning(f"breaker store {self.address[0]}:{self.address[1]} unreachable: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            backoff = 0.1
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            # Publish what this process holds, then take the store's view
+            self.send({"op": "hello", "names": list(self.cache)})
+            self.connected.set()
+            try:
+                for line in sock.makefile("rb"):
+                    update = json.loads(line)
+                    self.cache[update["name"]] = [update["state"], update["counter"], update["opened_at"]]
+            except (OSError, ValueError):
+                pass
+            self._drop(sock)
+
+class NetworkStorage(BatchedStorage):
+    """Breaker state held by the store process; reads come from the pushed local copy"""
+
+    def __init__(self, name: str, connection: StoreConnection, sync_interval: float = 0.02):
+        super().__init__("network", sync_interval)
+        self.breaker_name = name
+        self.conn = connection
+        self._entry = connection.entry(name)
+
+    def _read(self):
+        entry = self.conn.cache.get(self.breaker_name) or self._entry
+        return entry[0], entry[1], entry[2]
+
+    def _write(self, state=None, opened_at=None, add=None):
+        # Applied locally first so this process sees its own write at once
+        entry = self.conn.cache.setdefault(self.breaker_name, self._entry)
+        msg = {"op": "update", "name": self.breaker_name}
+        if state is not None:
+            entry[0] = msg["state"] = state
+        if opened_at is not None:
+            entry[2] = msg["opened_at"] = opened_at
+        if add is not None:
+            entry[1] = max(0, entry[1] + add)
+            msg["add"] = add
+        self.conn.send(msg)
+
+class StoreServer:
+    """Stand-in store: keeps every breaker's state and pushes each change to all clients"""
+
+    def __init__(self):
+        self.breakers = {}
+        self.clients = set()
+
+    def _entry(self, name: str) -> dict:
+        return self.breakers.setdefault(name, {"name": name, "state": STATE_CLOSED, "counter": 0, "opened_at": 0.0})
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
+        try:
+            while line := await reader.readline():
+                msg = json.loads(line)
+                if msg["op"] == "hello":
+                    for name in msg.get("names", []):
+                        self._entry(name)
+                    writer.write(b"".join((json.dumps(e) + "\n").encode() for e in self.breakers.values()))
+                    continue
+                entry = self._entry(msg["name"])
+                if "state" in msg:
+                    entry["state"] = msg["state"]
+                if "opened_at" in msg:
+                    entry["opened_at"] = msg["opened_at"]
+                if "add" in msg:
+                    entry["counter"] = max(0, entry["counter"] + msg["add"])
+                data = (json.dumps(entry) + "\n").encode()
+                for client in self.clients:
+                    client.write(data)
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"breaker store listening on {host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+# === Factory ===
+_connections = {}
+
+def make_storage(kind: str, name: str, shm_path: str = "", address: str = "", sync_interval: float = 0.02):
+    """Storage for breaker `name` (None keeps pybreaker's in-process default)"""
+    if kind == "memory":
+        return None
+    if kind == "shm":
+        return SharedMemoryStorage(name, shm_path, sync_interval=sync_interval)
+    if kind == "network":
+        if address not in _connections:
+            _connections[address] = StoreConnection(address)
+        return NetworkStorage(name, _connections[address], sync_interval=sync_interval)
+    raise ValueError(f"Unknown breaker state store {kind!r}, valid stores: memory, shm, network")
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Stand-in network store for shared breaker state")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=7600)
+    args = p.parse_args()
+    try:
+        asyncio.run(StoreServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        sys.exit(0)
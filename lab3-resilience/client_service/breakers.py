@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+# Circuit breakers that can guard asyncio calls.
+
+import time
+import asyncio
+import threading
+from array import array
+from datetime import datetime, timedelta
+from pybreaker import (
+    CircuitBreaker,
+    CircuitBreakerError,
+    CircuitBreakerListener,
+    STATE_CLOSED,
+    STATE_OPEN,
+    STATE_HALF_OPEN,
+)
+
+# === pybreaker on asyncio ===
+class AsyncCircuitBreaker(CircuitBreaker):
+    """pybreaker CircuitBreaker whose call_async runs on asyncio (not tornado)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._probe_in_flight = False
+
+    def seconds_until_probe(self) -> float:
+        """Time left before an OPEN breaker lets a trial call through"""
+        opened_at = self._state_storage.opened_at
+        if self.current_state != STATE_OPEN or not opened_at:
+            return 0.0
+        ready_at = opened_at + timedelta(seconds=self.reset_timeout)
+        return max(0.0, (ready_at - datetime.utcnow()).total_seconds())
+
+    async def call_async(self, func, *args, **kwargs):
+        """Await `func` under the same state rules as CircuitBreaker.call"""
+        with self._lock:
+            state = self.state
+            if state.name == STATE_OPEN:
+                timeout = timedelta(seconds=self.reset_timeout)
+                opened_at = self._state_storage.opened_at
+                if opened_at and datetime.utcnow() < opened_at + timeout:
+                    raise CircuitBreakerError("Timeout not elapsed yet, circuit breaker still open")
+                self.half_open()
+                state = self.state
+            probe = state.name == STATE_HALF_OPEN
+            if probe:
+                # The sync breaker holds its lock for the whole trial call, so
+                # only one probe is ever in flight; keep that across awaits.
+                if self._probe_in_flight:
+                    raise CircuitBreakerError("Trial call in progress, circuit breaker half-open")
+                self._probe_in_flight = True
+            for listener in self.listeners:
+                listener.before_call(self, func, *args, **kwargs)
+
+        try:
+            ret = await func(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                # Results that arrive after the state moved on are not counted
+                if state is self._state:
+                    try:
+                        state._handle_error(e)
+                    except CircuitBreakerError as trip:
+                        # This call's failure opened the breaker: chain it explicitly
+                        raise trip from e
+            raise
+        else:
+            with self._lock:
+                if state is self._state:
+                    state._handle_success()
+            return ret
+        finally:
+            if probe:
+                self._probe_in_flight = False
+
+# === Sliding windows (array-backed, O(1) per record) ===
+class CountWindow:
+    """Outcomes of the last `size` calls in a ring buffer"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.failed = array("B", bytes(size))
+        self.slow = array("B", bytes(size))
+        self.reset()
+
+    def reset(self):
+        for i in range(self.size):
+            self.failed[i] = 0
+            self.slow[i] = 0
+        self.pos = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+    def record(self, failed: bool, slow: bool, now: float):
+        pos = self.pos
+        if self.calls == self.size:
+            self.failures -= self.failed[pos]
+            self.slow_calls -= self.slow[pos]
+        else:
+            self.calls += 1
+        self.failed[pos] = failed
+        self.slow[pos] = slow
+        self.failures += failed
+        self.slow_calls += slow
+        self.pos = (pos + 1) % self.size
+
+    def totals(self, now: float):
+        return self.calls, self.failures, self.slow_calls
+
+class TimeWindow:
+    """Calls of the last `size` seconds in per-second buckets"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.epoch = array("q", [-1]) * size
+        self.bucket_calls = array("L", [0]) * size
+        self.bucket_failures = array("L", [0]) * size
+        self.bucket_slow = array("L", [0]) * size
+        self.reset()
+
+    def reset(self):
+        for i in range(self.size):
+            self.epoch[i] = -1
+            self.bucket_calls[i] = self.bucket_failures[i] = self.bucket_slow[i] = 0
+        self.head = None
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+    def _advance(self, second: int):
+        # Expire buckets that fell out of the window; amortised O(1) because
+        # each bucket is cleared at most once per second of wall time
+        if self.head is not None and second <= self.head:
+            return
+        start = second - self.size + 1 if self.head is None else max(self.head + 1, second - self.size + 1)
+        for sec in range(start, second + 1):
+            i = sec % self.size
+            if self.epoch[i] != sec:
+                self.calls -= self.bucket_calls[i]
+                self.failures -= self.bucket_failures[i]
+                self.slow_calls -= self.bucket_slow[i]
+                self.bucket_calls[i] = self.bucket_failures[i] = self.bucket_slow[i] = 0
+                self.epoch[i] = sec
+        self.head = second
+
+    def record(self, failed: bool, slow: bool, now: float):
+        second = int(now)
+        self._advance(second)
+        i = second % self.size
+        self.bucket_calls[i] += 1
+        self.bucket_failures[i] += failed
+        self.bucket_slow[i] += slow
+        self.calls += 1
+        self.failures += failed
+        self.slow_calls += slow
+
+    def totals(self, now: float):
+        self._advance(int(now))
+        return self.calls, self.failures, self.slow_calls
+
+# === Failure-rate breaker ===
+class SlidingWindowBreaker:
+    """
+    Opens when the failure rate or slow-call rate over a sliding window
+    crosses its threshold (once at least `minimum_calls` were recorded).
+    After `reset_timeout` seconds it lets `half_open_max_calls` probes
+    through and closes only if their rates stay below the thresholds.
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 2.0,
+        window_type: str = "count",
+        window_size: int = 100,
+        minimum_calls: int = 10,
+        reset_timeout: float = 60,
+        half_open_max_calls: int = 1,
+        listeners=None,
+        name=None,
+        clock=time.monotonic,
+        storage=None,
+    ):
+        if window_type not in ("count", "time"):
+            raise ValueError(f"Unknown window type {window_type!r}, valid types: count, time")
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.listeners = list(listeners or [])
+        self.name = name
+        self.clock = clock
+        self.window = CountWindow(window_size) if window_type == "count" else TimeWindow(window_size)
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._generation = 0
+        self.opened_at = None
+        self._probes_started = 0
+        self._probes = [0, 0, 0]  # calls, failures, slow calls
+        # Shared state (breaker_store.py): state and opened_at are published to
+        # and adopted from the storage, the window itself stays per process
+        self.storage = storage
+
+    @property
+    def current_state(self) -> str:
+        return self.storage.state if self.storage is not None else self._state
+
+    def add_listener(self, listener):
+        with self._lock:
+            self.listeners.append(listener)
+
+    def seconds_until_probe(self) -> float:
+        """Time left before an OPEN breaker lets a trial call through"""
+        if self.storage is not None:
+            with self._lock:
+                self._sync()
+        if self._state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    # --- state machine (caller holds the lock) ---
+    def _transition(self, new_state: str, opened_at: float = None, publish: bool = True):
+        old_state, self._state = self._state, new_state
+        self._generation += 1
+        if publish and self.storage is not None:
+            if new_state == STATE_OPEN:
+                self.storage.opened_at = datetime.utcnow()
+            self.storage.state = new_state
+        if new_state == STATE_OPEN:
+            self.opened_at = self.clock() if opened_at is None else opened_at
+        elif new_state == STATE_HALF_OPEN:
+            self._probes_started = 0
+            self._probes = [0, 0, 0]
+        else:
+            self.window.reset()
+        for listener in self.listeners:
+            listener.state_change(self, old_state, new_state)
+
+    def _sync(self):
+        """Adopt a state another process wrote to the storage"""
+        if self.storage is None:
+            return
+        state = self.storage.state
+        if state == self._state:
+            return
+        opened_at = None
+        if state == STATE_OPEN:
+            # The storage keeps wall time, the window runs on self.clock
+            stored = self.storage.opened_at
+            age = (datetime.utcnow() - stored).total_seconds() if stored else 0.0
+            opened_at = self.clock() - age
+        self._transition(state, opened_at=opened_at, publish=False)
+
+    def _tripped(self, calls: int, failures: int, slow_calls: int) -> bool:
+        return (failures / calls >= self.failure_rate_threshold
+                or slow_calls / calls >= self.slow_call_rate_threshold)
+
+    def _before_call(self, func, *args, **kwargs) -> int:
+        with self._lock:
+            self._sync()
+            if self._state == STATE_OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise CircuitBreakerError("Timeout not elapsed yet, circuit breaker still open")
+                self._transition(STATE_HALF_OPEN)
+            if self._state == STATE_HALF_OPEN:
+                if self._probes_started >= self.half_open_max_calls:
+                    raise CircuitBreakerError("Trial calls in progress, circuit breaker half-open")
+                self._probes_started += 1
+            for listener in self.listeners:
+                listener.before_call(self, func, *args, **kwargs)
+            return self._generation
+
+    def _after_call(self, generation: int, exc, duration: float):
+        failed = exc is not None
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            for listener in self.listeners:
+                if failed:
+                    listener.failure(self, exc)
+                else:
+                    listener.success(self)
+            # Results that arrive after the state moved on are not counted
+            self._sync()
+            if generation != self._generation:
+                return
+            if self._state == STATE_CLOSED:
+                now = self.clock()
+                self.window.record(failed, slow, now)
+                calls, failures, slow_calls = self.window.totals(now)
+                if calls >= self.minimum_calls and self._tripped(calls, failures, slow_calls):
+                    self._transition(STATE_OPEN)
+            elif self._state == STATE_HALF_OPEN:
+                self._probes[0] += 1
+                self._probes[1] += failed
+                self._probes[2] += slow
+                if self._probes[0] >= self.half_open_max_calls:
+                    self._transition(STATE_OPEN if self._tripped(*self._probes) else STATE_CLOSED)
+
+    def _abandon_call(self, generation: int):
+        """A call ended without an outcome (e.g. cancelled): give its probe slot back"""
+        with self._lock:
+            if generation == self._generation and self._state == STATE_HALF_OPEN and self._probes_started:
+                self._probes_started -= 1
+
+    # --- public API, mirrors pybreaker ---
+    def call(self, func, *args, **kwargs):
+        generation = self._before_call(func, *args, **kwargs)
+        start = self.clock()
+        try:
+            ret = func(*args, **kwargs)
+        except Exception as e:
+            self._after_call(generation, e, self.clock() - start)
+            raise
+        except BaseException:
+            self._abandon_call(generation)
+            raise
+        self._after_call(generation, None, self.clock() - start)
+        return ret
+
+    async def call_async(self, func, *args, **kwargs):
+        generation = self._before_call(func, *args, **kwargs)
+        start = self.clock()
+        try:
+            ret = await func(*args, **kwargs)
+        except Exception as e:
+            self._after_call(generation, e, self.clock() - start)
+            raise
+        except BaseException:
+            # Cancelled by a deadline or a winning hedge: no result to count
+            self._abandon_call(generation)
+            raise
+        self._after_call(generation, None, self.clock() - start)
+        return ret
+
+# === Probe readiness ===
+class ProbeGate(CircuitBreakerListener):
+    """
+    Lets asyncio callers wait on an OPEN breaker without polling it: one
+    timer releases every waiter when reset_timeout expires, and any state
+    change (e.g. another caller's probe closing the breaker) releases them
+    at once.
+    """
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self._loop = None
+        self._ready = None
+        self._timer = None
+        breaker.add_listener(self)
+
+    def state_change(self, cb, old_state, new_state):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._rearm)
+
+    def _rearm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = self.breaker.seconds_until_probe()
+        if self.breaker.current_state == STATE_OPEN and delay > 0:
+            self._ready.clear()
+            self._timer = self._loop.call_later(delay, self._ready.set)
+        else:
+            self._ready.set()
+
+    async def wait(self):
+        """Return once the breaker is no longer OPEN or a probe is allowed"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        while self.breaker.seconds_until_probe() > 0:
+            # The loop clock may fire a timer slightly early; re-arm for the rest
+            if self._ready.is_set() or self._timer is None:
+                self._rearm()
+            await self._ready.wait()
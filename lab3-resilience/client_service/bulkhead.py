@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Bulkhead isolation: each named compartment gets its own concurrency slots
+# and a bounded wait queue, so a slow dependency can only exhaust its own.
+#
+# Compartments are declared as JSON in the BULKHEADS env var (ConfigMap):
+#   {"work":   {"max_concurrent": 50, "max_queue": 100, "queue_timeout_ms": 500},
+#    "report": {"url": "http://backend:8000/report", "max_connections": 10,
+#               "breaker": true}}
+
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+class BulkheadFullError(Exception):
+    """Raised when a compartment has no free slot and its queue is full or timed out"""
+    pass
+
+class Bulkhead:
+    def __init__(self, name: str, max_concurrent: int = 100, max_queue: int = 0, queue_timeout: float = 1.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot, waiting at most queue_timeout in the bounded queue"""
+        if self._slots.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise BulkheadFullError(f"bulkhead {self.name} full")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.queue_timeouts += 1
+                raise BulkheadFullError(f"bulkhead {self.name} queue timeout")
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+        }
+
+def parse_bulkheads(spec: str) -> dict:
+    """Parse the BULKHEADS JSON into {name: settings}; empty means no compartments"""
+    if not spec or not spec.strip():
+        return {}
+    data = json.loads(spec)
+    if not isinstance(data, dict):
+        raise ValueError("BULKHEADS must be a JSON object of {name: settings}")
+    return data
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# Response cache in front of the backend call: TTL + LRU, stale-while-error
+# fallback and single-flight request coalescing.
+#
+# - fresh(key): a good result younger than `ttl` is served without a call
+#   (ttl=0 disables this; the cache is then only a fallback).
+# - stale(key): when the call fast-fails or errors, the last good result
+#   younger than `stale_ttl` is served instead, flagged "stale".
+# - single_flight(key, fn): concurrent callers for one key share one
+#   in-flight call and all get its result.
+
+import time
+import asyncio
+from collections import OrderedDict
+
+class ResponseCache:
+    """Last good result per key, bounded by `max_size` (least recently used evicted)"""
+
+    def __init__(self, max_size: int = 1000, ttl: float = 0.0, stale_ttl: float = 300.0, clock=time.monotonic):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (result, stored_at), oldest use first
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.stale_missing = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key, max_age: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, stored_at = entry
+        age = self.clock() - stored_at
+        if age > self.stale_ttl:
+            # Too old even as a fallback
+            del self._entries[key]
+            return None
+        if age > max_age:
+            return None
+        self._entries.move_to_end(key)
+        return result, age
+
+    def fresh(self, key):
+        """A result young enough to skip the call, or None"""
+        if self.ttl <= 0:
+            return None
+        found = self._lookup(key, self.ttl)
+        if found is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return found[0]
+
+    def stale(self, key):
+        """(result, age_seconds) of the last good result within stale_ttl, or None"""
+        found = self._lookup(key, self.stale_ttl)
+        if found is None:
+            self.stale_missing += 1
+        else:
+            self.stale_served += 1
+        return found
+
+    def put(self, key, result):
+        self._entries[key] = (result, self.clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def single_flight(self, key, fn):
+        """Await fn() once per key at a time; callers arriving meanwhile share its result"""
+        task = self._flights.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._flights.pop(key, None) if self._flights.get(key) is t else None)
+        # A cancelled caller must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_s": self.ttl,
+            "stale_ttl_s": self.stale_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "stale_missing": self.stale_missing,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "in_flight": len(self._flights),
+        }
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# End-to-end deadlines for backend calls.
+#
+# DEADLINE_MS bounds one call_backend() as a whole: bulkhead queueing,
+# every attempt and every backoff sleep. The deadline sits in a contextvar,
+# so each layer below reads the same budget without it being passed along:
+#   - an attempt only gets the time left (and is not started with less than
+#     DEADLINE_MIN_ATTEMPT_MS),
+#   - tenacity stops retrying once the backoff sleep plus a minimum attempt
+#     no longer fits (stop_before_deadline),
+#   - the time left goes to the backend as X-Request-Timeout-Ms, and the
+#     backend answers 504 at once instead of sleeping through a delay the
+#     caller would not wait for.
+
+import time
+import contextvars
+from contextlib import contextmanager
+from tenacity.stop import stop_base
+
+HEADER = "X-Request-Timeout-Ms"
+
+_deadline = contextvars.ContextVar("deadline", default=None)  # (deadline, clock)
+
+class DeadlineExceeded(Exception):
+    """The call's budget ran out (classified as a timeout)"""
+
+    def __init__(self):
+        super().__init__("deadline exceeded: request timed out")
+
+@contextmanager
+def budget(seconds: float, clock=time.monotonic):
+    """Run the block under a deadline `seconds` from now; a tighter enclosing deadline wins"""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    deadline = clock() + seconds
+    outer = _deadline.get()
+    if outer is not None and outer[1] is clock:
+        deadline = min(deadline, outer[0])
+    token = _deadline.set((deadline, clock))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    """Seconds left before the current deadline, None when there is none"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    deadline, clock = current
+    return deadline - clock()
+
+def check(min_left: float = 0.0):
+    """Raise DeadlineExceeded unless more than `min_left` seconds are left; return the time left"""
+    left = remaining()
+    if left is not None and left <= min_left:
+        raise DeadlineExceeded()
+    return left
+
+class stop_before_deadline(stop_base):
+    """Stop retrying when the next backoff sleep plus `min_attempt` seconds would pass the deadline"""
+
+    def __init__(self, min_attempt: float = 0.0):
+        self.min_attempt = min_attempt
+
+    def __call__(self, retry_state) -> bool:
+        left = remaining()
+        return left is not None and retry_state.upcoming_sleep + self.min_attempt >= left
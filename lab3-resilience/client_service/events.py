@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Binary per-request event file (EVENTS_PATH), written alongside the logs.
+#
+# One fixed 16-byte little-endian record per call_backend() result:
+#   int64 ts_ns | float32 latency_ms | int8 outcome | int8 state | int8 attempts | pad
+# so the file can be memory-mapped as a NumPy structured array as is
+# (analysis/eventstore.py). ts_ns is local wall-clock time encoded like the
+# log parser does, so events and log lines line up.
+
+import time
+import struct
+import contextvars
+
+RECORD = struct.Struct("<qfbbbx")
+OUTCOMES = ("ok", "5xx", "timeout", "fast_fail", "rejected", "error", "stale")
+STATES = ("CLOSED", "OPEN", "HALF-OPEN")
+OUTCOME_CODE = {name: i for i, name in enumerate(OUTCOMES)}
+STATE_CODE = {name: i for i, name in enumerate(STATES)}
+
+# Backend attempts made by the current call (retries and the first try)
+_attempts = contextvars.ContextVar("attempts", default=None)
+
+def start_call():
+    """Start counting attempts for the call running in this task"""
+    counter = [0]
+    _attempts.set(counter)
+    return counter
+
+def count_attempt():
+    counter = _attempts.get()
+    if counter is not None:
+        counter[0] += 1
+
+class EventRecorder:
+    """Buffers packed records and appends them to `path` in large writes"""
+
+    def __init__(self, path: str, flush_bytes: int = 64 * 1024):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self._buf = bytearray()
+        self._file = open(path, "ab")
+        # Same wall-clock-as-UTC encoding as analysis/logparse.py
+        self._offset_ns = time.localtime().tm_gmtoff * 1_000_000_000
+        self.records = 0
+
+    def record(self, outcome: str, state: str, latency_s: float, attempts: int):
+        self._buf += RECORD.pack(
+            time.time_ns() + self._offset_ns,
+            latency_s * 1000.0,
+            OUTCOME_CODE.get(outcome, OUTCOME_CODE["error"]),
+            STATE_CODE.get(state, -1),
+            min(attempts, 127),
+        )
+        self.records += 1
+        if len(self._buf) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._file.write(self._buf)
+            self._file.flush()
+            self._buf.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
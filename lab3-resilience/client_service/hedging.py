@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# Hedged requests: if the first attempt has not answered by the observed
+# latency percentile, send one backup and keep whichever answers first.
+
+import asyncio
+from histogram import LatencyHistogram
+from retry_budget import RetryBudget
+
+class Hedger:
+    """
+    Tracks recent latency in a rotating histogram pair and fires at most one
+    hedge per call, paid for from a RetryBudget so hedging cannot double the
+    backend load.
+    """
+
+    def __init__(
+        self,
+        budget: RetryBudget,
+        percentile: float = 95.0,
+        min_delay: float = 0.05,
+        min_samples: int = 50,
+        window: int = 1000,
+    ):
+        self.budget = budget
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self._current = LatencyHistogram()
+        self._previous = None
+        self._delay = min_delay
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.hedges_denied = 0
+
+    def observe(self, seconds: float):
+        self._current.record_seconds(seconds)
+        n = self._current.total
+        if n >= self.window:
+            self._previous, self._current = self._current, LatencyHistogram()
+            self._refresh(self._previous)
+        elif self._previous is None and n >= self.min_samples and n % self.min_samples == 0:
+            # Warm-up: refresh periodically until the first full window exists
+            self._refresh(self._current)
+
+    def _refresh(self, hist: LatencyHistogram):
+        self._delay = max(self.min_delay, hist.percentile(self.percentile) / 1_000_000)
+
+    def delay(self) -> float:
+        return self._delay
+
+    async def _timed(self, send):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await send()
+        self.observe(loop.time() - start)
+        return result
+
+    async def run(self, send, is_good=lambda result: True):
+        """
+        Await `send()`; after delay() start a second `send()` if the budget
+        allows. The first good result wins and the other task is cancelled.
+        """
+        self.budget.deposit()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = asyncio.create_task(self._timed(send))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._delay)
+            if not done:
+                if self.budget.try_withdraw():
+                    self.hedges_sent += 1
+                    tasks.append(asyncio.create_task(self._timed(send)))
+                else:
+                    self.hedges_denied += 1
+
+            pending = set(tasks)
+            fallback = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    if task.exception() is None and is_good(task.result()):
+                        if task is not first:
+                            self.hedges_won += 1
+                            if not first.done():
+                                # The slow primary is cancelled below and never observed:
+                                # record its elapsed time, a lower bound on its latency, so
+                                # the percentile is not learned from fast samples only
+                                self.observe(loop.time() - started)
+                        return task.result()
+                    fallback = fallback or task
+            # Nothing good: surface what the earliest finisher produced
+            return fallback.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            "hedge_delay_ms": round(self._delay * 1000, 3),
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "hedges_denied": self.hedges_denied,
+        }
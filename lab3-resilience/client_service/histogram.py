@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# HDR-style latency histogram: log-linear buckets with bounded relative error.
+#
+# Values are recorded as integer microseconds. Each power-of-two range is split
+# into 2**(sub_bucket_bits-1) linear sub-buckets, so any recorded value is
+# reported with a relative error below 2**(1-sub_bucket_bits) (< 1% with 8 bits).
+
+import math
+from array import array
+
+class LatencyHistogram:
+    """Fixed-memory latency histogram with O(1) record and mergeable counts"""
+
+    def __init__(self, max_value_us: int = 60_000_000, sub_bucket_bits: int = 8):
+        self.sub_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.max_value_us = max_value_us
+        self.counts = array("Q", [0]) * (self._index(max_value_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _index(self, v: int) -> int:
+        shift = v.bit_length() - self.sub_bits
+        if shift <= 0:
+            return v
+        return shift * self.half + (v >> shift)
+
+    def _bucket_value(self, idx: int) -> int:
+        """Highest value that falls into bucket `idx`"""
+        if idx < 2 * self.half:
+            return idx
+        shift = idx // self.half - 1
+        return ((idx - shift * self.half + 1) << shift) - 1
+
+    def record(self, value_us: int, count: int = 1):
+        v = min(max(int(value_us), 0), self.max_value_us)
+        self.counts[self._index(v)] += count
+        self.total += count
+        self.sum_us += v * count
+        if self.min_us is None or v < self.min_us:
+            self.min_us = v
+        if v > self.max_us:
+            self.max_us = v
+
+    def record_seconds(self, seconds: float):
+        self.record(int(seconds * 1_000_000))
+
+    def merge(self, other: "LatencyHistogram"):
+        for idx, c in enumerate(other.counts):
+            if c:
+                self.counts[idx] += c
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> int:
+        """Value (us) at percentile q in [0, 100]; 0 when empty"""
+        if not self.total:
+            return 0
+        rank = max(1, math.ceil(q / 100.0 * self.total))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self._bucket_value(idx), self.max_us)
+        return self.max_us
+
+    def mean(self) -> float:
+        return self.sum_us / self.total if self.total else 0.0
+
+    def summary_ms(self, percentiles=(50, 90, 95, 99, 99.9)) -> dict:
+        out = {"count": self.total, "mean": round(self.mean() / 1000.0, 3)}
+        for q in percentiles:
+            out[f"p{q:g}".replace(".", "")] = round(self.percentile(q) / 1000.0, 3)
+        out["min"] = round((self.min_us or 0) / 1000.0, 3)
+        out["max"] = round(self.max_us / 1000.0, 3)
+        return out
+
+    def to_dict(self) -> dict:
+        """Sparse, JSON-friendly encoding: {bucket upper bound us: count}"""
+        return {
+            "sub_bucket_bits": self.sub_bits,
+            "max_value_us": self.max_value_us,
+            "buckets": {str(self._bucket_value(i)): c for i, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        h = cls(max_value_us=d["max_value_us"], sub_bucket_bits=d["sub_bucket_bits"])
+        for value, count in d["buckets"].items():
+            h.record(int(value), count)
+        return h
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Adaptive concurrency limits in front of the backend call.
+#
+# A request first takes a slot (acquire); if the current limit is reached it
+# is rejected locally instead of queueing on a degraded backend. Every
+# completed request reports the round-trip time of its last backend attempt
+# (not the whole call: retry backoff sleeps are the client's own waiting)
+# and whether it "dropped" (5xx / timeout), and the limit adapts:
+#   AIMD     - +1 while requests succeed and the limit is in use,
+#              x backoff on a drop or when latency exceeds a threshold
+#   Gradient - scales the limit by long-term RTT / short-term RTT (both
+#              moving averages), so it shrinks once queueing shows up in
+#              the latency rather than on every single slow response
+
+import math
+import threading
+
+class AdaptiveLimiter:
+    """Slot accounting shared by the adaptive algorithms"""
+
+    def __init__(self, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 1000):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, rtt: float = None, dropped: bool = False):
+        """Free the slot; pass rtt=None for results that say nothing about the backend"""
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            if rtt is not None:
+                new_limit = self._update(rtt, in_flight, dropped)
+                self.limit = min(self.max_limit, max(self.min_limit, new_limit))
+
+    def _update(self, rtt: float, in_flight: int, dropped: bool) -> float:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "rejected": self.rejected}
+
+class AIMDLimiter(AdaptiveLimiter):
+    def __init__(self, backoff: float = 0.9, latency_threshold: float = 1.5, **kwargs):
+        super().__init__(**kwargs)
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+
+    def _update(self, rtt, in_flight, dropped):
+        if dropped or rtt > self.latency_threshold:
+            return self.limit * self.backoff
+        # Only grow when the limit is actually being used
+        if in_flight * 2 >= self.limit:
+            return self.limit + 1
+        return self.limit
+
+class GradientLimiter(AdaptiveLimiter):
+    def __init__(self, tolerance: float = 1.5, smoothing: float = 0.2, short_window: int = 10,
+                 long_window: int = 600, backoff: float = 0.9, **kwargs):
+        super().__init__(**kwargs)
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self._short_alpha = 2.0 / (short_window + 1)
+        self._long_alpha = 2.0 / (long_window + 1)
+        self.short_rtt = None
+        self.long_rtt = None
+        self._samples = 0
+
+    def _update(self, rtt, in_flight, dropped):
+        if dropped:
+            return self.limit * self.backoff
+        if self.long_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+        # Plain running mean until the long window has filled, so a lucky
+        # first sample does not anchor the baseline
+        self._samples += 1
+        self.short_rtt += (rtt - self.short_rtt) * max(self._short_alpha, 1.0 / self._samples)
+        self.long_rtt += (rtt - self.long_rtt) * max(self._long_alpha, 1.0 / self._samples)
+        # App-limited: too few requests to learn anything about capacity
+        if in_flight * 2 < self.limit:
+            return self.limit
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / max(self.short_rtt, 1e-6)))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        return self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+    def snapshot(self) -> dict:
+        out = super().snapshot()
+        out["short_rtt_ms"] = round((self.short_rtt or 0.0) * 1000, 3)
+        out["long_rtt_ms"] = round((self.long_rtt or 0.0) * 1000, 3)
+        return out
+
+def make_limiter(kind: str, **kwargs):
+    """Build the limiter named by LIMITER_TYPE ("none" returns None)"""
+    kind = kind.lower()
+    if kind == "none":
+        return None
+    if kind == "aimd":
+        return AIMDLimiter(**kwargs)
+    if kind == "gradient":
+        kwargs.pop("latency_threshold", None)
+        return GradientLimiter(**kwargs)
+    raise ValueError(f"Unknown limiter type {kind!r}, valid types: none, aimd, gradient")
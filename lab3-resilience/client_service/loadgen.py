@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# Load generator / benchmark harness for the resilient client.
+#
+# Drives call_backend() from main.py (breaker + retry included) at a fixed
+# arrival rate and reports latency percentiles per outcome as JSON.
+#
+#   python loadgen.py run --rps 500 --duration 60 --spawn-backend --out cb2.json
+#   python loadgen.py run --mode closed --concurrency 32 --url http://127.0.0.1:8000/work
+#   python loadgen.py compare cb2.json cb5.json
+#
+# Open-loop mode sends request i at start + i/rps no matter how slow earlier
+# requests were, and measures latency from that intended send time, so a
+# stalled client cannot hide its own queueing delay (coordinated omission).
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+from pathlib import Path
+from histogram import LatencyHistogram
+
+OUTCOMES = ("ok", "5xx", "timeout", "fast_fail", "rejected", "error", "stale")
+CONFIG_PREFIXES = ("CB_", "RETRY_", "CLIENT_", "HEDGE_", "LIMITER_", "CACHE_", "DEADLINE_", "BATCH_", "FAILURE_RATE", "SLOW_RATE", "MAX_DELAY_MS")
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the resilient client against a backend")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="generate load and write a result file")
+    run.add_argument("--mode", choices=["open", "closed"], default="open")
+    run.add_argument("--rps", type=float, default=100.0, help="arrival rate (open mode)")
+    run.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    run.add_argument("--concurrency", type=int, default=16, help="workers (closed mode)")
+    run.add_argument("--max-in-flight", type=int, default=10000,
+                     help="open mode: arrivals beyond this many in-flight calls are dropped")
+    run.add_argument("--url", help="backend URL (overrides BACKEND_URL)")
+    run.add_argument("--spawn-backend", action="store_true",
+                     help="start backend_service/main.py locally with uvicorn")
+    run.add_argument("--port", type=int, default=8000, help="port for --spawn-backend")
+    run.add_argument("--label", default=None, help="name stored in the result file")
+    run.add_argument("--out", default=None, help="write JSON results here")
+    run.add_argument("--log-level", default="WARNING")
+
+    cmp_ = sub.add_parser("compare", help="print percentiles of several result files")
+    cmp_.add_argument("files", nargs="+")
+    return p.parse_args()
+
+# === Local backend ===
+def spawn_backend(port: int) -> subprocess.Popen:
+    """Start the backend service on localhost and wait until it accepts connections"""
+    backend_dir = Path(__file__).resolve().parent.parent / "backend_service"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"backend did not start on port {port}")
+
+# === Load ===
+class Recorder:
+    def __init__(self):
+        self.hist = {name: LatencyHistogram() for name in OUTCOMES}
+        self.all = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.dropped = 0  # open-mode arrivals never sent; not latency samples
+
+    def record(self, outcome: str, latency_s: float, service_s: float):
+        self.hist[outcome].record_seconds(latency_s)
+        self.all.record_seconds(latency_s)
+        self.service.record_seconds(service_s)
+
+async def timed_call(main, rec: Recorder, intended: float):
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    result = await main.call_backend()
+    done = loop.time()
+    rec.record(main.classify_result(result), done - intended, done - started)
+
+async def open_loop(main, rec: Recorder, rps: float, duration: float, max_in_flight: int):
+    loop = asyncio.get_running_loop()
+    in_flight = set()
+    start = loop.time()
+    for i in range(int(rps * duration)):
+        intended = start + i / rps
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            rec.dropped += 1
+            continue
+        task = asyncio.create_task(timed_call(main, rec, intended))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+async def closed_loop(main, rec: Recorder, concurrency: int, duration: float):
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + duration
+
+    async def worker():
+        while loop.time() < stop_at:
+            await timed_call(main, rec, loop.time())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def run_load(main, args, rec: Recorder) -> float:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        if args.mode == "open":
+            await open_loop(main, rec, args.rps, args.duration, args.max_in_flight)
+        else:
+            await closed_loop(main, rec, args.concurrency, args.duration)
+    finally:
+        await main.client.aclose()
+    return loop.time() - started
+
+def run(args) -> dict:
+    backend = None
+    if args.spawn_backend:
+        backend = spawn_backend(args.port)
+        os.environ["BACKEND_URL"] = f"http://127.0.0.1:{args.port}/work"
+    elif args.url:
+        os.environ["BACKEND_URL"] = args.url
+
+    try:
+        # Imported late so BACKEND_URL and the resilience settings come from this env
+        import main
+        logging.getLogger().setLevel(args.log_level)
+        logging.getLogger("httpx").setLevel(max(logging.WARNING, logging.getLogger().level))
+
+        backend_calls = 0
+
+        async def count_request(request):
+            nonlocal backend_calls
+            backend_calls += 1
+
+        main.client.event_hooks["request"].append(count_request)
+        rec = Recorder()
+        elapsed = asyncio.run(run_load(main, args, rec))
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait()
+
+    requests = rec.all.total
+    offered = requests + rec.dropped
+    return {
+        "label": args.label or f"{args.mode}-{args.rps if args.mode == 'open' else args.concurrency}",
+        "mode": args.mode,
+        "target_rps": args.rps if args.mode == "open" else None,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "duration_s": round(elapsed, 3),
+        "requests": requests,
+        "dropped": rec.dropped,
+        "achieved_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "backend_calls": backend_calls,
+        "load_amplification": round(backend_calls / requests, 3) if requests else 0.0,
+        "outcomes": {name: h.total for name, h in rec.hist.items()},
+        # Drops count as failures: the caller wanted them served
+        "success_rate": round(rec.hist["ok"].total / offered, 4) if offered else 0.0,
+        "latency_ms": {
+            "all": rec.all.summary_ms(),
+            "service": rec.service.summary_ms(),
+            **{name: h.summary_ms() for name, h in rec.hist.items() if h.total},
+        },
+        "histograms": {"all": rec.all.to_dict()},
+        "config": {k: v for k, v in sorted(os.environ.items()) if k.startswith(CONFIG_PREFIXES)},
+    }
+
+# === Compare ===
+def compare(files):
+    rows = []
+    for path in files:
+        with open(path) as f:
+            r = json.load(f)
+        lat = r["latency_ms"]["all"]
+        rows.append((r["label"], r["achieved_rps"], r["success_rate"], r.get("dropped", 0),
+                     r["load_amplification"], lat["p50"], lat["p95"], lat["p99"], lat["p999"]))
+    header = ("label", "rps", "success", "dropped", "amplif", "p50", "p95", "p99", "p999")
+    print("".join(f"{h:>14}" for h in header))
+    for row in rows:
+        print("".join(f"{v:>14}" for v in row))
+
+def main_cli():
+    args = parse_args()
+    if args.cmd == "compare":
+        compare(args.files)
+        return
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    summary = {k: result[k] for k in ("label", "requests", "dropped", "achieved_rps", "success_rate", "outcomes")}
+    print(json.dumps({**summary, "latency_ms": result["latency_ms"]["all"]}, indent=2))
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Non-blocking logging for the request path.
+#
+# Handlers hang off a bounded queue drained by a QueueListener thread, so a
+# log call on the event loop only builds a LogRecord and does put_nowait();
+# formatting and the stderr write happen on the listener thread. When the
+# queue is full the record is dropped and counted instead of blocking.
+#
+#   LOG_FORMAT=text  - the original "%(asctime)s %(levelname)s %(message)s"
+#                      lines (what result/* parses), plus latency_ms=
+#   LOG_FORMAT=json  - one JSON object per line with the structured fields
+#   LOG_SUCCESS_SAMPLE_RATE - fraction of ok result lines kept; transitions,
+#                      retries and errors are always logged
+
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; structured fields come from extra={"fields": {...}}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 6),
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str, separators=(",", ":"))
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener thread"""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The stock prepare() formats the message here, on the caller's thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler = None
+_listener = None
+_sample_rate = 1.0
+
+def configure(fmt: str = "text", async_: bool = True, queue_size: int = 10000,
+              success_sample_rate: float = 1.0, level: int = logging.INFO):
+    """Replace the root handlers; safe to call more than once"""
+    global _handler, _listener, _sample_rate
+    shutdown()
+    _sample_rate = success_sample_rate
+
+    out = logging.StreamHandler()
+    out.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.setLevel(level)
+    if not async_:
+        root.addHandler(out)
+        return
+
+    q = queue.Queue(maxsize=queue_size)
+    _handler = DroppingQueueHandler(q)
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=True)
+    _listener.start()
+    root.addHandler(_handler)
+
+def shutdown():
+    """Flush queued records and stop the listener thread"""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+atexit.register(shutdown)
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+def log_result(logger: logging.Logger, state: str, result, outcome: str, latency_s: float):
+    """Per-request result line; ok results are sampled, everything else is kept"""
+    if outcome == "ok" and _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    latency_ms = round(latency_s * 1000, 3)
+    fields = {"event": "result", "breaker": state, "outcome": outcome, "latency_ms": latency_ms}
+    msg = "Breaker=%s result=%s latency_ms=%s"
+    if outcome == "ok" and _sample_rate < 1.0:
+        fields["sample_rate"] = _sample_rate
+        msg += f" sample_rate={_sample_rate}"
+    fields["result"] = result
+    logger.info(msg, state, result, latency_ms, extra={"fields": fields})
@@ -3,121 +3,553 @@
 
 import os
 import time
-import threading
+import atexit
+import asyncio
 import logging
+import contextvars
 import httpx
 from typing import Optional
-from fastapi import FastAPI
-from pybreaker import CircuitBreaker, CircuitBreakerError, CircuitBreakerListener
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential_jitter,
-    retry_if_exception_type,
-    before_sleep_log
-)
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
+from pybreaker import CircuitBreakerError, CircuitBreakerListener
+from tenacity import retry
+from breakers import AsyncCircuitBreaker, SlidingWindowBreaker, ProbeGate
+from breaker_store import make_storage
+from retry_budget import RetryBudget
+from policy import TransientError, retry_kwargs
+from hedging import Hedger
+from limiter import make_limiter
+from bulkhead import Bulkhead, BulkheadFullError, parse_bulkheads
+from pool import PoolStats, make_client
+from cache import ResponseCache
+from batcher import MicroBatcher
+import deadline
+import metrics
+import logsetup
+import events
 
 # === Logging setup ===
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+# Records go through a bounded queue to a background writer thread (LOG_ASYNC);
+# LOG_FORMAT=json emits structured lines, text keeps the format result/* parses
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+logsetup.configure(
+    fmt=LOG_FORMAT,
+    async_=LOG_ASYNC,
+    queue_size=LOG_QUEUE_SIZE,
+    success_sample_rate=LOG_SUCCESS_SAMPLE_RATE,
+)
 # Enable tenacity retry logs (this line makes retry attempts visible)
 logging.getLogger("tenacity.retry").setLevel(logging.INFO)
 
-app = FastAPI()
-
 # === Load environment variables ===
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000/work")
 CB_FAIL_MAX = int(os.getenv("CB_FAIL_MAX", "2"))
 CB_RESET_TIMEOUT = int(os.getenv("CB_RESET_TIMEOUT", "1"))
 CB_HALF_OPEN_MAX_CALLS = int(os.getenv("CB_HALF_OPEN_MAX_CALLS", "1"))
+# CB_TYPE=consecutive keeps pybreaker; CB_TYPE=sliding trips on failure/slow-call rate
+CB_TYPE = os.getenv("CB_TYPE", "consecutive").lower()
+CB_WINDOW_TYPE = os.getenv("CB_WINDOW_TYPE", "count").lower()
+CB_WINDOW_SIZE = int(os.getenv("CB_WINDOW_SIZE", "20"))
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", "10"))
+CB_FAILURE_RATE_THRESHOLD = float(os.getenv("CB_FAILURE_RATE_THRESHOLD", "0.5"))
+CB_SLOW_CALL_RATE_THRESHOLD = float(os.getenv("CB_SLOW_CALL_RATE_THRESHOLD", "1.0"))
+CB_SLOW_CALL_MS = int(os.getenv("CB_SLOW_CALL_MS", "2000"))
+# Where breaker state lives: memory (per process) | shm (all workers on the node) | network (all replicas)
+CB_STATE_STORE = os.getenv("CB_STATE_STORE", "memory").lower()
+CB_STATE_SHM_PATH = os.getenv("CB_STATE_SHM_PATH", "/dev/shm/lab3-breakers")
+CB_STATE_ADDR = os.getenv("CB_STATE_ADDR", "127.0.0.1:7600")
+CB_STATE_SYNC_MS = float(os.getenv("CB_STATE_SYNC_MS", "20"))
 RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "1"))
 RETRY_BASE = float(os.getenv("RETRY_BASE", "0.2"))
 RETRY_MAX = float(os.getenv("RETRY_MAX", "2.0"))
+# Retry budget: retries allowed up to RATIO x recent successes + MIN_PER_SEC floor
+RETRY_BUDGET_ENABLED = os.getenv("RETRY_BUDGET_ENABLED", "false").lower() == "true"
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SEC = float(os.getenv("RETRY_BUDGET_MIN_PER_SEC", "1"))
+RETRY_BUDGET_TTL = int(os.getenv("RETRY_BUDGET_TTL", "10"))
+# Hedging: send one backup request once the first is slower than HEDGE_PERCENTILE
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "50"))
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+HEDGE_BUDGET_MIN_PER_SEC = float(os.getenv("HEDGE_BUDGET_MIN_PER_SEC", "1"))
+# Adaptive concurrency limit around call_backend(): none | aimd | gradient
+LIMITER_TYPE = os.getenv("LIMITER_TYPE", "none").lower()
+LIMITER_INITIAL = int(os.getenv("LIMITER_INITIAL", "20"))
+LIMITER_MIN = int(os.getenv("LIMITER_MIN", "1"))
+LIMITER_MAX = int(os.getenv("LIMITER_MAX", "500"))
+LIMITER_BACKOFF = float(os.getenv("LIMITER_BACKOFF", "0.9"))
+LIMITER_LATENCY_THRESHOLD_MS = float(os.getenv("LIMITER_LATENCY_THRESHOLD_MS", "1500"))
+# Connection pool / HTTP settings (bulkhead compartments may override pool sizes)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "5.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "2.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "2.0"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "2.0"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "2.0"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+# Bulkheads: JSON {name: {url, max_concurrent, max_queue, queue_timeout_ms,
+# max_connections, max_keepalive, breaker}}; "work" is the BACKEND_URL compartment
+BULKHEADS = os.getenv("BULKHEADS", "")
+# Load engine: N closed-loop workers, or a paced dispatcher when a target RPS is set
+CLIENT_CONCURRENCY = int(os.getenv("CLIENT_CONCURRENCY", "1"))
+CLIENT_TARGET_RPS = float(os.getenv("CLIENT_TARGET_RPS", "0"))
+CLIENT_INTERVAL = float(os.getenv("CLIENT_INTERVAL", "0.3"))
+# Response cache: serve the last good result (flagged stale) on fast-fail/5xx;
+# CACHE_TTL > 0 also serves fresh results without calling the backend
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "false").lower() == "true"
+CACHE_TTL = float(os.getenv("CACHE_TTL", "0"))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", "300"))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "1000"))
+CACHE_STALE_ON = {o.strip() for o in os.getenv("CACHE_STALE_ON", "fast_fail,5xx").split(",") if o.strip()}
+# Opt-in, and only with CACHE_ENABLED: concurrent callers share one backend call
+CACHE_SINGLE_FLIGHT = os.getenv("CACHE_SINGLE_FLIGHT", "false").lower() == "true"
+# Deadline: total budget of one call (queueing, attempts, backoff); 0 disables it
+DEADLINE_MS = float(os.getenv("DEADLINE_MS", "0"))
+DEADLINE_MIN_ATTEMPT_MS = float(os.getenv("DEADLINE_MIN_ATTEMPT_MS", "50"))
+# Micro-batching: concurrent calls share one POST <url>/batch (up to MAX_SIZE items,
+# waiting at most LINGER_MS for more); hedging does not apply to batched calls
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "false").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_LINGER_MS = float(os.getenv("BATCH_LINGER_MS", "2"))
+# Binary per-request event file for analysis/eventstore.py (empty disables it)
+EVENTS_PATH = os.getenv("EVENTS_PATH", "")
 
 # === Listener for state transitions ===
 class LogTransitions(CircuitBreakerListener):
+    def __init__(self, compartment: Optional[str] = None):
+        # Compartment breakers tag their lines; the main breaker keeps the old format
+        self.suffix = f" [{compartment}]" if compartment else ""
+        self.compartment = compartment
+
     def state_change(self, cb, old_state, new_state):
+        old = getattr(old_state, 'name', str(old_state)).upper()
+        new = getattr(new_state, 'name', str(new_state)).upper()
         logging.warning(
-            f"[CB Transition] {getattr(old_state, 'name', str(old_state)).upper()} -> {getattr(new_state, 'name', str(new_state)).upper()}"
+            f"[CB Transition] {old} -> {new}{self.suffix}",
+            extra={"fields": {"event": "transition", "from": old, "to": new, "compartment": self.compartment}},
         )
 
 # === Circuit Breaker setup ===
-breaker = CircuitBreaker(
-    fail_max=CB_FAIL_MAX,
-    reset_timeout=CB_RESET_TIMEOUT,
-    name="backend-breaker",
-    listeners=[LogTransitions()]
+def make_breaker(name: str, compartment: Optional[str] = None):
+    storage = make_storage(CB_STATE_STORE, name, shm_path=CB_STATE_SHM_PATH,
+                           address=CB_STATE_ADDR, sync_interval=CB_STATE_SYNC_MS / 1000.0)
+    if CB_TYPE == "sliding":
+        return SlidingWindowBreaker(
+            failure_rate_threshold=CB_FAILURE_RATE_THRESHOLD,
+            slow_call_rate_threshold=CB_SLOW_CALL_RATE_THRESHOLD,
+            slow_call_duration=CB_SLOW_CALL_MS / 1000.0,
+            window_type=CB_WINDOW_TYPE,
+            window_size=CB_WINDOW_SIZE,
+            minimum_calls=CB_MIN_CALLS,
+            reset_timeout=CB_RESET_TIMEOUT,
+            half_open_max_calls=CB_HALF_OPEN_MAX_CALLS,
+            name=name,
+            storage=storage,
+            listeners=[LogTransitions(compartment), metrics.TransitionCounter()]
+        )
+    return AsyncCircuitBreaker(
+        fail_max=CB_FAIL_MAX,
+        reset_timeout=CB_RESET_TIMEOUT,
+        name=name,
+        state_storage=storage,
+        listeners=[LogTransitions(compartment), metrics.TransitionCounter()]
+    )
+
+breaker = make_breaker("backend-breaker")
+
+# Wakes callers waiting on OPEN exactly when a probe is allowed
+probe_gate = ProbeGate(breaker)
+
+# === HTTP clients (one connection pool per bulkhead compartment) ===
+bulkhead_specs = parse_bulkheads(BULKHEADS)
+
+def make_compartment_client(spec: dict) -> httpx.AsyncClient:
+    return make_client(
+        max_connections=spec.get("max_connections", HTTP_MAX_CONNECTIONS),
+        max_keepalive=spec.get("max_keepalive", HTTP_MAX_KEEPALIVE),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        write_timeout=HTTP_WRITE_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        http2=HTTP2_ENABLED,
+    )
+
+client = make_compartment_client(bulkhead_specs.get("work", {}))
+
+# === Retry budget (shared by all in-flight calls) ===
+retry_budget = RetryBudget(
+    ratio=RETRY_BUDGET_RATIO,
+    min_per_sec=RETRY_BUDGET_MIN_PER_SEC,
+    ttl=RETRY_BUDGET_TTL,
 )
 
-client = httpx.Client(timeout=2.0)
+# === Hedging (its own budget, so hedges cannot double backend load) ===
+def make_hedger() -> Hedger:
+    return Hedger(
+        budget=RetryBudget(ratio=HEDGE_BUDGET_RATIO, min_per_sec=HEDGE_BUDGET_MIN_PER_SEC),
+        percentile=HEDGE_PERCENTILE,
+        min_delay=HEDGE_MIN_DELAY_MS / 1000.0,
+    )
+
+# === Bulkhead compartments ===
+class Compartment:
+    """A named dependency: its own URL, connection pool, slots and (optionally) breaker"""
+
+    def __init__(self, name, url, http, breaker, probe_gate, bulkhead=None):
+        self.name = name
+        self.url = url
+        self.http = http
+        self.breaker = breaker
+        self.probe_gate = probe_gate
+        self.bulkhead = bulkhead
+        self.hedger = make_hedger()
+        self.pool_stats = PoolStats()
+        self.metrics = metrics.CompartmentMetrics(name)
+        self.batcher = MicroBatcher(
+            lambda items: send_batch(self, items),
+            max_batch=BATCH_MAX_SIZE,
+            linger=BATCH_LINGER_MS / 1000.0,
+        ) if BATCH_ENABLED else None
+
+def make_bulkhead(name: str, spec: dict) -> Bulkhead:
+    return Bulkhead(
+        name,
+        max_concurrent=spec.get("max_concurrent", 100),
+        max_queue=spec.get("max_queue", 0),
+        queue_timeout=spec.get("queue_timeout_ms", 1000) / 1000.0,
+    )
+
+compartments = {
+    "work": Compartment(
+        "work", BACKEND_URL, client, breaker, probe_gate,
+        make_bulkhead("work", bulkhead_specs["work"]) if "work" in bulkhead_specs else None,
+    )
+}
+for _name, _spec in bulkhead_specs.items():
+    if _name == "work":
+        continue
+    if _spec.get("breaker", False):
+        _breaker = make_breaker(f"{_name}-breaker", compartment=_name)
+        _gate = ProbeGate(_breaker)
+    else:
+        _breaker, _gate = breaker, probe_gate
+    compartments[_name] = Compartment(
+        _name, _spec.get("url", BACKEND_URL), make_compartment_client(_spec), _breaker, _gate,
+        make_bulkhead(_name, _spec),
+    )
+hedger = compartments["work"].hedger
 
-# === Custom transient error ===
-class TransientError(Exception):
-    pass
+async def within_deadline(send):
+    """Await send(left) bounded by what is left of the call's budget (left is None without one)"""
+    left = deadline.check(DEADLINE_MIN_ATTEMPT_MS / 1000.0)
+    if left is None:
+        return await send(None)
+    try:
+        async with asyncio.timeout(left):
+            return await send(left)
+    except TimeoutError:
+        raise deadline.DeadlineExceeded() from None
+
+async def send_request(comp: Compartment) -> httpx.Response:
+    # The backend is told the time left, so it can drop work the caller won't wait for
+    return await within_deadline(lambda left: comp.http.get(
+        comp.url,
+        headers={deadline.HEADER: f"{left * 1000:.0f}"} if left is not None else None,
+        extensions={"trace": comp.pool_stats.tracer()},
+    ))
+
+async def send_batch(comp: Compartment, items: list) -> list:
+    """POST one micro-batch; a failed request fails every item in it"""
+    r = await comp.http.post(comp.url + "/batch", json={"items": items},
+                             extensions={"trace": comp.pool_stats.tracer()})
+    if r.status_code >= 500:
+        raise TransientError(f"server error {r.status_code}")
+    r.raise_for_status()
+    return r.json()["results"]
+
+async def send_item(comp: Compartment) -> dict:
+    """One work item through the compartment's micro-batcher; its deadline travels in the item"""
+    return await within_deadline(lambda left: comp.batcher.submit(
+        {} if left is None else {"timeout_ms": round(left * 1000)}))
+
+# Round-trip time of the current call's latest backend attempt, for the
+# concurrency limiter; backoff sleeps between retries are not backend latency
+_attempt_rtt = contextvars.ContextVar("attempt_rtt", default=None)
+
+async def timed_attempt(send):
+    """Await one backend attempt, noting its round-trip time when a limiter is watching"""
+    holder = _attempt_rtt.get()
+    if holder is None:
+        return await send()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        return await send()
+    finally:
+        holder[0] = loop.time() - start
 
 # === Retry logic (now with visible log messages) ===
-@retry(
-    reraise=True,
-    stop=stop_after_attempt(RETRY_MAX_ATTEMPTS),
-    wait=wait_exponential_jitter(exp_base=RETRY_BASE, max=RETRY_MAX),
-    retry=retry_if_exception_type(TransientError),
-    before_sleep=before_sleep_log(logging.getLogger("tenacity.retry"), logging.WARNING)
-)
-def fetch_with_retry() -> dict:
+retry_logger = logging.getLogger("tenacity.retry")
+
+def before_retry_sleep(retry_state):
+    """Log the retry in tenacity's before_sleep_log format and count it for /metrics"""
+    comp = retry_state.args[0] if retry_state.args else None
+    (comp or compartments["work"]).metrics.retries.inc()
+    if not retry_logger.isEnabledFor(logging.WARNING):
+        return
+    ex = retry_state.outcome.exception()
+    fn = retry_state.fn
+    delay = retry_state.next_action.sleep
+    retry_logger.warning(
+        f"Retrying {fn.__module__}.{fn.__qualname__} in {delay} seconds as it raised {ex.__class__.__name__}: {ex}.",
+        extra={"fields": {
+            "event": "retry",
+            "attempt": retry_state.attempt_number,
+            "delay_s": delay,
+            "error": f"{ex.__class__.__name__}: {ex}",
+        }},
+    )
+
+@retry(**retry_kwargs(
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE,
+    RETRY_MAX,
+    budget=retry_budget if RETRY_BUDGET_ENABLED else None,
+    before_sleep=before_retry_sleep,
+    min_attempt=DEADLINE_MIN_ATTEMPT_MS / 1000.0,
+))
+async def fetch_with_retry(comp: Optional[Compartment] = None) -> dict:
     """GET backend with retry and exponential backoff + jitter"""
-    r = client.get(BACKEND_URL)
+    comp = comp or compartments["work"]
+    events.count_attempt()
+    if comp.batcher is not None:
+        item = await timed_attempt(lambda: send_item(comp))
+        if item["status"] >= 500:
+            raise TransientError(f"server error {item['status']}")
+        retry_budget.deposit()
+        return item
+    if HEDGE_ENABLED:
+        r = await timed_attempt(lambda: comp.hedger.run(lambda: send_request(comp),
+                                                        is_good=lambda resp: resp.status_code < 500))
+    else:
+        r = await timed_attempt(lambda: send_request(comp))
     if r.status_code >= 500:
         raise TransientError(f"server error {r.status_code}")
+    retry_budget.deposit()
     return r.json()
 
-def call_backend() -> Optional[dict]:
+# === Adaptive concurrency limit ===
+limiter = make_limiter(
+    LIMITER_TYPE,
+    initial_limit=LIMITER_INITIAL,
+    min_limit=LIMITER_MIN,
+    max_limit=LIMITER_MAX,
+    backoff=LIMITER_BACKOFF,
+    latency_threshold=LIMITER_LATENCY_THRESHOLD_MS / 1000.0,
+)
+
+# === Response cache ===
+cache = ResponseCache(
+    max_size=CACHE_MAX_SIZE,
+    ttl=CACHE_TTL,
+    stale_ttl=CACHE_STALE_TTL,
+) if CACHE_ENABLED else None
+
+metrics.register(metrics.ResilienceCollector(compartments, retry_budget, limiter, hedging=HEDGE_ENABLED,
+                                             cache=cache))
+metrics.register(metrics.LogDropCollector(logsetup.dropped_records))
+
+# === Per-request event file ===
+recorder = events.EventRecorder(EVENTS_PATH) if EVENTS_PATH else None
+if recorder is not None:
+    atexit.register(recorder.close)
+
+async def call_backend(compartment: str = "work") -> Optional[dict]:
+    comp = compartments[compartment]
+    attempts = events.start_call()
+    start = time.perf_counter()
+    with comp.metrics.track(), deadline.budget(DEADLINE_MS / 1000.0):
+        result = await call_cached(comp)
+    elapsed = time.perf_counter() - start
+    outcome = classify_result(result)
+    comp.metrics.observe(outcome, elapsed)
+    if recorder is not None:
+        state = comp.breaker.current_state
+        recorder.record(outcome, getattr(state, "name", str(state)).upper(), elapsed, attempts[0])
+    return result
+
+async def call_cached(comp: Compartment) -> Optional[dict]:
+    if cache is None:
+        return await call_isolated(comp)
+    key = comp.url
+    hit = cache.fresh(key)
+    if hit is not None:
+        return hit
+    if CACHE_SINGLE_FLIGHT:
+        result = await cache.single_flight(key, lambda: call_isolated(comp))
+    else:
+        result = await call_isolated(comp)
+    outcome = classify_result(result)
+    if outcome == "ok":
+        cache.put(key, result)
+    elif outcome in CACHE_STALE_ON:
+        stale = cache.stale(key)
+        if stale is not None:
+            good, age = stale
+            return {**good, "stale": True, "stale_age_s": round(age, 3), "fallback_for": result["error"]}
+    return result
+
+async def call_isolated(comp: Compartment) -> Optional[dict]:
+    if comp.bulkhead is None:
+        return await call_limited(comp)
     try:
-        return breaker.call(fetch_with_retry)
-    except CircuitBreakerError:
-        logging.warning("Breaker OPEN: fast-fail without calling backend")
+        async with comp.bulkhead.slot():
+            return await call_limited(comp)
+    except BulkheadFullError as e:
+        return {"error": str(e)}
+
+async def call_limited(comp: Compartment) -> Optional[dict]:
+    if limiter is None:
+        return await call_through_breaker(comp)
+    if not limiter.acquire():
+        return {"error": "concurrency limit exceeded"}
+    rtt = [None]
+    token = _attempt_rtt.set(rtt)
+    result = None
+    try:
+        result = await call_through_breaker(comp)
+        return result
+    finally:
+        _attempt_rtt.reset(token)
+        outcome = classify_result(result)
+        # Fast-fails never reached the backend, so they carry no latency signal
+        limiter.release(None if outcome in ("fast_fail", "rejected") else rtt[0],
+                        dropped=outcome in ("5xx", "timeout"))
+
+async def call_through_breaker(comp: Compartment) -> Optional[dict]:
+    try:
+        # Budget spent waiting for a slot is not the backend's fault: don't count it on the breaker
+        deadline.check(DEADLINE_MIN_ATTEMPT_MS / 1000.0)
+    except deadline.DeadlineExceeded as e:
+        return {"error": str(e)}
+    try:
+        return await comp.breaker.call_async(fetch_with_retry, comp)
+    except CircuitBreakerError as e:
+        cause = e.__cause__  # set by AsyncCircuitBreaker on the call that trips it
+        if cause is not None:
+            # This call reached the backend and its failure tripped the breaker:
+            # report that failure (a 5xx/timeout for the limiter), not a fast-fail
+            return {"error": str(cause) or type(cause).__name__}
+        logging.warning("Breaker OPEN: fast-fail without calling backend",
+                        extra={"fields": {"event": "fast_fail", "compartment": comp.name}})
         return {"error": "circuit breaker open"}
     except Exception as e:
-        return {"error": str(e)}
+        # Some httpx errors (e.g. ReadTimeout) carry an empty message
+        return {"error": str(e) or type(e).__name__}
+
+def classify_result(result: Optional[dict]) -> str:
+    """Map a call_backend() result to ok / stale / 5xx / timeout / fast_fail / rejected / error"""
+    if result and "error" not in result:
+        return "stale" if result.get("stale") else "ok"
+    error = str((result or {}).get("error", ""))
+    if error == "circuit breaker open":
+        return "fast_fail"
+    if error == "concurrency limit exceeded" or error.startswith("bulkhead "):
+        return "rejected"
+    if error.startswith("server error"):
+        return "5xx"
+    if "timeout" in error.lower() or "timed out" in error.lower():
+        return "timeout"
+    return "error"
+
+# === Load engine ===
+_last_state = None
+
+def observe_state() -> str:
+    """Return the breaker state name, logging once per change across all workers"""
+    global _last_state
+    state_obj = breaker.current_state
+    state_name = getattr(state_obj, "name", str(state_obj)).upper()
+    if state_name != _last_state:
+        logging.warning(f"Breaker state changed → {state_name}",
+                        extra={"fields": {"event": "state", "state": state_name}})
+        _last_state = state_name
+    return state_name
 
-# === Worker loop ===
-def worker_loop():
-    last_state = None
+async def logged_call(state_name: str):
+    """One call_backend() plus its result line (ok lines sampled by LOG_SUCCESS_SAMPLE_RATE)"""
+    start = time.perf_counter()
+    try:
+        result = await call_backend()
+        logsetup.log_result(logging.getLogger(), state_name, result, classify_result(result),
+                            time.perf_counter() - start)
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}", extra={"fields": {"event": "error", "error": str(e)}})
+
+async def worker_loop():
+    """Closed-loop worker: one call at a time, CLIENT_INTERVAL apart"""
+    while True:
+        state_name = observe_state()
+        if state_name == "OPEN":
+            # Sleep until reset_timeout expires (or the state changes) instead
+            # of polling; the breaker itself moves to HALF-OPEN on the next call
+            await probe_gate.wait()
+            state_name = observe_state()
+
+        await logged_call(state_name)
+        await asyncio.sleep(CLIENT_INTERVAL)
+
+async def paced_call(slots: asyncio.Semaphore):
+    try:
+        await logged_call(observe_state())
+    finally:
+        slots.release()
+
+async def paced_loop():
+    """Start CLIENT_TARGET_RPS calls per second, at most CLIENT_CONCURRENCY in flight"""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(CLIENT_CONCURRENCY)
+    in_flight = set()
+    interval = 1.0 / CLIENT_TARGET_RPS
+    next_at = loop.time()
     while True:
-        state_obj = breaker.current_state
-        state_name = getattr(state_obj, "name", str(state_obj)).upper()
-
-        if state_name != last_state:
-            logging.warning(f"Breaker state changed → {state_name}")
-            last_state = state_name
-
-        try:
-            # Handle OPEN state manually
-            if state_name == "OPEN":
-                opened_at = getattr(breaker._state_storage, "_CircuitBreakerStorage__state_opened_at", None)
-                if opened_at:
-                    elapsed = time.time() - opened_at
-                    if elapsed >= breaker.reset_timeout:
-                        logging.warning(
-                            f"Breaker has been OPEN for {elapsed:.2f}s ≥ {breaker.reset_timeout}s → forcing HALF_OPEN test call..."
-                        )
-                        try:
-                            breaker.call(fetch_with_retry)
-                        except Exception as e:
-                            logging.warning(f"HALF_OPEN test failed: {e}")
-                        time.sleep(0.5)
-                        continue
-                    else:
-                        logging.info(f"Breaker still OPEN ({elapsed:.2f}s/{breaker.reset_timeout}s)")
-                        time.sleep(0.3)
-                        continue
-
-            result = call_backend()
-            logging.info(f"Breaker={state_name} result={result}")
-        except Exception as e:
-            logging.error(f"Unexpected error: {e}")
-
-        time.sleep(0.3)
-
-threading.Thread(target=worker_loop, daemon=True).start()
+        await slots.acquire()
+        task = asyncio.create_task(paced_call(slots))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+        next_at += interval
+        delay = next_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Fell behind (all slots busy): resume pacing from now, no burst
+            next_at = loop.time()
+
+def start_engine() -> list:
+    if CLIENT_TARGET_RPS > 0:
+        return [asyncio.create_task(paced_loop())]
+    return [asyncio.create_task(worker_loop()) for _ in range(CLIENT_CONCURRENCY)]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = start_engine()
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for comp in compartments.values():
+        await comp.http.aclose()
+    if recorder is not None:
+        recorder.flush()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/health")
 def health():
@@ -127,10 +559,44 @@ def health():
             "CB_FAIL_MAX": CB_FAIL_MAX,
             "CB_RESET_TIMEOUT": CB_RESET_TIMEOUT,
             "CB_HALF_OPEN_MAX_CALLS": CB_HALF_OPEN_MAX_CALLS,
+            "CB_TYPE": CB_TYPE,
+            "CB_STATE_STORE": CB_STATE_STORE,
             "RETRY_MAX_ATTEMPTS": RETRY_MAX_ATTEMPTS,
+            "CLIENT_CONCURRENCY": CLIENT_CONCURRENCY,
+            "CLIENT_TARGET_RPS": CLIENT_TARGET_RPS,
+            "RETRY_BUDGET_ENABLED": RETRY_BUDGET_ENABLED,
+            "HEDGE_ENABLED": HEDGE_ENABLED,
+            "LIMITER_TYPE": LIMITER_TYPE,
+            "HTTP2_ENABLED": HTTP2_ENABLED,
+            "CACHE_ENABLED": CACHE_ENABLED,
+            "DEADLINE_MS": DEADLINE_MS,
+            "BATCH_ENABLED": BATCH_ENABLED,
+        },
+        "retry_budget": retry_budget.snapshot(),
+        "hedging": hedger.snapshot() if HEDGE_ENABLED else None,
+        "limiter": limiter.snapshot() if limiter else None,
+        "cache": cache.snapshot() if cache is not None else None,
+        "batching": {name: comp.batcher.snapshot() for name, comp in compartments.items()
+                     if comp.batcher is not None} or None,
+        "pools": {name: comp.pool_stats.snapshot() for name, comp in compartments.items()},
+        "bulkheads": {
+            name: {"breaker_state": str(comp.breaker.current_state), **comp.bulkhead.snapshot()}
+            for name, comp in compartments.items() if comp.bulkhead
         },
     }
 
+@app.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/call/{name}")
+async def call_compartment(name: str):
+    """Call one bulkhead compartment on demand"""
+    if name not in compartments:
+        raise HTTPException(status_code=404, detail=f"unknown compartment {name}")
+    return await call_backend(name)
+
 @app.get("/")
 def root():
     return {"message": "Client resilience service running"}
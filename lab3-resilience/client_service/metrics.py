@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# Prometheus metrics for the client (served on GET /metrics).
+#
+# Hot-path metrics (latency, in-flight, retries, transitions) are plain
+# prometheus_client children bound once per compartment, so an update is a
+# lock + add. Everything the resilience components already count (retry
+# budget, hedging, limiter, bulkheads, pools, breaker state) is read by a
+# custom collector at scrape time and costs nothing per call.
+
+from pybreaker import CircuitBreakerListener
+from prometheus_client import (
+    Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, disable_created_metrics
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# *_created series double the scrape size and nothing here reads them
+disable_created_metrics()
+
+OUTCOMES = ("ok", "5xx", "timeout", "fast_fail", "rejected", "error", "stale")
+BREAKER_STATES = ("closed", "open", "half-open")
+
+# Backend /work sleeps up to MAX_DELAY_MS, the client times out at 2s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "client_request_latency_seconds",
+    "call_backend() latency including retries, by result outcome",
+    ["compartment", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge("client_in_flight_requests", "call_backend() calls in progress", ["compartment"])
+RETRY_ATTEMPTS = Counter("client_retry_attempts_total", "Retries scheduled by tenacity", ["compartment"])
+TRANSITIONS = Counter(
+    "client_breaker_transitions_total",
+    "Circuit breaker state transitions",
+    ["breaker", "from_state", "to_state"],
+)
+
+class CompartmentMetrics:
+    """Metric children pre-bound to one compartment label"""
+
+    def __init__(self, name: str):
+        self.in_flight = IN_FLIGHT.labels(name)
+        self.retries = RETRY_ATTEMPTS.labels(name)
+        self._latency = {outcome: REQUEST_LATENCY.labels(name, outcome) for outcome in OUTCOMES}
+
+    def observe(self, outcome: str, seconds: float):
+        self._latency[outcome].observe(seconds)
+
+    def track(self):
+        """Context manager counting the call as in flight"""
+        return self.in_flight.track_inprogress()
+
+class TransitionCounter(CircuitBreakerListener):
+    def state_change(self, cb, old_state, new_state):
+        TRANSITIONS.labels(
+            cb.name or "breaker",
+            getattr(old_state, "name", str(old_state)),
+            getattr(new_state, "name", str(new_state)),
+        ).inc()
+
+def _state_name(breaker) -> str:
+    state = breaker.current_state
+    return getattr(state, "name", str(state))
+
+class ResilienceCollector:
+    """Exports the counters kept by the resilience components at scrape time"""
+
+    def __init__(self, compartments: dict, retry_budget, limiter=None, hedging: bool = False, cache=None):
+        self.compartments = compartments
+        self.retry_budget = retry_budget
+        self.limiter = limiter
+        self.hedging = hedging
+        self.cache = cache
+
+    def collect(self):
+        state = GaugeMetricFamily(
+            "client_breaker_state", "1 for the breaker's current state", labels=["breaker", "state"])
+        seen = set()
+        for comp in self.compartments.values():
+            breaker = comp.breaker
+            if id(breaker) in seen:
+                continue
+            seen.add(id(breaker))
+            current = _state_name(breaker)
+            for name in BREAKER_STATES:
+                state.add_metric([breaker.name or "breaker", name], 1.0 if current == name else 0.0)
+        yield state
+
+        budget = self.retry_budget.snapshot()
+        retries = CounterMetricFamily(
+            "client_retry_budget_decisions", "Retries allowed or denied by the retry budget", labels=["decision"])
+        retries.add_metric(["allowed"], budget["retries_allowed"])
+        retries.add_metric(["denied"], budget["retries_denied"])
+        yield retries
+
+        if self.limiter is not None:
+            limiter = self.limiter.snapshot()
+            yield GaugeMetricFamily("client_limiter_limit", "Current adaptive concurrency limit", value=limiter["limit"])
+            yield CounterMetricFamily("client_limiter_rejected", "Calls rejected by the concurrency limit",
+                                      value=limiter["rejected"])
+
+        if self.hedging:
+            hedges = CounterMetricFamily("client_hedges", "Hedged requests", labels=["compartment", "result"])
+            delay = GaugeMetricFamily("client_hedge_delay_seconds", "Current hedge delay", labels=["compartment"])
+            for name, comp in self.compartments.items():
+                snap = comp.hedger.snapshot()
+                hedges.add_metric([name, "sent"], snap["hedges_sent"])
+                hedges.add_metric([name, "won"], snap["hedges_won"])
+                hedges.add_metric([name, "denied"], snap["hedges_denied"])
+                delay.add_metric([name], snap["hedge_delay_ms"] / 1000.0)
+            yield hedges
+            yield delay
+
+        if self.cache is not None:
+            cache = self.cache.snapshot()
+            lookups = CounterMetricFamily("client_cache_lookups", "Response cache lookups", labels=["result"])
+            for result in ("hits", "misses", "stale_served", "stale_missing", "coalesced"):
+                lookups.add_metric([result], cache[result])
+            yield lookups
+            yield GaugeMetricFamily("client_cache_entries", "Results held by the response cache", value=cache["size"])
+            yield CounterMetricFamily("client_cache_evictions", "LRU evictions from the response cache",
+                                      value=cache["evictions"])
+
+        active = GaugeMetricFamily("client_bulkhead_active", "Bulkhead slots in use", labels=["compartment"])
+        queued = GaugeMetricFamily("client_bulkhead_queued", "Calls waiting for a bulkhead slot", labels=["compartment"])
+        rejected = CounterMetricFamily("client_bulkhead_rejected", "Calls rejected by a bulkhead",
+                                       labels=["compartment", "reason"])
+        for name, comp in self.compartments.items():
+            if comp.bulkhead is None:
+                continue
+            snap = comp.bulkhead.snapshot()
+            active.add_metric([name], snap["active"])
+            queued.add_metric([name], snap["queued"])
+            rejected.add_metric([name, "full"], snap["rejected"])
+            rejected.add_metric([name, "queue_timeout"], snap["queue_timeouts"])
+        yield active
+        yield queued
+        yield rejected
+
+        pool_requests = CounterMetricFamily("client_pool_requests", "Requests sent on pooled connections",
+                                            labels=["compartment"])
+        opened = CounterMetricFamily("client_pool_connections_opened", "TCP connections opened",
+                                     labels=["compartment"])
+        wait = GaugeMetricFamily("client_pool_wait_seconds", "Time waiting for a pooled connection",
+                                 labels=["compartment", "quantile"])
+        for name, comp in self.compartments.items():
+            stats = comp.pool_stats
+            pool_requests.add_metric([name], stats.requests)
+            opened.add_metric([name], stats.connections_opened)
+            if stats.pool_wait.total:
+                for q in (50, 99):
+                    wait.add_metric([name, str(q / 100)], stats.pool_wait.percentile(q) / 1_000_000)
+        yield pool_requests
+        yield opened
+        yield wait
+
+class LogDropCollector:
+    """Log records dropped because the async logging queue was full"""
+
+    def __init__(self, dropped):
+        self.dropped = dropped
+
+    def collect(self):
+        yield CounterMetricFamily("client_log_records_dropped", "Log records dropped by the logging queue",
+                                  value=self.dropped())
+
+def register(collector):
+    REGISTRY.register(collector)
+
+def render() -> tuple:
+    """Return (body, content type) for the /metrics response"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
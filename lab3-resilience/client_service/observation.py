@@ -1,29 +1,14 @@
-import pandas as pd
+import sys
 import matplotlib.pyplot as plt
-import re
-from datetime import datetime
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from analysis import parse_log
+from analysis.figures import transitions_over_time
 
+# The figure lives in analysis/figures.py (python -m analysis.render client_service draws it headless)
 log_file = "transitions.log"
-pattern = r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d+ .* \[CB Transition\] (\w+) -> (\w+)"
+transitions = parse_log(log_file, kinds=("transitions",)).transitions
 
-rows = []
-with open(log_file) as f:
-    for line in f:
-        m = re.search(pattern, line)
-        if m:
-            t, from_state, to_state = m.groups()
-            rows.append({"time": datetime.strptime(t, "%Y-%m-%d %H:%M:%S"),
-                         "from": from_state, "to": to_state})
-
-df = pd.DataFrame(rows)
-
-
-fig, ax = plt.subplots(figsize=(10, 3))
-ax.plot(df["time"], df["to"], marker="o", linestyle="-")
-ax.set_title("Circuit Breaker State Transitions Over Time")
-ax.set_xlabel("Time")
-ax.set_ylabel("State")
-plt.xticks(rotation=45)
-plt.tight_layout()
+transitions_over_time(transitions)
 plt.show()
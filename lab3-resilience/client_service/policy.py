@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Retry policy shared by the client (main.py) and the simulator (simulate.py),
+# so both run exactly the same tenacity configuration.
+
+from tenacity import stop_after_attempt, wait_exponential_jitter, retry_if_exception_type
+from retry_budget import stop_when_budget_exhausted
+from deadline import stop_before_deadline
+
+# === Custom transient error ===
+class TransientError(Exception):
+    pass
+
+def retry_kwargs(max_attempts: int, base: float, max_wait: float, budget=None, before_sleep=None,
+                 min_attempt: float = 0.0) -> dict:
+    """
+    Arguments for tenacity.retry(): retry TransientError with exponential
+    backoff + jitter, and never sleep into a retry the call's deadline
+    (deadline.py) leaves less than `min_attempt` seconds for
+    """
+    stop = stop_after_attempt(max_attempts) | stop_before_deadline(min_attempt)
+    if budget is not None:
+        # Last, so a token is only spent once nothing else stops the retry
+        # (stop_any short-circuits): tokens withdrawn == retries performed
+        stop = stop | stop_when_budget_exhausted(budget)
+    return {
+        "reraise": True,
+        "stop": stop,
+        "wait": wait_exponential_jitter(exp_base=base, max=max_wait),
+        "retry": retry_if_exception_type(TransientError),
+        "before_sleep": before_sleep,
+    }
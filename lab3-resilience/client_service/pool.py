@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Tuned httpx connection pools and pool metrics.
+#
+# Pool metrics come from httpcore's per-request "trace" extension: a request
+# that opens a TCP connection fires connection.connect_tcp.*, a request that
+# reuses a pooled (or HTTP/2 multiplexed) connection goes straight to
+# http11/http2.send_request_headers. Pool wait is the time from the request
+# start to sending headers, minus any connect/TLS time of its own.
+
+import time
+import logging
+import httpx
+from histogram import LatencyHistogram
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def make_client(
+    max_connections: int = 100,
+    max_keepalive: int = 20,
+    keepalive_expiry: float = 5.0,
+    connect_timeout: float = 2.0,
+    read_timeout: float = 2.0,
+    write_timeout: float = 2.0,
+    pool_timeout: float = 2.0,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    if http2 and not http2_available():
+        logging.warning("HTTP2_ENABLED but the 'h2' package is missing: falling back to HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=write_timeout,
+            pool=pool_timeout,
+        ),
+    )
+
+class PoolStats:
+    """Connections opened vs reused and pool wait time for one client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.pool_wait = LatencyHistogram()
+        self.connect_time = LatencyHistogram()
+
+    def tracer(self):
+        """Return a fresh trace callback for one request (pass as extensions={"trace": ...})"""
+        start = time.perf_counter()
+        marks = {"connect_started": 0.0, "connect": 0.0}
+
+        async def trace(event_name: str, info: dict):
+            now = time.perf_counter()
+            if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                marks["connect_started"] = now
+            elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                marks["connect"] += now - marks["connect_started"]
+                if event_name == "connection.connect_tcp.complete":
+                    self.connections_opened += 1
+            elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+                self.requests += 1
+                if marks["connect"]:
+                    self.connect_time.record_seconds(marks["connect"])
+                self.pool_wait.record_seconds(max(0.0, now - start - marks["connect"]))
+
+        return trace
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(0, self.requests - self.connections_opened),
+            "pool_wait_ms": {k: v for k, v in self.pool_wait.summary_ms().items() if k in ("mean", "p50", "p99", "max")},
+            "connect_ms": {k: v for k, v in self.connect_time.summary_ms().items() if k in ("mean", "p50", "p99", "max")},
+        }
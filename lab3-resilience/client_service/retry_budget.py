@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# Process-wide retry budget shared by every in-flight request.
+#
+# Successful requests deposit `ratio` retries each; a retry is allowed only
+# while retries in the last `ttl` seconds stay below
+#     min_per_sec * ttl + ratio * successes in the last `ttl` seconds
+# so during an outage retries shrink to the floor instead of multiplying load.
+
+import time
+import threading
+from array import array
+from tenacity.stop import stop_base
+
+class RetryBudget:
+    """Sliding per-second token accounting; O(1) amortised, one short lock hold"""
+
+    def __init__(self, ratio: float = 0.2, min_per_sec: float = 1.0, ttl: int = 10, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._epoch = array("q", [-1]) * ttl
+        self._deposits = array("L", [0]) * ttl
+        self._withdrawals = array("L", [0]) * ttl
+        self._head = None
+        self.deposits = 0      # successes inside the window
+        self.withdrawals = 0   # retries inside the window
+        self.allowed = 0       # lifetime counters, exported
+        self.denied = 0
+
+    def _advance(self, second: int):
+        if self._head is not None and second <= self._head:
+            return
+        start = second - self.ttl + 1 if self._head is None else max(self._head + 1, second - self.ttl + 1)
+        for sec in range(start, second + 1):
+            i = sec % self.ttl
+            if self._epoch[i] != sec:
+                self.deposits -= self._deposits[i]
+                self.withdrawals -= self._withdrawals[i]
+                self._deposits[i] = self._withdrawals[i] = 0
+                self._epoch[i] = sec
+        self._head = second
+
+    def deposit(self):
+        """Record a successful request"""
+        second = int(self.clock())
+        with self._lock:
+            self._advance(second)
+            self._deposits[second % self.ttl] += 1
+            self.deposits += 1
+
+    def try_withdraw(self) -> bool:
+        """Spend one retry if the budget allows it"""
+        second = int(self.clock())
+        with self._lock:
+            self._advance(second)
+            if self.withdrawals < self.min_per_sec * self.ttl + self.ratio * self.deposits:
+                self._withdrawals[second % self.ttl] += 1
+                self.withdrawals += 1
+                self.allowed += 1
+                return True
+            self.denied += 1
+            return False
+
+    def snapshot(self) -> dict:
+        return {
+            "ratio": self.ratio,
+            "min_per_sec": self.min_per_sec,
+            "ttl": self.ttl,
+            "retries_allowed": self.allowed,
+            "retries_denied": self.denied,
+        }
+
+class stop_when_budget_exhausted(stop_base):
+    """Tenacity stop: spend one token per retry, stop once `budget` has none left"""
+
+    def __init__(self, budget: RetryBudget):
+        self.budget = budget
+
+    def __call__(self, retry_state) -> bool:
+        return not self.budget.try_withdraw()
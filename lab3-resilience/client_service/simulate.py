@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+# Discrete-event simulator for the client's resilience stack.
+#
+# Runs the real breaker (breakers.py / pybreaker), retry policy (policy.py,
+# tenacity) and retry budget against a model of backend_service/main.py on a
+# virtual clock: the event loop jumps straight to the next timer instead of
+# sleeping, so ten minutes of load take a fraction of a second.
+#
+#   python simulate.py --set FAILURE_RATE=0.7 --duration 600
+#   python simulate.py --grid CB_FAIL_MAX=2,5 RETRY_MAX_ATTEMPTS=1,3 --set CLIENT_CONCURRENCY=8
+#   python simulate.py --grid CB_RESET_TIMEOUT=1,5,10 --repeat 5 --out sweep.json
+#
+# Every config starts from the same defaults main.py uses (overridden by the
+# environment, then --set, then the grid point) and the same seeds, so
+# differences between rows come from the config, not from the draws.
+# Not modelled: hedging, the adaptive limiter, bulkheads, micro-batching and the
+# connection pool.
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+import selectors
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import pybreaker
+from pybreaker import CircuitBreakerError, CircuitBreakerListener, STATE_OPEN
+from tenacity import retry
+
+import breakers
+from breakers import AsyncCircuitBreaker, SlidingWindowBreaker, ProbeGate
+from retry_budget import RetryBudget
+from policy import TransientError, retry_kwargs
+from deadline import DeadlineExceeded, budget, check
+from histogram import LatencyHistogram
+
+OUTCOMES = ("ok", "5xx", "timeout", "fast_fail")
+
+# Same names and defaults as main.py (and backend_service for the fault knobs)
+DEFAULTS = {
+    "CB_TYPE": "consecutive",
+    "CB_FAIL_MAX": 2,
+    "CB_RESET_TIMEOUT": 1.0,
+    "CB_HALF_OPEN_MAX_CALLS": 1,
+    "CB_WINDOW_TYPE": "count",
+    "CB_WINDOW_SIZE": 20,
+    "CB_MIN_CALLS": 10,
+    "CB_FAILURE_RATE_THRESHOLD": 0.5,
+    "CB_SLOW_CALL_RATE_THRESHOLD": 1.0,
+    "CB_SLOW_CALL_MS": 2000,
+    "RETRY_MAX_ATTEMPTS": 1,
+    "RETRY_BASE": 0.2,
+    "RETRY_MAX": 2.0,
+    "RETRY_BUDGET_ENABLED": False,
+    "RETRY_BUDGET_RATIO": 0.2,
+    "RETRY_BUDGET_MIN_PER_SEC": 1.0,
+    "RETRY_BUDGET_TTL": 10,
+    "HTTP_READ_TIMEOUT": 2.0,
+    "DEADLINE_MS": 0.0,
+    "DEADLINE_MIN_ATTEMPT_MS": 50.0,
+    "CLIENT_CONCURRENCY": 1,
+    "CLIENT_TARGET_RPS": 0.0,
+    "CLIENT_INTERVAL": 0.3,
+    "FAILURE_RATE": 0.2,
+    "SLOW_RATE": 0.3,
+    "MAX_DELAY_MS": 800,
+    # Network round trip added to every backend call
+    "SIM_RTT_MS": 1.0,
+}
+
+def cast(key: str, text: str):
+    default = DEFAULTS[key]
+    if isinstance(default, bool):
+        return str(text).lower() == "true"
+    return type(default)(text)
+
+def load_config(*overrides: dict) -> dict:
+    cfg = {k: cast(k, os.environ[k]) if k in os.environ else v for k, v in DEFAULTS.items()}
+    for o in overrides:
+        cfg.update({k: cast(k, v) for k, v in o.items()})
+    return cfg
+
+# === Virtual time ===
+class SimulationDeadlock(RuntimeError):
+    pass
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Polls real fds without blocking, then moves the loop clock to the next timer"""
+
+    def __init__(self, loop):
+        super().__init__()
+        self.loop = loop
+
+    def select(self, timeout=None):
+        ready = super().select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            raise SimulationDeadlock("no timers left and nothing ready")
+        self.loop.now += timeout
+        return []
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """asyncio loop whose time() only advances when every task is waiting on a timer"""
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self.now
+
+EPOCH = datetime(2025, 1, 1)
+
+class _VirtualDatetime(datetime):
+    clock = None
+
+    @classmethod
+    def utcnow(cls):
+        return EPOCH + timedelta(seconds=cls.clock())
+
+class virtual_datetime:
+    """Point pybreaker's and breakers.py's datetime.utcnow() at `clock` (reset_timeout uses it)"""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        self.saved = pybreaker.datetime, breakers.datetime
+        _VirtualDatetime.clock = self.clock
+        pybreaker.datetime = breakers.datetime = _VirtualDatetime
+        return self
+
+    def __exit__(self, *exc):
+        pybreaker.datetime, breakers.datetime = self.saved
+        _VirtualDatetime.clock = None
+
+# === Backend model ===
+class ReadTimeout(Exception):
+    """Stands in for httpx.ReadTimeout: not retried, counted by the breaker"""
+
+class BackendModel:
+    """Same draws, in the same order, as backend_service/faults.py RandomFaults"""
+
+    def __init__(self, failure_rate: float, slow_rate: float, max_delay_ms: int, rng: random.Random):
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.max_delay_ms = max_delay_ms
+        self.rng = rng
+
+    def draw(self):
+        delay = 0.0
+        if self.rng.random() < self.slow_rate:
+            delay = self.rng.randint(0, self.max_delay_ms) / 1000.0
+        fail = self.rng.random() < self.failure_rate
+        return delay, fail
+
+# === Client model ===
+class StateTimer(CircuitBreakerListener):
+    """Counts transitions and the virtual seconds spent in each breaker state"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.state = "closed"
+        self.since = clock()
+        self.transitions = 0
+        self.seconds = {}
+
+    def state_change(self, cb, old_state, new_state):
+        self._close_span()
+        self.state = getattr(new_state, "name", str(new_state))
+        self.transitions += 1
+
+    def _close_span(self):
+        now = self.clock()
+        self.seconds[self.state] = self.seconds.get(self.state, 0.0) + now - self.since
+        self.since = now
+
+    def shares(self) -> dict:
+        self._close_span()
+        total = sum(self.seconds.values()) or 1.0
+        return {state: round(s / total, 4) for state, s in self.seconds.items()}
+
+class Simulation:
+    """One config on one virtual clock: closed-loop workers or a paced dispatcher"""
+
+    def __init__(self, cfg: dict, loop: VirtualEventLoop, seed: int):
+        self.cfg = cfg
+        self.loop = loop
+        clock = loop.time
+        self.backend = BackendModel(cfg["FAILURE_RATE"], cfg["SLOW_RATE"], cfg["MAX_DELAY_MS"], random.Random(seed))
+        self.states = StateTimer(clock)
+        self.breaker = self.make_breaker(clock)
+        self.probe_gate = ProbeGate(self.breaker)
+        self.budget = RetryBudget(
+            ratio=cfg["RETRY_BUDGET_RATIO"],
+            min_per_sec=cfg["RETRY_BUDGET_MIN_PER_SEC"],
+            ttl=cfg["RETRY_BUDGET_TTL"],
+            clock=clock,
+        )
+        self.fetch_with_retry = retry(**retry_kwargs(
+            cfg["RETRY_MAX_ATTEMPTS"],
+            cfg["RETRY_BASE"],
+            cfg["RETRY_MAX"],
+            budget=self.budget if cfg["RETRY_BUDGET_ENABLED"] else None,
+            before_sleep=self.count_retry,
+            min_attempt=cfg["DEADLINE_MIN_ATTEMPT_MS"] / 1000.0,
+        ))(self.fetch)
+        self.rtt = cfg["SIM_RTT_MS"] / 1000.0
+        self.backend_calls = 0
+        self.retries = 0
+        self.outcomes = {name: 0 for name in OUTCOMES}
+        self.latency = LatencyHistogram()
+        self.ok_latency = LatencyHistogram()
+        self.in_flight = set()
+
+    def make_breaker(self, clock):
+        cfg = self.cfg
+        if cfg["CB_TYPE"] == "sliding":
+            return SlidingWindowBreaker(
+                failure_rate_threshold=cfg["CB_FAILURE_RATE_THRESHOLD"],
+                slow_call_rate_threshold=cfg["CB_SLOW_CALL_RATE_THRESHOLD"],
+                slow_call_duration=cfg["CB_SLOW_CALL_MS"] / 1000.0,
+                window_type=cfg["CB_WINDOW_TYPE"],
+                window_size=cfg["CB_WINDOW_SIZE"],
+                minimum_calls=cfg["CB_MIN_CALLS"],
+                reset_timeout=cfg["CB_RESET_TIMEOUT"],
+                half_open_max_calls=cfg["CB_HALF_OPEN_MAX_CALLS"],
+                name="sim-breaker",
+                listeners=[self.states],
+                clock=clock,
+            )
+        return AsyncCircuitBreaker(
+            fail_max=cfg["CB_FAIL_MAX"],
+            reset_timeout=cfg["CB_RESET_TIMEOUT"],
+            name="sim-breaker",
+            listeners=[self.states],
+        )
+
+    def count_retry(self, retry_state):
+        self.retries += 1
+
+    async def fetch(self) -> dict:
+        """One backend attempt; raises like main.fetch_with_retry() does"""
+        left = check(self.cfg["DEADLINE_MIN_ATTEMPT_MS"] / 1000.0)
+        self.backend_calls += 1
+        delay, fail = self.backend.draw()
+        if left is not None and delay >= left:
+            # The backend drops a delay the X-Request-Timeout-Ms budget can't cover
+            await asyncio.sleep(self.rtt)
+            raise TransientError("server error 504")
+        rtt = delay + self.rtt
+        timeout = self.cfg["HTTP_READ_TIMEOUT"]
+        if left is not None and rtt > left and left < timeout:
+            await asyncio.sleep(left)
+            raise DeadlineExceeded()
+        if rtt > timeout:
+            await asyncio.sleep(timeout)
+            raise ReadTimeout()
+        await asyncio.sleep(rtt)
+        if fail:
+            raise TransientError("server error 500")
+        self.budget.deposit()
+        return {"ok": True}
+
+    async def call_backend(self):
+        start = self.loop.time()
+        try:
+            with budget(self.cfg["DEADLINE_MS"] / 1000.0, clock=self.loop.time):
+                await self.breaker.call_async(self.fetch_with_retry)
+            outcome = "ok"
+        except CircuitBreakerError:
+            outcome = "fast_fail"
+        except TransientError:
+            outcome = "5xx"
+        except (ReadTimeout, DeadlineExceeded):
+            outcome = "timeout"
+        elapsed = self.loop.time() - start
+        self.outcomes[outcome] += 1
+        self.latency.record_seconds(elapsed)
+        if outcome == "ok":
+            self.ok_latency.record_seconds(elapsed)
+
+    async def worker_loop(self):
+        """main.worker_loop(): wait out OPEN on the probe gate, call, sleep CLIENT_INTERVAL"""
+        while True:
+            if self.breaker.current_state == STATE_OPEN:
+                await self.probe_gate.wait()
+            await self.call_backend()
+            await asyncio.sleep(self.cfg["CLIENT_INTERVAL"])
+
+    async def paced_loop(self):
+        """main.paced_loop(): CLIENT_TARGET_RPS starts, at most CLIENT_CONCURRENCY in flight"""
+        slots = asyncio.Semaphore(self.cfg["CLIENT_CONCURRENCY"])
+        interval = 1.0 / self.cfg["CLIENT_TARGET_RPS"]
+        next_at = self.loop.time()
+
+        async def paced_call():
+            try:
+                await self.call_backend()
+            finally:
+                slots.release()
+
+        while True:
+            await slots.acquire()
+            task = asyncio.create_task(paced_call())
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+            next_at += interval
+            delay = next_at - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_at = self.loop.time()
+
+    async def run(self, duration: float):
+        if self.cfg["CLIENT_TARGET_RPS"] > 0:
+            tasks = [asyncio.create_task(self.paced_loop())]
+        else:
+            tasks = [asyncio.create_task(self.worker_loop()) for _ in range(self.cfg["CLIENT_CONCURRENCY"])]
+        await asyncio.sleep(duration)
+        # Calls still running at the end are dropped, not counted
+        tasks += self.in_flight
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# === One run ===
+def simulate(cfg: dict, duration: float, seed: int) -> dict:
+    """Run one config for `duration` virtual seconds and return its raw counts"""
+    random.seed(seed)  # tenacity's jitter draws from the global generator
+    loop = VirtualEventLoop()
+    started = time.perf_counter()
+    try:
+        with virtual_datetime(loop.time):
+            sim = Simulation(cfg, loop, seed)
+            loop.run_until_complete(sim.run(duration))
+    finally:
+        loop.close()
+    return {
+        "duration_s": duration,
+        "requests": sum(sim.outcomes.values()),
+        "outcomes": sim.outcomes,
+        "backend_calls": sim.backend_calls,
+        "retries": sim.retries,
+        "retries_denied": sim.budget.denied,
+        "transitions": sim.states.transitions,
+        "state_share": sim.states.shares(),
+        "histograms": {"all": sim.latency.to_dict(), "ok": sim.ok_latency.to_dict()},
+        "wall_s": time.perf_counter() - started,
+    }
+
+def _run_config(job):
+    point, cfg, duration, seeds = job
+    return point, cfg, [simulate(cfg, duration, seed) for seed in seeds]
+
+def summarize(point: dict, cfg: dict, runs: list) -> dict:
+    """Pool the repeats of one config into the figures the sweep reports"""
+    latency = LatencyHistogram()
+    ok_latency = LatencyHistogram()
+    outcomes = {name: 0 for name in OUTCOMES}
+    share = {}
+    for r in runs:
+        latency.merge(LatencyHistogram.from_dict(r["histograms"]["all"]))
+        ok_latency.merge(LatencyHistogram.from_dict(r["histograms"]["ok"]))
+        for name, n in r["outcomes"].items():
+            outcomes[name] += n
+        for state, s in r["state_share"].items():
+            share[state] = share.get(state, 0.0) + s / len(runs)
+    requests = sum(r["requests"] for r in runs)
+    backend_calls = sum(r["backend_calls"] for r in runs)
+    virtual_s = sum(r["duration_s"] for r in runs)
+    return {
+        "point": point,
+        "config": cfg,
+        "repeats": len(runs),
+        "requests": requests,
+        "throughput_rps": round(requests / virtual_s, 2) if virtual_s else 0.0,
+        "success_rate": round(outcomes["ok"] / requests, 4) if requests else 0.0,
+        "load_amplification": round(backend_calls / requests, 3) if requests else 0.0,
+        "backend_calls": backend_calls,
+        "retries": sum(r["retries"] for r in runs),
+        "retries_denied": sum(r["retries_denied"] for r in runs),
+        "transitions": sum(r["transitions"] for r in runs),
+        "state_share": {state: round(s, 4) for state, s in share.items()},
+        "outcomes": outcomes,
+        "latency_ms": {"all": latency.summary_ms(), "ok": ok_latency.summary_ms()},
+        "wall_s": round(sum(r["wall_s"] for r in runs), 3),
+    }
+
+# === Sweep ===
+def parse_assignments(items, multi: bool) -> dict:
+    out = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or key not in DEFAULTS:
+            raise SystemExit(f"bad setting {item!r}; known keys: {', '.join(DEFAULTS)}")
+        out[key] = value.split(",") if multi else value
+    return out
+
+def grid_points(grid: dict) -> list:
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def sweep(grid: dict, fixed: dict, duration: float, repeat: int, seed: int, workers: int) -> list:
+    seeds = [seed + i for i in range(repeat)]
+    jobs = [(point, load_config(fixed, point), duration, seeds) for point in grid_points(grid)]
+    if workers <= 1 or len(jobs) == 1:
+        done = map(_run_config, jobs)
+        return [summarize(*r) for r in done]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [summarize(*r) for r in pool.map(_run_config, jobs)]
+
+def print_table(rows: list):
+    keys = list(rows[0]["point"]) if rows else []
+    header = keys + ["success", "amplif", "rps", "p50", "p99", "p999", "open", "trans"]
+    widths = [max(9, len(h) + 2) for h in header]
+    print("".join(f"{h:>{w}}" for h, w in zip(header, widths)))
+    for r in rows:
+        lat = r["latency_ms"]["all"]
+        values = [r["point"][k] for k in keys] + [
+            r["success_rate"], r["load_amplification"], r["throughput_rps"],
+            lat["p50"], lat["p99"], lat["p999"], r["state_share"].get("open", 0.0), r["transitions"],
+        ]
+        print("".join(f"{v:>{w}}" for v, w in zip(values, widths)))
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Simulate the client's breaker + retry policy over a config grid")
+    p.add_argument("--grid", nargs="*", default=[], metavar="KEY=v1,v2", help="values to sweep (cartesian product)")
+    p.add_argument("--set", nargs="*", default=[], metavar="KEY=v", help="fixed settings for every config")
+    p.add_argument("--duration", type=float, default=600.0, help="virtual seconds per run")
+    p.add_argument("--repeat", type=int, default=1, help="runs per config (seeds seed..seed+repeat-1)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for the sweep")
+    p.add_argument("--out", default=None, help="write JSON results here")
+    return p.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    grid = parse_assignments(args.grid, multi=True)
+    fixed = parse_assignments(args.set, multi=False)
+    started = time.perf_counter()
+    rows = sweep(grid, fixed, args.duration, args.repeat, args.seed, args.workers)
+    print_table(rows)
+    print(f"{len(rows)} configs x {args.repeat} runs x {args.duration:g}s virtual in "
+          f"{time.perf_counter() - started:.2f}s")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
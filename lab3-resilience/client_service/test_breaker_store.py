@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Shared breaker storage (breaker_store.py): two "workers" on one shm file.
+#
+#   cd client_service && python -m pytest -q test_breaker_store.py
+
+import pytest
+from pybreaker import CircuitBreaker, CircuitBreakerError, STATE_OPEN
+
+from breaker_store import SharedMemoryStorage
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / "breakers.shm")
+    # Merged only on an explicit sync(), so each test controls the interleaving
+    return [SharedMemoryStorage("work", path, sync_interval=1e9) for _ in range(2)]
+
+def test_concurrent_failures_add_up(workers):
+    a, b = workers
+    for _ in range(3):
+        a.increment_counter()
+        b.increment_counter()
+    a.sync()
+    b.sync()
+    assert a.counter == b.counter == 6
+
+def test_success_clears_only_the_failures_it_saw(workers):
+    a, b = workers
+    a.increment_counter()
+    a.sync()
+    b.reset_counter()        # b saw a's failure
+    a.increment_counter()    # ... which happened before this one
+    a.sync()
+    b.increment_counter()
+    b.sync()
+    assert a.counter == 2    # a's second failure and b's failure after its success
+
+def test_reset_never_goes_negative(workers):
+    a, b = workers
+    a.increment_counter()
+    a.sync()
+    a.reset_counter()
+    b.reset_counter()        # both clear the same failure
+    a.sync()
+    b.sync()
+    assert a.counter == 0
+
+def test_shared_breaker_opens_at_fail_max(tmp_path):
+    path = str(tmp_path / "breakers.shm")
+    breakers = [CircuitBreaker(fail_max=4, reset_timeout=60,
+                               state_storage=SharedMemoryStorage("work", path, sync_interval=0))
+                for _ in range(2)]
+
+    def fail():
+        raise RuntimeError("server error 500")
+
+    for i in range(3):
+        with pytest.raises(RuntimeError):
+            breakers[i % 2].call(fail)
+    with pytest.raises(CircuitBreakerError):
+        breakers[1].call(fail)
+    assert breakers[0].current_state == STATE_OPEN
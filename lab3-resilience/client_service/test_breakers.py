@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# Breaker state machines (breakers.py) driven by a fake clock.
+#
+#   cd client_service && python -m pytest -q test_breakers.py
+
+import time
+import asyncio
+from contextlib import nullcontext
+
+import pytest
+from pybreaker import CircuitBreakerError, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+from breakers import AsyncCircuitBreaker, ProbeGate, SlidingWindowBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def sliding(clock, **kwargs) -> SlidingWindowBreaker:
+    params = {"failure_rate_threshold": 0.5, "window_size": 4, "minimum_calls": 4, "reset_timeout": 10,
+              "clock": clock}
+    params.update(kwargs)
+    return SlidingWindowBreaker(**params)
+
+def ok():
+    return "ok"
+
+def fail():
+    raise RuntimeError("server error 500")
+
+def open_breaker(breaker):
+    for _ in range(breaker.minimum_calls):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.current_state == STATE_OPEN
+
+def test_sliding_window_trips_on_failure_rate():
+    breaker = sliding(FakeClock())
+    for fn in (ok, ok, fail):
+        with pytest.raises(RuntimeError) if fn is fail else nullcontext():
+            breaker.call(fn)
+    # 1 of 3 failed and minimum_calls is not reached yet
+    assert breaker.current_state == STATE_CLOSED
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    # 2 of 4 = failure_rate_threshold
+    assert breaker.current_state == STATE_OPEN
+    with pytest.raises(CircuitBreakerError):
+        breaker.call(ok)
+
+def test_sliding_window_forgets_old_calls():
+    breaker = sliding(FakeClock())
+    for fn in (fail, ok, ok, ok, ok, ok, fail):
+        with pytest.raises(RuntimeError) if fn is fail else nullcontext():
+            breaker.call(fn)
+    # The first failure slid out of the last-4 window: 1 of 4 failed
+    assert breaker.current_state == STATE_CLOSED
+
+def test_time_window_trips_and_expires():
+    clock = FakeClock()
+    breaker = sliding(clock, window_type="time", window_size=10)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    clock.now += 11
+    breaker.call(ok)
+    # The failures are older than 10 s: 1 call in the window
+    assert breaker.current_state == STATE_CLOSED
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.current_state == STATE_OPEN
+
+def test_slow_calls_trip_the_breaker():
+    clock = FakeClock()
+    breaker = sliding(clock, slow_call_rate_threshold=0.5, slow_call_duration=1.0)
+
+    def slow():
+        clock.now += 2
+        return "ok"
+    for fn in (ok, ok, slow, slow):
+        breaker.call(fn)
+    assert breaker.current_state == STATE_OPEN
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = sliding(clock)
+    open_breaker(breaker)
+    clock.now += 5
+    with pytest.raises(CircuitBreakerError):
+        breaker.call(ok)
+    clock.now += 5
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.current_state == STATE_OPEN
+    clock.now += 10
+    assert breaker.call(ok) == "ok"
+    assert breaker.current_state == STATE_CLOSED
+
+def test_cancelled_half_open_probe_frees_its_slot():
+    clock = FakeClock()
+    breaker = sliding(clock)
+    open_breaker(breaker)
+    clock.now += 10
+
+    async def run():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        probe = asyncio.ensure_future(breaker.call_async(hang))
+        await started.wait()
+        assert breaker.current_state == STATE_HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def succeed():
+            return "ok"
+        # The next caller gets the probe slot back and closes the breaker
+        assert await breaker.call_async(succeed) == "ok"
+
+    asyncio.run(run())
+    assert breaker.current_state == STATE_CLOSED
+
+def test_cancelled_call_while_closed_is_not_counted():
+    breaker = sliding(FakeClock())
+
+    async def run():
+        async def cancelled():
+            raise asyncio.CancelledError()
+        for _ in range(breaker.minimum_calls):
+            with pytest.raises(asyncio.CancelledError):
+                await breaker.call_async(cancelled)
+
+    asyncio.run(run())
+    assert breaker.current_state == STATE_CLOSED
+    assert breaker.window.totals(0)[0] == 0
+
+def test_half_open_rejects_extra_probes():
+    clock = FakeClock()
+    breaker = sliding(clock)
+    open_breaker(breaker)
+    clock.now += 10
+
+    def nested():
+        with pytest.raises(CircuitBreakerError):
+            breaker.call(ok)
+        return "ok"
+    assert breaker.call(nested) == "ok"
+    assert breaker.current_state == STATE_CLOSED
+
+def test_trip_is_chained_to_the_backend_failure():
+    breaker = AsyncCircuitBreaker(fail_max=2, reset_timeout=60)
+
+    async def failing():
+        raise RuntimeError("server error 500")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await breaker.call_async(failing)
+        with pytest.raises(CircuitBreakerError) as tripped:
+            await breaker.call_async(failing)
+        assert isinstance(tripped.value.__cause__, RuntimeError)
+        try:
+            raise KeyError("unrelated")
+        except KeyError:
+            # A rejection raised while handling something else has no cause
+            with pytest.raises(CircuitBreakerError) as rejected:
+                await breaker.call_async(failing)
+        assert rejected.value.__cause__ is None
+
+    asyncio.run(run())
+
+def test_probe_gate_timer_wakes_every_waiter():
+    breaker = SlidingWindowBreaker(window_size=1, minimum_calls=1, reset_timeout=0.2)
+    gate = ProbeGate(breaker)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.current_state == STATE_OPEN
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.wait_for(asyncio.gather(*(gate.wait() for _ in range(5))), timeout=2)
+        return time.monotonic() - start
+
+    waited = asyncio.run(run())
+    assert 0.15 <= waited < 1.0
+    assert breaker.seconds_until_probe() == 0.0
+
+def test_probe_gate_state_change_wakes_waiters_early():
+    breaker = AsyncCircuitBreaker(fail_max=1, reset_timeout=60)
+    gate = ProbeGate(breaker)
+
+    async def failing():
+        raise RuntimeError("server error 500")
+
+    async def run():
+        with pytest.raises(CircuitBreakerError):
+            await breaker.call_async(failing)
+        waiters = asyncio.gather(*(gate.wait() for _ in range(3)))
+        await asyncio.sleep(0.05)
+        assert not waiters.done()
+        # e.g. another replica's probe closed the shared breaker
+        breaker.close()
+        await asyncio.wait_for(waiters, timeout=1)
+
+    asyncio.run(run())
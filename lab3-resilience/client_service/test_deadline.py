@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Call deadlines (deadline.py) and their propagation to the backend request.
+#
+#   cd client_service && python -m pytest -q test_deadline.py
+
+import asyncio
+
+import httpx
+import pytest
+
+import deadline
+import main
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def capture_headers(comp):
+    """Point `comp` at a mock transport; the list of request headers it saw"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers)
+        return httpx.Response(200, json={"ok": True})
+    comp.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return seen
+
+def test_budget_nests_to_the_tighter_deadline():
+    clock = FakeClock()
+    with deadline.budget(10, clock=clock):
+        with deadline.budget(60, clock=clock):
+            assert deadline.remaining() == 10
+        clock.now += 4
+        assert deadline.remaining() == 6
+        clock.now += 6
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.check()
+    assert deadline.remaining() is None
+
+def test_remaining_budget_is_sent_as_header():
+    comp = main.compartments["work"]
+    seen = capture_headers(comp)
+
+    async def run():
+        with deadline.budget(0.5):
+            await main.send_request(comp)
+        await main.send_request(comp)
+
+    asyncio.run(run())
+    assert 0 < float(seen[0][deadline.HEADER]) <= 500
+    assert deadline.HEADER not in seen[1]
+
+def test_no_request_once_the_deadline_has_passed():
+    comp = main.compartments["work"]
+    seen = capture_headers(comp)
+
+    async def run():
+        with deadline.budget(0.01):
+            await asyncio.sleep(0.02)
+            await main.send_request(comp)
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        asyncio.run(run())
+    assert seen == []
+
+def test_slow_attempt_is_cut_at_the_deadline():
+    comp = main.compartments["work"]
+
+    async def handler(request):
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, json={"ok": True})
+    comp.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with deadline.budget(0.1):
+            with pytest.raises(deadline.DeadlineExceeded):
+                await main.send_request(comp)
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 0.5
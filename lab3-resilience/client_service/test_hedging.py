@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Hedged requests (hedging.py) against scripted send() latencies.
+#
+#   cd client_service && python -m pytest -q test_hedging.py
+
+import asyncio
+
+from hedging import Hedger
+from retry_budget import RetryBudget
+
+def test_cancelled_primary_is_observed_when_hedge_wins():
+    hedger = Hedger(RetryBudget(ratio=1.0, min_per_sec=100), min_delay=0.01)
+    latencies = iter([0.5, 0.0])
+
+    async def send():
+        await asyncio.sleep(next(latencies))
+        return "ok"
+
+    async def run():
+        return await hedger.run(send)
+
+    assert asyncio.run(run()) == "ok"
+    assert hedger.hedges_won == 1
+    # The hedge itself and the cancelled primary (at least the hedge delay)
+    assert hedger._current.total == 2
+    assert hedger._current.percentile(100) / 1_000_000 >= 0.01
+
+def test_primary_win_records_one_sample():
+    hedger = Hedger(RetryBudget(ratio=1.0, min_per_sec=100), min_delay=0.05)
+
+    async def send():
+        return "ok"
+
+    assert asyncio.run(hedger.run(send)) == "ok"
+    assert hedger.hedges_sent == 0
+    assert hedger._current.total == 1
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Retry budget accounting through the shared tenacity policy.
+#
+#   cd client_service && python -m pytest -q test_retry_budget.py
+
+import pytest
+from tenacity import Retrying, wait_none
+
+import deadline
+from policy import TransientError, retry_kwargs
+from retry_budget import RetryBudget
+
+class FrozenClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def run_failing(max_attempts: int, budget: RetryBudget, min_attempt: float = 0.0) -> int:
+    """Call an always-failing function under the policy; the number of retries performed"""
+    retries = []
+    kwargs = retry_kwargs(max_attempts, 2.0, 1.0, budget=budget, min_attempt=min_attempt,
+                          before_sleep=retries.append)
+    kwargs["wait"] = wait_none()
+
+    def fail():
+        raise TransientError("server error 500")
+
+    with pytest.raises(TransientError):
+        Retrying(**kwargs)(fail)
+    return len(retries)
+
+@pytest.mark.parametrize("max_attempts", [1, 2, 3, 5])
+def test_tokens_match_retries(max_attempts):
+    budget = RetryBudget(ratio=0.0, min_per_sec=100, clock=FrozenClock())
+    retries = run_failing(max_attempts, budget)
+    assert retries == max_attempts - 1
+    assert budget.allowed == retries
+    assert budget.denied == 0
+
+def test_no_token_when_deadline_stops():
+    budget = RetryBudget(ratio=0.0, min_per_sec=100, clock=FrozenClock())
+    with deadline.budget(0.05):
+        retries = run_failing(3, budget, min_attempt=1.0)
+    assert retries == 0
+    assert budget.allowed == 0
+
+def test_exhausted_budget_stops_retries():
+    # min_per_sec * ttl = 2 tokens, no successes to add more
+    budget = RetryBudget(ratio=0.0, min_per_sec=0.2, ttl=10, clock=FrozenClock())
+    assert run_failing(5, budget) == 2
+    assert run_failing(5, budget) == 0
+    assert budget.snapshot()["retries_allowed"] == 2
+    assert budget.snapshot()["retries_denied"] == 2
+
+def test_deposits_refill_budget():
+    budget = RetryBudget(ratio=0.5, min_per_sec=0.0, ttl=10, clock=FrozenClock())
+    assert run_failing(3, budget) == 0
+    for _ in range(4):
+        budget.deposit()
+    assert run_failing(5, budget) == 2
+    assert budget.allowed == 2